@@ -9,23 +9,52 @@ and README sheets.
 Author: Claude (automated)
 """
 
+import argparse
+import csv
+import glob
+import hashlib
 import json
+import math
+import os
 import re
+import sqlite3
+import sys
+import time
 import datetime
+import warnings
+import zipfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from copy import copy
+from itertools import chain, islice
 
+import numpy as np
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, numbers, Border, Side
 from openpyxl.formatting.rule import CellIsRule
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+# Shared helpers live with the workbook scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+import run_metrics  # noqa: E402
+from build_or_repair_workbook import SHARED_STRING_REF, shared_strings, sheet_parts  # noqa: E402
+from records import Record  # noqa: E402
 
 # ──────────────────────────────────────────────────────────────────────
 # CONFIG
 # ──────────────────────────────────────────────────────────────────────
 INPUT_PATH  = "/mnt/data/Daily Production Schedule 8.8.25.xlsx"
 OUTPUT_PATH = "/mnt/data/Production_Schedule_By_Line.xlsx"
+# Per-sheet extraction cache; set to None to always re-extract every sheet
+CACHE_PATH  = "/mnt/data/.schedule_sheet_cache.sqlite"
+# Persistent SKU catalog / SKU master; set to None to disable
+SKU_CATALOG_PATH = "/mnt/data/sku_catalog.sqlite"
+# Duplicate-key index shared by all consolidation runs; set to None to disable
+DUP_INDEX_PATH = "/mnt/data/schedule_dup_index.sqlite"
 
 KNOWN_HEADER_COLS = {
     # column index -> canonical field name (1-based)
@@ -40,14 +69,96 @@ KNOWN_HEADER_COLS = {
 
 LINE_NUMBERS = [1, 2, 3, 4, 5]
 
+# Worker processes for per-sheet extraction (None = one per CPU core)
+MAX_WORKERS = None
+# Contiguous sheet batches handed to each worker; more batches = better balancing
+CHUNKS_PER_WORKER = 4
+
+# Distinct SKU texts memoized per process in front of the SKU catalog
+SKU_LRU_SIZE = 8192
+
+# Bump when extraction logic changes so cached sheets are re-extracted
+EXTRACT_VERSION = "1"
+
+# Rows at the top of each sheet that may carry the sheet date and column headers
+HEADER_SCAN_ROWS = 5
+
 # ──────────────────────────────────────────────────────────────────────
 # DATA STRUCTURES
 # ──────────────────────────────────────────────────────────────────────
-issues = []  # list of dicts for "Assumptions & Data Issues"
+ISSUE_FIELDS = ["Severity", "SheetName", "Date", "Line", "RowRef", "Field", "Problem", "ActionTaken"]
+# Issues that agree on these fields are one entry, whatever sheet/row raised them
+ISSUE_IDENTITY = ("Severity", "Line", "Field", "Problem", "ActionTaken")
+
+
+class IssueLog:
+    """
+    Run-wide sink for "Assumptions & Data Issues".
+
+    Identical issues (same ISSUE_IDENTITY) collapse into one entry that keeps
+    the first occurrence's sheet/date/row plus an occurrence count and the
+    last sheet seen. Entries live in a private temporary on-disk SQLite
+    database, so memory holds only the per-severity and per-field counters.
+    Issue_IDs number entries in order of first occurrence.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self.clear()
+
+    def clear(self):
+        if self._conn is not None:
+            self._conn.close()
+        # An empty filename is a private on-disk temp database, removed on close
+        self._conn = sqlite3.connect("")
+        self._conn.execute(
+            # Untyped columns keep Line/RowRef numbers as numbers
+            "CREATE TABLE issue_log (Key TEXT PRIMARY KEY, Issue_ID INTEGER, "
+            + ", ".join(ISSUE_FIELDS)
+            + ", Occurrences INTEGER, LastSheet)"
+        )
+        self.entries = 0
+        self.total = 0
+        self.severity_counts = defaultdict(int)
+        self.field_counts = defaultdict(int)
+
+    def add(self, issue):
+        key = json.dumps([issue[f] for f in ISSUE_IDENTITY], default=str)
+        self.total += 1
+        self.severity_counts[issue["Severity"]] += 1
+        self.field_counts[issue["Field"]] += 1
+        updated = self._conn.execute(
+            "UPDATE issue_log SET Occurrences = Occurrences + 1, LastSheet = ? WHERE Key = ?",
+            (issue["SheetName"], key),
+        ).rowcount
+        if not updated:
+            self.entries += 1
+            self._conn.execute(
+                f"INSERT INTO issue_log VALUES (?, ?, {', '.join('?' * len(ISSUE_FIELDS))}, 1, ?)",
+                (key, self.entries, *[issue[f] for f in ISSUE_FIELDS], issue["SheetName"]),
+            )
+
+    def extend(self, issue_list):
+        for issue in issue_list:
+            self.add(issue)
+
+    def __len__(self):
+        return self.entries
+
+    def __iter__(self):
+        """Yield collapsed entries as dicts, in Issue_ID order, straight from disk."""
+        columns = ["Issue_ID", *ISSUE_FIELDS, "Occurrences", "LastSheet"]
+        cursor = self._conn.execute(f"SELECT {', '.join(columns)} FROM issue_log ORDER BY Issue_ID")
+        for values in cursor:
+            yield dict(zip(columns, values))
+
+
+issues = IssueLog()  # "Assumptions & Data Issues" for the current run
+_issue_capture = None  # while set, log_issue appends raw issues here instead
+
 
 def log_issue(severity, sheet_name, date_val, line, row_ref, field, problem, action):
-    issues.append({
-        "Issue_ID": len(issues) + 1,
+    issue = {
         "Severity": severity,
         "SheetName": sheet_name,
         "Date": str(date_val) if date_val else "",
@@ -56,7 +167,33 @@ def log_issue(severity, sheet_name, date_val, line, row_ref, field, problem, act
         "Field": field,
         "Problem": problem,
         "ActionTaken": action,
-    })
+    }
+    if _issue_capture is not None:
+        _issue_capture.append(issue)
+    else:
+        issues.add(issue)
+
+
+SCHEDULE_ROW_FIELDS = (
+    "Date", "SourceSheet", "Line", "SKU", "SKU_RawText", "Description", "Cases_Planned",
+    "Shifts_Planned", "Target_Per_Shift", "Cases_Completed", "Percent_Complete", "Notes",
+    "WorkOrderMade", "ExtraFields_JSON",
+)
+# Repeated across thousands of rows; keep one copy of each distinct value
+INTERNED_ROW_FIELDS = frozenset({"SourceSheet", "SKU", "SKU_RawText", "Description", "WorkOrderMade"})
+
+
+class ScheduleRow(Record):
+    """
+    One consolidated schedule row.
+
+    Behaves like the dict it replaces (indexing, .get, ** unpacking, ==
+    against dicts) but stores its 14 fields in slots, with the repetitive
+    text fields interned, so a large history costs a fraction of the memory.
+    """
+
+    __slots__ = _fields = SCHEDULE_ROW_FIELDS
+    _interned = INTERNED_ROW_FIELDS
 
 
 # ──────────────────────────────────────────────────────────────────────
@@ -85,15 +222,14 @@ def parse_date_from_sheet_name(name):
     return None
 
 
-def extract_date_from_sheet(ws, sheet_name):
+def extract_date_from_sheet(header_rows, sheet_name):
     """
     Look for a real datetime in the header rows (rows 1-5, columns A-C).
     Fall back to parsing the sheet name.
     """
     real_date = None
-    for row_idx in range(1, min(ws.max_row + 1, 6)):
-        for col_idx in range(1, 4):
-            val = ws.cell(row=row_idx, column=col_idx).value
+    for row in header_rows:
+        for val in row[:3]:
             if isinstance(val, datetime.datetime):
                 real_date = val.date()
                 break
@@ -124,18 +260,17 @@ def extract_date_from_sheet(ws, sheet_name):
 # ──────────────────────────────────────────────────────────────────────
 # DETECT EXTRA HEADER COLUMNS
 # ──────────────────────────────────────────────────────────────────────
-def detect_extra_columns(ws):
+def detect_extra_columns(header_rows):
     """
-    Scan the header row for column headers beyond the known set.
+    Scan the header rows for column headers beyond the known set.
     Returns a dict {col_index: header_name} for any additional columns found.
     Also specifically look for "Work order made" column position.
     """
     extra_cols = {}
     work_order_col = 12  # default
 
-    for row_idx in range(1, min(ws.max_row + 1, 6)):
-        for col_idx in range(1, ws.max_column + 1):
-            val = ws.cell(row=row_idx, column=col_idx).value
+    for row in header_rows:
+        for col_idx, val in enumerate(row, 1):
             if val is None:
                 continue
             val_str = str(val).strip().lower()
@@ -147,8 +282,8 @@ def detect_extra_columns(ws):
             if col_idx <= 2:
                 continue
             # It's beyond our known columns — record it
-            val_clean = str(ws.cell(row=row_idx, column=col_idx).value).strip()
-            if val_clean and val_clean != '\xa0' and not isinstance(ws.cell(row=row_idx, column=col_idx).value, datetime.datetime):
+            val_clean = str(val).strip()
+            if val_clean and val_clean != '\xa0' and not isinstance(val, datetime.datetime):
                 # Check it looks like a header (text, not a number)
                 try:
                     float(val_clean)
@@ -194,17 +329,14 @@ def to_numeric(val, field_name, sheet_name, date_val, line, row_ref):
 # ──────────────────────────────────────────────────────────────────────
 # SKU PARSING
 # ──────────────────────────────────────────────────────────────────────
-def parse_sku(raw_text, sheet_name, date_val, line, row_ref):
+def parse_sku_text(raw_str):
     """
-    Extract SKU code (first 6+ digit number) and description from raw text.
-    Returns (sku, description, raw_text).
+    Extract SKU code (first 6+ digit number) and description from stripped,
+    non-empty raw text. Pure function of the text: returns
+    (sku, description, findings) where findings is a tuple of
+    (severity, field, problem, action) issues that parse_sku logs per row.
     """
-    if raw_text is None:
-        return None, None, None
-
-    raw_str = str(raw_text).strip()
-    if not raw_str:
-        return None, None, raw_str
+    findings = []
 
     # Find all sequences of 6+ digits
     candidates = re.findall(r'\b(\d{6,})\b', raw_str)
@@ -219,23 +351,21 @@ def parse_sku(raw_text, sheet_name, date_val, line, row_ref):
         if candidates_short:
             sku = candidates_short[0]
             if len(candidates_short) > 1:
-                log_issue("Warning", sheet_name, date_val, line, row_ref,
-                          "SKU", f"Multiple short number candidates in '{raw_str}'; using first: {sku}",
-                          f"Used SKU={sku}")
-            log_issue("Info", sheet_name, date_val, line, row_ref,
-                      "SKU", f"Short SKU ({len(sku)} digits) detected: {sku}",
-                      f"Used SKU={sku}")
+                findings.append(("Warning", "SKU",
+                                 f"Multiple short number candidates in '{raw_str}'; using first: {sku}",
+                                 f"Used SKU={sku}"))
+            findings.append(("Info", "SKU", f"Short SKU ({len(sku)} digits) detected: {sku}",
+                             f"Used SKU={sku}"))
         else:
-            log_issue("Warning", sheet_name, date_val, line, row_ref,
-                      "SKU", f"No numeric SKU found in '{raw_str}'",
-                      "Left SKU blank")
-            return None, None, raw_str
+            findings.append(("Warning", "SKU", f"No numeric SKU found in '{raw_str}'",
+                             "Left SKU blank"))
+            return None, None, tuple(findings)
     else:
         sku = candidates[0]
         if len(candidates) > 1:
-            log_issue("Warning", sheet_name, date_val, line, row_ref,
-                      "SKU", f"Multiple 6+ digit candidates in '{raw_str}'; using first: {sku}",
-                      f"Used SKU={sku}")
+            findings.append(("Warning", "SKU",
+                             f"Multiple 6+ digit candidates in '{raw_str}'; using first: {sku}",
+                             f"Used SKU={sku}"))
 
     # Description extraction
     # Strategy:
@@ -261,9 +391,139 @@ def parse_sku(raw_text, sheet_name, date_val, line, row_ref):
         if desc_candidate:
             description = desc_candidate
 
+    return sku, description, tuple(findings)
+
+
+@lru_cache(maxsize=SKU_LRU_SIZE)
+def lookup_sku(raw_str):
+    """Resolve raw text via the SKU catalog (when in use), parsing only unknown texts."""
+    if _sku_catalog is not None:
+        hit = _sku_catalog.execute(
+            "SELECT SKU, Description, FindingsJSON FROM sku_catalog WHERE RawText = ? AND Version = ?",
+            (raw_str, EXTRACT_VERSION),
+        ).fetchone()
+        if hit is not None:
+            return hit[0], hit[1], tuple(tuple(f) for f in json.loads(hit[2]))
+    return parse_sku_text(raw_str)
+
+
+def parse_sku(raw_text, sheet_name, date_val, line, row_ref):
+    """
+    Extract SKU code and description from raw text, logging any findings
+    against this row. Returns (sku, description, raw_text).
+    """
+    if raw_text is None:
+        return None, None, None
+
+    raw_str = str(raw_text).strip()
+    if not raw_str:
+        return None, None, raw_str
+
+    sku, description, findings = lookup_sku(raw_str)
+    for severity, field, problem, action in findings:
+        log_issue(severity, sheet_name, date_val, line, row_ref, field, problem, action)
     return sku, description, raw_str
 
 
+# ──────────────────────────────────────────────────────────────────────
+# SKU CATALOG
+# ──────────────────────────────────────────────────────────────────────
+# The catalog maps every SKU raw text ever seen to its parse and first/last
+# schedule dates, and tracks which lines ran each SKU, so it doubles as a SKU
+# master for the Shift Flight Deck tblStandards.
+_sku_catalog = None
+_sku_catalog_path = None
+
+SKU_MASTER_COLUMNS = ["Line", "SKU", "ProductName", "Std_CPH"]
+
+
+def open_sku_catalog(catalog_path):
+    conn = sqlite3.connect(catalog_path, timeout=60)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sku_catalog ("
+        "RawText TEXT PRIMARY KEY, SKU TEXT, Description TEXT, FindingsJSON TEXT, Version TEXT, "
+        "FirstSeen TEXT, LastSeen TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sku_line_seen ("
+        "SKU TEXT, Line INTEGER, FirstSeen TEXT, LastSeen TEXT, PRIMARY KEY (SKU, Line))"
+    )
+    return conn
+
+
+def use_sku_catalog(catalog_path):
+    """Point lookup_sku at catalog_path (None to parse everything) for this process."""
+    global _sku_catalog, _sku_catalog_path
+    if catalog_path == _sku_catalog_path:
+        return
+    if _sku_catalog is not None:
+        _sku_catalog.close()
+    _sku_catalog = open_sku_catalog(catalog_path) if catalog_path else None
+    _sku_catalog_path = catalog_path
+    lookup_sku.cache_clear()
+
+
+def update_sku_catalog(catalog_path, all_rows):
+    """Record every SKU text and (SKU, Line) in all_rows with first/last seen dates."""
+    texts = {}
+    lines = {}
+    for rows in all_rows.values():
+        for r in rows:
+            day = r["Date"].isoformat()
+            if r["SKU_RawText"]:
+                first, last = texts.get(r["SKU_RawText"], (day, day))
+                texts[r["SKU_RawText"]] = (min(first, day), max(last, day))
+            if r["SKU"]:
+                first, last = lines.get((r["SKU"], r["Line"]), (day, day))
+                lines[(r["SKU"], r["Line"])] = (min(first, day), max(last, day))
+
+    conn = open_sku_catalog(catalog_path)
+    try:
+        with conn:
+            for raw_str, (first, last) in texts.items():
+                sku, description, findings = lookup_sku(raw_str)
+                conn.execute(
+                    "INSERT INTO sku_catalog VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(RawText) DO UPDATE SET "
+                    "SKU = excluded.SKU, Description = excluded.Description, "
+                    "FindingsJSON = excluded.FindingsJSON, Version = excluded.Version, "
+                    "FirstSeen = min(FirstSeen, excluded.FirstSeen), LastSeen = max(LastSeen, excluded.LastSeen)",
+                    (raw_str, sku, description, json.dumps(findings), EXTRACT_VERSION, first, last),
+                )
+            for (sku, line_num), (first, last) in lines.items():
+                conn.execute(
+                    "INSERT INTO sku_line_seen VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(SKU, Line) DO UPDATE SET "
+                    "FirstSeen = min(FirstSeen, excluded.FirstSeen), LastSeen = max(LastSeen, excluded.LastSeen)",
+                    (sku, line_num, first, last),
+                )
+    finally:
+        conn.close()
+
+
+def export_sku_master(catalog_path, csv_path):
+    """
+    Write one row per (Line, SKU) ever scheduled, in tblStandards column order.
+    ProductName is the most recently seen description; Std_CPH is left blank
+    for engineering to fill in. Returns the number of rows written.
+    """
+    conn = open_sku_catalog(catalog_path)
+    try:
+        rows = conn.execute(
+            "SELECT 'Line ' || l.Line, l.SKU, "
+            "(SELECT c.Description FROM sku_catalog c WHERE c.SKU = l.SKU AND c.Description IS NOT NULL "
+            " ORDER BY c.LastSeen DESC LIMIT 1), NULL "
+            "FROM sku_line_seen l ORDER BY l.Line, l.SKU"
+        ).fetchall()
+    finally:
+        conn.close()
+    with open(csv_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(SKU_MASTER_COLUMNS)
+        writer.writerows(rows)
+    return len(rows)
+
+
 # ──────────────────────────────────────────────────────────────────────
 # MAIN EXTRACTION
 # ──────────────────────────────────────────────────────────────────────
@@ -297,172 +557,384 @@ def is_schedule_row_line_num(cell_a_val):
     return None
 
 
+def extract_sheet(ws, sheet_name):
+    """
+    Extract schedule rows from one sheet in a single streaming pass.
+
+    The first HEADER_SCAN_ROWS rows are buffered so the sheet date and extra
+    header columns can be resolved before any data row is interpreted; the
+    rest of the sheet is consumed straight from ``iter_rows(values_only=True)``
+    while the current 'Line N' section is tracked as it goes.
+    Returns (date_val, [row dicts]); date_val is None when the sheet is skipped.
+    """
+    row_iter = ws.iter_rows(values_only=True)
+    header_rows = list(islice(row_iter, HEADER_SCAN_ROWS))
+
+    date_val = extract_date_from_sheet(header_rows, sheet_name)
+    if date_val is None:
+        return None, []
+
+    extra_cols_map, work_order_col = detect_extra_columns(header_rows)
+    width = max(8, work_order_col)
+
+    rows = []
+    current_line = None
+
+    for row_idx, row in enumerate(chain(header_rows, row_iter), 1):
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+
+        cell_a_val = row[0]
+        header_line = is_line_header(cell_a_val)
+        if header_line:
+            current_line = header_line
+            continue  # skip header rows
+
+        line_num = is_schedule_row_line_num(cell_a_val)
+
+        if line_num is None:
+            # Not a schedule row — but check if it has Target per Shift on a filler row
+            target_val = clean_val(row[5])
+            col_b_val = clean_val(row[1])
+            col_c_val = clean_val(row[2])
+            col_d_val = clean_val(row[3])
+
+            if target_val is not None and col_b_val is None and col_c_val is None and col_d_val is None:
+                log_issue("Info", sheet_name, date_val, current_line,
+                          row_idx, "Target_Per_Shift",
+                          f"Target per Shift ({target_val}) on filler row",
+                          "Ignored filler row")
+            continue
+
+        # We have a schedule row with line_num
+        col_b_raw, col_c, col_d, col_e, col_f, col_g, col_h = row[1:8]
+
+        # Check if col_b is empty and other fields too
+        col_b_clean = clean_val(col_b_raw)
+        col_c_clean = clean_val(col_c)
+        col_d_clean = clean_val(col_d)
+
+        if col_b_clean is None and col_c_clean is None and col_d_clean is None:
+            # Filler row even though it has line number in A
+            target_check = clean_val(col_f)
+            if target_check is not None:
+                log_issue("Info", sheet_name, date_val, line_num, row_idx,
+                          "Target_Per_Shift",
+                          f"Target ({target_check}) on row with line num but no SKU/Cases/Shifts",
+                          "Ignored filler row")
+            continue
+
+        if col_b_clean is None:
+            # Has Cases or Shifts but no SKU text
+            log_issue("Warning", sheet_name, date_val, line_num, row_idx,
+                      "SKU", "Missing SKU text but other fields present",
+                      "Extracted with blank SKU")
+
+        # Parse SKU
+        sku, description, raw_text = parse_sku(col_b_clean, sheet_name, date_val, line_num, row_idx)
+
+        # Parse numeric fields
+        cases_planned = to_numeric(col_c, "Cases_Planned", sheet_name, date_val, line_num, row_idx)
+        shifts_planned = to_numeric(col_d, "Shifts_Planned", sheet_name, date_val, line_num, row_idx)
+        cases_completed = to_numeric(col_e, "Cases_Completed", sheet_name, date_val, line_num, row_idx)
+        target_per_shift = to_numeric(col_f, "Target_Per_Shift", sheet_name, date_val, line_num, row_idx)
+
+        # Work order
+        work_order_val = clean_val(row[work_order_col - 1])
+
+        # Notes
+        notes_val = clean_val(col_h)
+
+        # Percent complete — compute, don't copy
+        pct_complete = None
+        if cases_planned is not None and cases_planned > 0 and cases_completed is not None:
+            pct_complete = cases_completed / cases_planned
+
+        # Extra fields: columns A-H are always known, so only look past them
+        extra_fields = {}
+        for col_idx, raw_val in enumerate(row[8:], 9):
+            if col_idx == work_order_col or raw_val is None:
+                continue
+            cell_val = clean_val(raw_val)
+            if cell_val is not None:
+                header = extra_cols_map.get(col_idx, get_column_letter(col_idx))
+                extra_fields[header] = cell_val
+
+        extra_json = json.dumps(extra_fields) if extra_fields else ""
+
+        # Sanity checks
+        if cases_planned is not None and cases_planned < 0:
+            log_issue("Warning", sheet_name, date_val, line_num, row_idx,
+                      "Cases_Planned", f"Negative value: {cases_planned}",
+                      "Kept as-is")
+        if shifts_planned is not None and shifts_planned < 0:
+            log_issue("Warning", sheet_name, date_val, line_num, row_idx,
+                      "Shifts_Planned", f"Negative value: {shifts_planned}",
+                      "Kept as-is")
+        if shifts_planned is not None and shifts_planned > 0 and target_per_shift is None:
+            log_issue("Warning", sheet_name, date_val, line_num, row_idx,
+                      "Target_Per_Shift", "Missing when Shifts > 0",
+                      "Left blank")
+
+        rows.append(ScheduleRow({
+            "Date": date_val,
+            "SourceSheet": sheet_name,
+            "Line": line_num,
+            "SKU": sku,
+            "SKU_RawText": raw_text,
+            "Description": description,
+            "Cases_Planned": cases_planned,
+            "Shifts_Planned": shifts_planned,
+            "Target_Per_Shift": target_per_shift,
+            "Cases_Completed": cases_completed,
+            "Percent_Complete": pct_complete,
+            "Notes": notes_val,
+            "WorkOrderMade": work_order_val,
+            "ExtraFields_JSON": extra_json,
+        }))
+
+    return date_val, rows
+
+
 def extract_all_rows(wb):
     """
     Main extraction: iterate all sheets, find line sections, extract schedule rows.
+    Each sheet is read exactly once (see extract_sheet); pass a workbook
+    opened with read_only=True so rows stream instead of being materialized.
     Returns dict: {line_num: [list of row dicts]}
     """
+    return merge_sheet_results(_extract_sheets(wb, wb.sheetnames))
+
+
+def _extract_sheets(wb, sheet_names):
+    """
+    Extract the named sheets, returning (sheet_name, date_val, rows, sheet_issues)
+    per sheet. Issues raised while extracting are captured per sheet rather
+    than logged, so they can be cached and fed to the log in sheet order by
+    merge_sheet_results().
+    """
+    global _issue_capture
+    results = []
+    try:
+        for sheet_name in sheet_names:
+            _issue_capture = []
+            date_val, rows = extract_sheet(wb[sheet_name], sheet_name)
+            results.append((sheet_name, date_val, rows, _issue_capture))
+    finally:
+        _issue_capture = None
+    return results
+
+
+def _extract_sheet_chunk(input_path, sheet_names, sku_catalog=None):
+    """Process-pool worker: extract a contiguous run of sheets."""
+    use_sku_catalog(sku_catalog)
+    wb = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        return _extract_sheets(wb, sheet_names)
+    finally:
+        wb.close()
+
+
+def merge_sheet_results(results):
+    """
+    Merge per-sheet (sheet_name, date_val, rows, sheet_issues) results in the
+    order given. Issues enter the run's log in that order, so merging in
+    workbook sheet order reproduces the serial Issue_ID numbering exactly.
+    """
     all_rows = defaultdict(list)
     sheets_processed = 0
     sheets_skipped = 0
 
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-
-        # Extract date
-        date_val = extract_date_from_sheet(ws, sheet_name)
+    for sheet_name, date_val, rows, sheet_issues in results:
+        issues.extend(sheet_issues)
         if date_val is None:
             sheets_skipped += 1
             continue
-
         sheets_processed += 1
+        for row_data in rows:
+            all_rows[row_data["Line"]].append(row_data)
+
+    return all_rows, sheets_processed, sheets_skipped
 
-        # Detect extra columns and work order column position
-        extra_cols_map, work_order_col = detect_extra_columns(ws)
-
-        # First pass: find all line header row positions
-        line_header_rows = []
-        for row_idx in range(1, ws.max_row + 1):
-            cell_a = ws.cell(row=row_idx, column=1).value
-            line_num = is_line_header(cell_a)
-            if line_num:
-                line_header_rows.append((row_idx, line_num))
-
-        # Determine current_line context for each row
-        # Build a mapping: row_idx -> current_line_context
-        # (the most recent line header above this row)
-        current_line_by_row = {}
-        current_line = None
-        header_row_set = {r for r, _ in line_header_rows}
-
-        for row_idx in range(1, ws.max_row + 1):
-            if row_idx in header_row_set:
-                for hr, ln in line_header_rows:
-                    if hr == row_idx:
-                        current_line = ln
-                        break
-            current_line_by_row[row_idx] = current_line
-
-        # Second pass: extract schedule rows
-        for row_idx in range(1, ws.max_row + 1):
-            if row_idx in header_row_set:
-                continue  # skip header rows
-
-            cell_a_val = ws.cell(row=row_idx, column=1).value
-            line_num = is_schedule_row_line_num(cell_a_val)
-
-            if line_num is None:
-                # Not a schedule row — but check if it has Target per Shift on a filler row
-                target_val = clean_val(ws.cell(row=row_idx, column=6).value)
-                col_b_val = clean_val(ws.cell(row=row_idx, column=2).value)
-                col_c_val = clean_val(ws.cell(row=row_idx, column=3).value)
-                col_d_val = clean_val(ws.cell(row=row_idx, column=4).value)
-                col_e_val = clean_val(ws.cell(row=row_idx, column=5).value)
-
-                if target_val is not None and col_b_val is None and col_c_val is None and col_d_val is None:
-                    log_issue("Info", sheet_name, date_val,
-                              current_line_by_row.get(row_idx, ""),
-                              row_idx, "Target_Per_Shift",
-                              f"Target per Shift ({target_val}) on filler row",
-                              "Ignored filler row")
-                continue
 
-            # We have a schedule row with line_num
-            col_b_raw = ws.cell(row=row_idx, column=2).value
-            col_c = ws.cell(row=row_idx, column=3).value
-            col_d = ws.cell(row=row_idx, column=4).value
-            col_e = ws.cell(row=row_idx, column=5).value
-            col_f = ws.cell(row=row_idx, column=6).value
-            col_g = ws.cell(row=row_idx, column=7).value
-            col_h = ws.cell(row=row_idx, column=8).value
-
-            # Check if col_b is empty and other fields too
-            col_b_clean = clean_val(col_b_raw)
-            col_c_clean = clean_val(col_c)
-            col_d_clean = clean_val(col_d)
-
-            if col_b_clean is None and col_c_clean is None and col_d_clean is None:
-                # Filler row even though it has line number in A
-                target_check = clean_val(col_f)
-                if target_check is not None:
-                    log_issue("Info", sheet_name, date_val, line_num, row_idx,
-                              "Target_Per_Shift",
-                              f"Target ({target_check}) on row with line num but no SKU/Cases/Shifts",
-                              "Ignored filler row")
+def extract_all_rows_parallel(input_path, max_workers=None, cache_path=None, stats=None, sku_catalog=None):
+    """
+    Extract every sheet of input_path across a process pool.
+    Rows, row order and Issue_ID numbering are identical to extract_all_rows();
+    runs in-process when only one worker or sheet needs extracting.
+
+    With cache_path, sheets whose fingerprint is already cached are served
+    from the cache and only new or changed sheets are extracted. If a stats
+    dict is given, it receives sheets_cached and sheets_extracted counts.
+    With sku_catalog, known SKU texts are resolved from that catalog.
+    """
+    (results,) = extract_workbooks([input_path], max_workers, cache_path, stats, sku_catalog)
+    return merge_sheet_results(results)
+
+
+def extract_workbooks(input_paths, max_workers=None, cache_path=None, stats=None, sku_catalog=None):
+    """
+    Extract every sheet of every input workbook, sharing one process pool
+    across all of them. Returns one list of per-sheet results per input, each
+    in workbook sheet order, ready for merge_sheet_results().
+    """
+    conn = open_sheet_cache(cache_path) if cache_path else None
+    sheet_names = []
+    fingerprints = []
+    cached = []
+    try:
+        for input_path in input_paths:
+            wb = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+            try:
+                sheet_names.append(list(wb.sheetnames))
+                fingerprints.append(sheet_fingerprints(input_path) if conn else {})
+            finally:
+                wb.close()
+            cached.append(load_cached_sheets(conn, input_path, fingerprints[-1]) if conn else {})
+
+        todo = [[name for name in names if name not in hits] for names, hits in zip(sheet_names, cached)]
+        total_todo = sum(len(names) for names in todo)
+        workers = min(max_workers or os.cpu_count() or 1, total_todo)
+        fresh = [[] for _ in input_paths]
+
+        if workers <= 1:
+            for i, input_path in enumerate(input_paths):
+                if todo[i]:
+                    fresh[i] = _extract_sheet_chunk(input_path, todo[i], sku_catalog)
+        else:
+            chunk_size = -(-total_todo // (workers * CHUNKS_PER_WORKER))
+            tasks = [(i, names[j:j + chunk_size]) for i, names in enumerate(todo)
+                     for j in range(0, len(names), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # map() yields in submission order, which keeps the merge deterministic
+                chunk_results = pool.map(_extract_sheet_chunk,
+                                         [input_paths[i] for i, _ in tasks],
+                                         [chunk for _, chunk in tasks],
+                                         [sku_catalog] * len(tasks))
+                for (i, _), results in zip(tasks, chunk_results):
+                    fresh[i].extend(results)
+
+        if conn is not None:
+            for input_path, results, prints in zip(input_paths, fresh, fingerprints):
+                store_cached_sheets(conn, input_path, results, prints)
+            prune_sheet_cache(conn, input_paths, fingerprints)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if stats is not None:
+        stats["sheets_cached"] = sum(len(hits) for hits in cached)
+        stats["sheets_extracted"] = sum(len(results) for results in fresh)
+
+    ordered = []
+    for names, results, hits in zip(sheet_names, fresh, cached):
+        by_name = {result[0]: result for result in results}
+        by_name.update(hits)
+        ordered.append([by_name[name] for name in names])
+    return ordered
+
+
+# ──────────────────────────────────────────────────────────────────────
+# INCREMENTAL SHEET CACHE
+# ──────────────────────────────────────────────────────────────────────
+def sheet_fingerprints(input_path):
+    """
+    Hash each sheet's cell values without parsing it: the raw worksheet XML is
+    hashed together with the text of every shared string it references, so a
+    day's sheet keeps its fingerprint even as other sheets add new strings.
+    Sheet parts and the string table are read from the package itself
+    (xl/workbook.xml and its relationships).
+    Returns {sheet_name: hex digest}.
+    """
+    fingerprints = {}
+    with zipfile.ZipFile(input_path) as zf:
+        strings = None
+        for sheet_name, part in sheet_parts(zf).items():
+            xml = zf.read(part)
+            digest = hashlib.sha256(EXTRACT_VERSION.encode("utf-8"))
+            digest.update(xml)
+            for idx in SHARED_STRING_REF.findall(xml):
+                if strings is None:
+                    strings = shared_strings(zf)
+                digest.update(b"\0" + strings[int(idx)].encode("utf-8"))
+            fingerprints[sheet_name] = digest.hexdigest()
+    return fingerprints
+
+
+def workbook_key(input_path):
+    """Cache identity of a source workbook: its resolved path."""
+    return os.path.realpath(input_path)
+
+
+def open_sheet_cache(cache_path):
+    # Batch runs may have several consolidations writing to the cache at once
+    conn = sqlite3.connect(cache_path, timeout=60)
+    with conn:
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(sheet_cache)")}
+        if columns and "Workbook" not in columns:
+            # Caches written before entries were keyed by workbook; start over
+            conn.execute("DROP TABLE sheet_cache")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sheet_cache ("
+            "Workbook TEXT, SheetName TEXT, Fingerprint TEXT, SheetDate TEXT, RowsJSON TEXT, IssuesJSON TEXT, "
+            "CachedAt TEXT, PRIMARY KEY (Workbook, SheetName, Fingerprint))"
+        )
+    return conn
+
+
+def load_cached_sheets(conn, input_path, fingerprints):
+    """Return {sheet_name: (sheet_name, date_val, rows, sheet_issues)} for cache hits."""
+    cached = {}
+    workbook = workbook_key(input_path)
+    for sheet_name, fingerprint in fingerprints.items():
+        hit = conn.execute(
+            "SELECT SheetDate, RowsJSON, IssuesJSON FROM sheet_cache WHERE Workbook = ? AND SheetName = ? AND Fingerprint = ?",
+            (workbook, sheet_name, fingerprint),
+        ).fetchone()
+        if hit is None:
+            continue
+        sheet_date, rows_json, issues_json = hit
+        date_val = datetime.date.fromisoformat(sheet_date) if sheet_date else None
+        rows = [ScheduleRow(r) for r in json.loads(rows_json)]
+        for row_data in rows:
+            row_data["Date"] = date_val
+        cached[sheet_name] = (sheet_name, date_val, rows, json.loads(issues_json))
+    return cached
+
+
+def store_cached_sheets(conn, input_path, results, fingerprints):
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    workbook = workbook_key(input_path)
+    with conn:
+        for sheet_name, date_val, rows, sheet_issues in results:
+            if sheet_name not in fingerprints:
                 continue
+            # Every row of a sheet shares the sheet date, stored once per entry
+            rows_json = json.dumps([{**r, "Date": None} for r in rows])
+            conn.execute(
+                "INSERT OR REPLACE INTO sheet_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (workbook, sheet_name, fingerprints[sheet_name], date_val.isoformat() if date_val else "",
+                 rows_json, json.dumps(sheet_issues), now),
+            )
 
-            if col_b_clean is None:
-                # Has Cases or Shifts but no SKU text
-                log_issue("Warning", sheet_name, date_val, line_num, row_idx,
-                          "SKU", "Missing SKU text but other fields present",
-                          "Extracted with blank SKU")
-
-            # Parse SKU
-            sku, description, raw_text = parse_sku(col_b_clean, sheet_name, date_val, line_num, row_idx)
-
-            # Parse numeric fields
-            cases_planned = to_numeric(col_c, "Cases_Planned", sheet_name, date_val, line_num, row_idx)
-            shifts_planned = to_numeric(col_d, "Shifts_Planned", sheet_name, date_val, line_num, row_idx)
-            cases_completed = to_numeric(col_e, "Cases_Completed", sheet_name, date_val, line_num, row_idx)
-            target_per_shift = to_numeric(col_f, "Target_Per_Shift", sheet_name, date_val, line_num, row_idx)
-
-            # Work order
-            work_order_val = clean_val(ws.cell(row=row_idx, column=work_order_col).value)
-
-            # Notes
-            notes_val = clean_val(col_h)
-
-            # Percent complete — compute, don't copy
-            pct_complete = None
-            if cases_planned is not None and cases_planned > 0 and cases_completed is not None:
-                pct_complete = cases_completed / cases_planned
-
-            # Extra fields: scan all columns beyond known ones
-            extra_fields = {}
-            for col_idx in range(1, ws.max_column + 1):
-                if col_idx in (1, 2, 3, 4, 5, 6, 7, 8, work_order_col):
-                    continue
-                cell_val = clean_val(ws.cell(row=row_idx, column=col_idx).value)
-                if cell_val is not None:
-                    header = extra_cols_map.get(col_idx, get_column_letter(col_idx))
-                    extra_fields[header] = cell_val
-
-            extra_json = json.dumps(extra_fields) if extra_fields else ""
-
-            # Sanity checks
-            if cases_planned is not None and cases_planned < 0:
-                log_issue("Warning", sheet_name, date_val, line_num, row_idx,
-                          "Cases_Planned", f"Negative value: {cases_planned}",
-                          "Kept as-is")
-            if shifts_planned is not None and shifts_planned < 0:
-                log_issue("Warning", sheet_name, date_val, line_num, row_idx,
-                          "Shifts_Planned", f"Negative value: {shifts_planned}",
-                          "Kept as-is")
-            if shifts_planned is not None and shifts_planned > 0 and target_per_shift is None:
-                log_issue("Warning", sheet_name, date_val, line_num, row_idx,
-                          "Target_Per_Shift", "Missing when Shifts > 0",
-                          "Left blank")
-
-            row_data = {
-                "Date": date_val,
-                "SourceSheet": sheet_name,
-                "Line": line_num,
-                "SKU": sku,
-                "SKU_RawText": raw_text,
-                "Description": description,
-                "Cases_Planned": cases_planned,
-                "Shifts_Planned": shifts_planned,
-                "Target_Per_Shift": target_per_shift,
-                "Cases_Completed": cases_completed,
-                "Percent_Complete": pct_complete,
-                "Notes": notes_val,
-                "WorkOrderMade": work_order_val,
-                "ExtraFields_JSON": extra_json,
-            }
-
-            all_rows[line_num].append(row_data)
 
-    return all_rows, sheets_processed, sheets_skipped
+def prune_sheet_cache(conn, input_paths, fingerprints):
+    """
+    Drop the cached sheets of this run's workbooks whose name and fingerprint
+    were not seen in it; other workbooks' entries are left alone.
+    """
+    workbooks = [workbook_key(p) for p in input_paths]
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_sheets (Workbook TEXT, SheetName TEXT, Fingerprint TEXT)")
+        conn.execute("DELETE FROM seen_sheets")
+        conn.executemany("INSERT INTO seen_sheets VALUES (?, ?, ?)",
+                         [(wb, *item) for wb, prints in zip(workbooks, fingerprints) for item in prints.items()])
+        conn.executemany(
+            "DELETE FROM sheet_cache WHERE Workbook = ? AND NOT EXISTS (SELECT 1 FROM seen_sheets s "
+            "WHERE s.Workbook = sheet_cache.Workbook AND s.SheetName = sheet_cache.SheetName "
+            "AND s.Fingerprint = sheet_cache.Fingerprint)",
+            [(wb,) for wb in set(workbooks)],
+        )
 
 
 # ──────────────────────────────────────────────────────────────────────
@@ -489,6 +961,170 @@ def detect_duplicates(all_rows):
     return dup_count
 
 
+def duplicate_key(r):
+    """Canonical text form of the duplicate key; 1000 and 1000.0 compare equal, as in detect_duplicates."""
+    def num(v):
+        return int(v) if isinstance(v, float) and v.is_integer() else v
+    return json.dumps([str(r["Date"]), r["Line"], r["SKU"], num(r["Cases_Planned"]), num(r["Shifts_Planned"])])
+
+
+def open_dup_index(index_path):
+    conn = sqlite3.connect(index_path, timeout=60)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schedule_keys ("
+        "Key TEXT PRIMARY KEY, Origin TEXT, FirstSeen TEXT) WITHOUT ROWID"
+    )
+    return conn
+
+
+def detect_history_duplicates(index_path, all_rows, workbook_stem=None):
+    """
+    Check every row against the persistent duplicate-key index of all earlier
+    consolidation runs, then add this run's new keys to it.
+
+    A row's origin is '<workbook stem>!<sheet>' (SourceSheet is already
+    qualified when workbook_stem is None). A key that the index attributes
+    to an origin outside this run is a duplicate of an earlier run's row.
+    Keys from this run's own sheets are skipped, so re-running a workbook
+    flags nothing, and in-run duplicates stay with detect_duplicates().
+    Each row is one primary-key lookup, and only the index lives on disk.
+    """
+    def origin_of(r):
+        return r["SourceSheet"] if workbook_stem is None else f"{workbook_stem}!{r['SourceSheet']}"
+
+    run_origins = {origin_of(r) for rows in all_rows.values() for r in rows}
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    dup_count = 0
+
+    conn = open_dup_index(index_path)
+    try:
+        # Take the write lock up front so concurrent runs check-and-insert atomically
+        conn.execute("BEGIN IMMEDIATE")
+        for line_num in sorted(all_rows):
+            for i, r in enumerate(all_rows[line_num]):
+                key = duplicate_key(r)
+                hit = conn.execute("SELECT Origin, FirstSeen FROM schedule_keys WHERE Key = ?", (key,)).fetchone()
+                if hit is None:
+                    conn.execute("INSERT INTO schedule_keys VALUES (?, ?, ?)", (key, origin_of(r), now))
+                elif hit[0] not in run_origins:
+                    log_issue("Warning", r["SourceSheet"], r["Date"], r["Line"],
+                              f"data row {i+1}", "Duplicate",
+                              f"Duplicate of row consolidated earlier from {hit[0]} ({hit[1]}): "
+                              f"Date={r['Date']}, Line={r['Line']}, SKU={r['SKU']}, "
+                              f"Cases={r['Cases_Planned']}, Shifts={r['Shifts_Planned']}",
+                              "Kept (not deleted)")
+                    dup_count += 1
+        conn.commit()
+    finally:
+        conn.close()
+    return dup_count
+
+
+# ──────────────────────────────────────────────────────────────────────
+# AGGREGATION
+# ──────────────────────────────────────────────────────────────────────
+SUMMARY_MEASURES = ("cases_planned", "shifts_planned", "completed",
+                    "weighted_pct_num", "weighted_pct_den", "count")
+
+
+def _group_totals(keys, measures):
+    """
+    Sum every measure column per distinct row of the integer key matrix.
+    Returns (unique keys sorted lexicographically, {measure: totals array}).
+    """
+    uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    totals = {m: np.bincount(inverse, weights=col, minlength=len(uniq)) for m, col in measures.items()}
+    return uniq, totals
+
+
+def _as_number(v):
+    """Plain int for whole-number totals (as the row-by-row sums produced), else float."""
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+
+def _totals_dict(totals, idx=None):
+    t = {m: _as_number(col if idx is None else col[idx]) for m, col in totals.items()}
+    t["avg_pct"] = t["weighted_pct_num"] / t["weighted_pct_den"] if t["weighted_pct_den"] > 0 else None
+    return t
+
+
+def summarize_schedule(all_rows):
+    """
+    Aggregate all extracted rows in one columnar pass.
+
+    Rows are read once into NumPy measure columns keyed by day ordinal, line
+    and SKU code; every rollup is then a bincount over those columns.
+    Returns {"overall": totals, "date_line" | "week_line" | "month_line" |
+    "line_sku": [(key, totals)] sorted by key, "line_totals": {line: totals}},
+    where totals holds SUMMARY_MEASURES plus the weighted "avg_pct".
+    """
+    ordinals, lines, skus = [], [], []
+    values = {m: [] for m in SUMMARY_MEASURES}
+    for rows in all_rows.values():
+        for r in rows:
+            cp = r["Cases_Planned"] or 0
+            weighted = r["Percent_Complete"] is not None and cp > 0
+            ordinals.append(r["Date"].toordinal())
+            lines.append(r["Line"])
+            skus.append(r["SKU"] or "")
+            values["cases_planned"].append(cp)
+            values["shifts_planned"].append(r["Shifts_Planned"] or 0)
+            values["completed"].append(r["Cases_Completed"] or 0)
+            values["weighted_pct_num"].append(r["Percent_Complete"] * cp if weighted else 0)
+            values["weighted_pct_den"].append(cp if weighted else 0)
+            values["count"].append(1)
+
+    measures = {m: np.asarray(col, dtype=np.float64) for m, col in values.items()}
+    ordinal = np.asarray(ordinals, dtype=np.int64)
+    line = np.asarray(lines, dtype=np.int64)
+
+    # Calendar keys are derived per distinct day, then broadcast to rows
+    days, day_idx = np.unique(ordinal, return_inverse=True)
+    day_dates = [datetime.date.fromordinal(int(o)) for o in days]
+    iso_week = np.asarray([d.isocalendar()[0] * 100 + d.isocalendar()[1] for d in day_dates], dtype=np.int64)
+    month = np.asarray([d.year * 100 + d.month for d in day_dates], dtype=np.int64)
+    sku_names, sku_idx = np.unique(np.asarray(skus, dtype=str), return_inverse=True)
+
+    def grouped(first, second, label):
+        uniq, totals = _group_totals(np.column_stack([first, second]), measures)
+        return [(label(a, b), _totals_dict(totals, i)) for i, (a, b) in enumerate(uniq.tolist())]
+
+    summary = {
+        "overall": _totals_dict({m: col.sum() for m, col in measures.items()}),
+        "date_line": grouped(ordinal, line, lambda o, ln: (datetime.date.fromordinal(o), ln)),
+        "week_line": grouped(iso_week[day_idx] if len(days) else ordinal, line,
+                             lambda w, ln: (f"{w // 100}-W{w % 100:02d}", ln)),
+        "month_line": grouped(month[day_idx] if len(days) else ordinal, line,
+                              lambda m, ln: (f"{m // 100}-{m % 100:02d}", ln)),
+        "line_sku": grouped(line, sku_idx, lambda ln, k: (ln, str(sku_names[k]) or None)),
+    }
+    line_uniq, line_totals = _group_totals(line.reshape(-1, 1), measures)
+    summary["line_totals"] = {int(k[0]): _totals_dict(line_totals, i) for i, k in enumerate(line_uniq)}
+    return summary
+
+
+def reconcile_summary(summary, all_rows):
+    """Check Summary totals against the per-line accumulators and line-sheet row counts."""
+    overall = summary["overall"]
+    line_totals = {"cases_planned": 0, "count": 0}
+    for line_num in LINE_NUMBERS:
+        t = summary["line_totals"].get(line_num)
+        if t:
+            line_totals["cases_planned"] += t["cases_planned"]
+    line_totals["count"] = sum(len(all_rows.get(line_num, [])) for line_num in LINE_NUMBERS)
+
+    if not math.isclose(line_totals["cases_planned"], overall["cases_planned"], rel_tol=1e-9, abs_tol=1e-6):
+        log_issue("Error", "Summary", "", "", "", "Reconciliation",
+                  f"Summary cases_planned ({overall['cases_planned']}) != line sheets sum ({line_totals['cases_planned']})",
+                  "Check for data issues")
+    if line_totals["count"] != overall["count"]:
+        log_issue("Error", "Summary", "", "", "", "Reconciliation",
+                  f"Summary row count ({overall['count']}) != line sheets sum ({line_totals['count']})",
+                  "Check for data issues")
+
+
 # ──────────────────────────────────────────────────────────────────────
 # OUTPUT WORKBOOK
 # ──────────────────────────────────────────────────────────────────────
@@ -502,15 +1138,67 @@ THIN_BORDER = Border(
     bottom=Side(style='thin'),
 )
 
+HEADER_ALIGN = Alignment(horizontal="center")
+README_TITLE_FONT = Font(bold=True, size=14)
+SUMMARY_TITLE_FONT = Font(bold=True, size=12)
+
+DATE_FORMAT = 'm/d/yyyy'
+COUNT_FORMAT = '#,##0'
+PCT_FORMAT = '0.0%'
+
 LINE_SHEET_COLUMNS = [
     "Date", "SourceSheet", "Line", "SKU", "SKU_RawText", "Description",
     "Cases_Planned", "Shifts_Planned", "Target_Per_Shift", "Cases_Completed",
     "Percent_Complete", "Notes", "WorkOrderMade", "ExtraFields_JSON",
 ]
 
+# Number format per line-sheet column (applied only to non-empty values)
+LINE_SHEET_FORMATS = {
+    "Date": DATE_FORMAT,
+    "Cases_Planned": COUNT_FORMAT,
+    "Shifts_Planned": COUNT_FORMAT,
+    "Target_Per_Shift": COUNT_FORMAT,
+    "Cases_Completed": COUNT_FORMAT,
+    "Percent_Complete": PCT_FORMAT,
+}
+
+
+# The output workbook is opened with write_only=True: rows are serialized as
+# they are appended, so column widths and freeze panes must be set before the
+# first append, while tables, filters and conditional formats can follow.
+# Style objects above are module-level and shared; openpyxl deduplicates them
+# into one style table, so per-cell cost is only the transient WriteOnlyCell.
+def styled_cell(ws, value, font=None, fill=None, alignment=None, number_format=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    if number_format is not None:
+        cell.number_format = number_format
+    return cell
+
+
+def header_row(ws, headers):
+    return [styled_cell(ws, h, font=HEADER_FONT_WHITE, fill=HEADER_FILL, alignment=HEADER_ALIGN)
+            for h in headers]
+
+
+def formatted(ws, value, number_format):
+    """Attach number_format to a value, leaving blanks as plain empty cells."""
+    if value is None:
+        return None
+    return styled_cell(ws, value, number_format=number_format)
+
+
+def to_excel_date(d):
+    return datetime.datetime(d.year, d.month, d.day)
+
 
 def write_readme(wb_out, all_rows, sheets_processed, sheets_skipped):
-    ws = wb_out.create_sheet("README", 0)
+    ws = wb_out.create_sheet("README")
 
     total_rows = sum(len(rows) for rows in all_rows.values())
     per_line = {ln: len(all_rows.get(ln, [])) for ln in LINE_NUMBERS}
@@ -552,216 +1240,111 @@ def write_readme(wb_out, all_rows, sheets_processed, sheets_skipped):
 
     readme_lines += [
         [],
-        [f"  Issues logged: {len(issues)}"],
-        [f"    Info: {sum(1 for i in issues if i['Severity'] == 'Info')}"],
-        [f"    Warning: {sum(1 for i in issues if i['Severity'] == 'Warning')}"],
-        [f"    Error: {sum(1 for i in issues if i['Severity'] == 'Error')}"],
+        [f"  Issues logged: {issues.total} ({len(issues)} distinct entries)"],
+        [f"    Info: {issues.severity_counts['Info']}"],
+        [f"    Warning: {issues.severity_counts['Warning']}"],
+        [f"    Error: {issues.severity_counts['Error']}"],
+        [],
+        ["  Issues by field:"],
+    ]
+    readme_lines += [[f"    {field}: {count}"] for field, count in sorted(issues.field_counts.items())]
+    readme_lines += [
+        [],
+        ["Identical issues (same severity, line, field, problem and action) are listed once on"],
+        ["'Assumptions & Data Issues' with their first sheet/row, Occurrences and LastSheet."],
     ]
-
-    for i, line_data in enumerate(readme_lines, 1):
-        for j, val in enumerate(line_data, 1):
-            cell = ws.cell(row=i, column=j, value=val)
-            if i == 1:
-                cell.font = Font(bold=True, size=14)
 
     ws.column_dimensions['A'].width = 90
     ws.freeze_panes = "A2"
 
+    for i, line_data in enumerate(readme_lines, 1):
+        if i == 1:
+            line_data = [styled_cell(ws, val, font=README_TITLE_FONT) for val in line_data]
+        ws.append(line_data)
+
 
 def write_issues(wb_out):
     ws = wb_out.create_sheet("Assumptions & Data Issues")
 
+    # SheetName/Date/RowRef are the first occurrence of a collapsed entry
     headers = ["Issue_ID", "Severity", "SheetName", "Date", "Line",
-               "RowRef", "Field", "Problem", "ActionTaken"]
-
-    for col_idx, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=h)
-        cell.font = HEADER_FONT_WHITE
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(horizontal="center")
-
-    for row_idx, issue in enumerate(issues, 2):
-        for col_idx, key in enumerate(headers, 1):
-            ws.cell(row=row_idx, column=col_idx, value=issue.get(key, ""))
+               "RowRef", "Field", "Problem", "ActionTaken", "Occurrences", "LastSheet"]
 
     # Auto-fit (approximate)
     col_widths = {"Issue_ID": 10, "Severity": 10, "SheetName": 16, "Date": 12,
-                  "Line": 6, "RowRef": 8, "Field": 18, "Problem": 60, "ActionTaken": 40}
+                  "Line": 6, "RowRef": 8, "Field": 18, "Problem": 60, "ActionTaken": 40,
+                  "Occurrences": 12, "LastSheet": 16}
     for col_idx, key in enumerate(headers, 1):
         ws.column_dimensions[get_column_letter(col_idx)].width = col_widths.get(key, 15)
 
     ws.freeze_panes = "A2"
     ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{max(2, len(issues) + 1)}"
 
+    ws.append(header_row(ws, headers))
+    for issue in issues:
+        ws.append([issue.get(key, "") for key in headers])
 
-def write_summary(wb_out, all_rows):
+
+def write_summary(wb_out, summary):
     ws = wb_out.create_sheet("Summary")
 
     headers = ["Date", "Line", "Total_Planned_Cases", "Total_Planned_Shifts",
                "Total_Completed_Cases", "Avg_Pct_Complete_Weighted", "Count_SKUs"]
+    overall = summary["overall"]
 
-    # Build summary data
-    summary_data = defaultdict(lambda: {
-        "cases_planned": 0, "shifts_planned": 0, "completed": 0,
-        "weighted_pct_num": 0, "weighted_pct_den": 0, "count": 0
-    })
-
-    for line_num, rows in all_rows.items():
-        for r in rows:
-            key = (r["Date"], r["Line"])
-            s = summary_data[key]
-            cp = r["Cases_Planned"] or 0
-            sp = r["Shifts_Planned"] or 0
-            cc = r["Cases_Completed"] or 0
-            s["cases_planned"] += cp
-            s["shifts_planned"] += sp
-            s["completed"] += cc
-            s["count"] += 1
-            if r["Percent_Complete"] is not None and cp > 0:
-                s["weighted_pct_num"] += r["Percent_Complete"] * cp
-                s["weighted_pct_den"] += cp
-
-    # Sort by date, then line
-    sorted_keys = sorted(summary_data.keys(), key=lambda k: (k[0], k[1]))
-
-    # Overall totals
-    overall = {"cases_planned": 0, "shifts_planned": 0, "completed": 0,
-               "weighted_pct_num": 0, "weighted_pct_den": 0, "count": 0}
-    for s in summary_data.values():
-        overall["cases_planned"] += s["cases_planned"]
-        overall["shifts_planned"] += s["shifts_planned"]
-        overall["completed"] += s["completed"]
-        overall["weighted_pct_num"] += s["weighted_pct_num"]
-        overall["weighted_pct_den"] += s["weighted_pct_den"]
-        overall["count"] += s["count"]
-
-    # Write overall totals at top
-    ws.cell(row=1, column=1, value="OVERALL TOTALS").font = Font(bold=True, size=12)
-    overall_headers = ["", "", "Total_Planned_Cases", "Total_Planned_Shifts",
-                       "Total_Completed_Cases", "Avg_Pct_Complete_Weighted", "Count_SKUs"]
-    for col_idx, h in enumerate(overall_headers, 1):
-        cell = ws.cell(row=2, column=col_idx, value=h)
-        cell.font = HEADER_FONT
-
-    overall_avg_pct = (overall["weighted_pct_num"] / overall["weighted_pct_den"]
-                       if overall["weighted_pct_den"] > 0 else None)
-    overall_vals = ["", "", overall["cases_planned"], overall["shifts_planned"],
-                    overall["completed"], overall_avg_pct, overall["count"]]
-    for col_idx, v in enumerate(overall_vals, 1):
-        cell = ws.cell(row=3, column=col_idx, value=v)
-        if col_idx == 6 and v is not None:
-            cell.number_format = '0.0%'
-
-    # Blank row
+    # Widths and freeze panes precede the first streamed row
     start_row = 5
-
-    # Column headers for detail
-    for col_idx, h in enumerate(headers, 1):
-        cell = ws.cell(row=start_row, column=col_idx, value=h)
-        cell.font = HEADER_FONT_WHITE
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(horizontal="center")
-
-    for i, key in enumerate(sorted_keys, start_row + 1):
-        date_val, line_num = key
-        s = summary_data[key]
-        avg_pct = (s["weighted_pct_num"] / s["weighted_pct_den"]
-                   if s["weighted_pct_den"] > 0 else None)
-
-        ws.cell(row=i, column=1, value=datetime.datetime(date_val.year, date_val.month, date_val.day)).number_format = 'm/d/yyyy'
-        ws.cell(row=i, column=2, value=line_num)
-        ws.cell(row=i, column=3, value=s["cases_planned"])
-        ws.cell(row=i, column=4, value=s["shifts_planned"])
-        ws.cell(row=i, column=5, value=s["completed"])
-        cell_pct = ws.cell(row=i, column=6, value=avg_pct)
-        if avg_pct is not None:
-            cell_pct.number_format = '0.0%'
-        ws.cell(row=i, column=7, value=s["count"])
-
-    # Widths
     col_widths_sum = [12, 6, 20, 20, 22, 26, 12]
     for col_idx, w in enumerate(col_widths_sum, 1):
         ws.column_dimensions[get_column_letter(col_idx)].width = w
 
     ws.freeze_panes = f"A{start_row + 1}"
 
-    # Reconciliation: verify totals match line sheets
-    line_totals = {"cases_planned": 0, "shifts_planned": 0, "completed": 0, "count": 0}
-    for line_num in LINE_NUMBERS:
-        for r in all_rows.get(line_num, []):
-            line_totals["cases_planned"] += (r["Cases_Planned"] or 0)
-            line_totals["shifts_planned"] += (r["Shifts_Planned"] or 0)
-            line_totals["completed"] += (r["Cases_Completed"] or 0)
-            line_totals["count"] += 1
-
-    if line_totals["cases_planned"] != overall["cases_planned"]:
-        log_issue("Error", "Summary", "", "", "", "Reconciliation",
-                  f"Summary cases_planned ({overall['cases_planned']}) != line sheets sum ({line_totals['cases_planned']})",
-                  "Check for data issues")
-    if line_totals["count"] != overall["count"]:
-        log_issue("Error", "Summary", "", "", "", "Reconciliation",
-                  f"Summary row count ({overall['count']}) != line sheets sum ({line_totals['count']})",
-                  "Check for data issues")
+    # Write overall totals at top
+    ws.append([styled_cell(ws, "OVERALL TOTALS", font=SUMMARY_TITLE_FONT)])
+    overall_headers = ["", "", "Total_Planned_Cases", "Total_Planned_Shifts",
+                       "Total_Completed_Cases", "Avg_Pct_Complete_Weighted", "Count_SKUs"]
+    ws.append([styled_cell(ws, h, font=HEADER_FONT) for h in overall_headers])
+    ws.append(["", "", overall["cases_planned"], overall["shifts_planned"],
+               overall["completed"], formatted(ws, overall["avg_pct"], PCT_FORMAT), overall["count"]])
+
+    # Blank row, then column headers for detail
+    ws.append([])
+    ws.append(header_row(ws, headers))
+
+    for (date_val, line_num), s in summary["date_line"]:
+        ws.append([
+            styled_cell(ws, to_excel_date(date_val), number_format=DATE_FORMAT),
+            line_num,
+            s["cases_planned"],
+            s["shifts_planned"],
+            s["completed"],
+            formatted(ws, s["avg_pct"], PCT_FORMAT),
+            s["count"],
+        ])
 
     return overall
 
 
-def write_line_sheet(wb_out, line_num, rows):
-    sheet_name = f"Line {line_num}"
-    ws = wb_out.create_sheet(sheet_name)
+def write_rollup_sheet(wb_out, title, key_headers, key_widths, groups, count_header="Count_SKUs"):
+    """Write one rollup ((key, totals) pairs from summarize_schedule) as a filterable sheet."""
+    ws = wb_out.create_sheet(title)
+    headers = key_headers + ["Total_Planned_Cases", "Total_Planned_Shifts",
+                             "Total_Completed_Cases", "Avg_Pct_Complete_Weighted", count_header]
+    for col_idx, w in enumerate(key_widths + [20, 20, 22, 26, 12], 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = w
+    ws.freeze_panes = "A2"
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{max(2, len(groups) + 1)}"
 
-    # Header row
-    for col_idx, h in enumerate(LINE_SHEET_COLUMNS, 1):
-        cell = ws.cell(row=1, column=col_idx, value=h)
-        cell.font = HEADER_FONT_WHITE
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(horizontal="center")
+    ws.append(header_row(ws, headers))
+    for key, s in groups:
+        ws.append(list(key) + [s["cases_planned"], s["shifts_planned"], s["completed"],
+                               formatted(ws, s["avg_pct"], PCT_FORMAT), s["count"]])
 
-    # Sort rows by Date, then by original order (stable sort preserves extraction order)
-    rows_sorted = sorted(rows, key=lambda r: r["Date"])
 
-    for row_idx, r in enumerate(rows_sorted, 2):
-        # Date
-        d = r["Date"]
-        cell_date = ws.cell(row=row_idx, column=1,
-                            value=datetime.datetime(d.year, d.month, d.day))
-        cell_date.number_format = 'm/d/yyyy'
-
-        ws.cell(row=row_idx, column=2, value=r["SourceSheet"])
-        ws.cell(row=row_idx, column=3, value=r["Line"])
-        ws.cell(row=row_idx, column=4, value=r["SKU"])
-        ws.cell(row=row_idx, column=5, value=r["SKU_RawText"])
-        ws.cell(row=row_idx, column=6, value=r["Description"])
-
-        # Cases_Planned — integer format
-        cp = r["Cases_Planned"]
-        cell_cp = ws.cell(row=row_idx, column=7, value=cp)
-        if cp is not None:
-            cell_cp.number_format = '#,##0'
-
-        sp = r["Shifts_Planned"]
-        cell_sp = ws.cell(row=row_idx, column=8, value=sp)
-        if sp is not None:
-            cell_sp.number_format = '#,##0'
-
-        tps = r["Target_Per_Shift"]
-        cell_tps = ws.cell(row=row_idx, column=9, value=tps)
-        if tps is not None:
-            cell_tps.number_format = '#,##0'
-
-        cc = r["Cases_Completed"]
-        cell_cc = ws.cell(row=row_idx, column=10, value=cc)
-        if cc is not None:
-            cell_cc.number_format = '#,##0'
-
-        pct = r["Percent_Complete"]
-        cell_pct = ws.cell(row=row_idx, column=11, value=pct)
-        if pct is not None:
-            cell_pct.number_format = '0.0%'
-
-        ws.cell(row=row_idx, column=12, value=r["Notes"])
-        ws.cell(row=row_idx, column=13, value=r["WorkOrderMade"])
-        ws.cell(row=row_idx, column=14, value=r["ExtraFields_JSON"])
+def write_line_sheet(wb_out, line_num, rows):
+    sheet_name = f"Line {line_num}"
+    ws = wb_out.create_sheet(sheet_name)
 
     # Column widths
     col_widths_line = {
@@ -774,6 +1357,17 @@ def write_line_sheet(wb_out, line_num, rows):
     # Freeze panes: top row + first 3 columns
     ws.freeze_panes = "D2"
 
+    ws.append(header_row(ws, LINE_SHEET_COLUMNS))
+
+    # Sort rows by Date, then by original order (stable sort preserves extraction order)
+    rows_sorted = sorted(rows, key=lambda r: r["Date"])
+    formats = [LINE_SHEET_FORMATS.get(col) for col in LINE_SHEET_COLUMNS]
+
+    for r in rows_sorted:
+        values = [r[col] for col in LINE_SHEET_COLUMNS]
+        values[0] = to_excel_date(values[0])
+        ws.append([formatted(ws, v, fmt) if fmt else v for v, fmt in zip(values, formats)])
+
     # Create Excel Table
     last_row = max(2, len(rows_sorted) + 1)
     last_col_letter = get_column_letter(len(LINE_SHEET_COLUMNS))
@@ -786,7 +1380,13 @@ def write_line_sheet(wb_out, line_num, rows):
         showLastColumn=False, showRowStripes=True, showColumnStripes=False
     )
     table.tableStyleInfo = style
-    ws.add_table(table)
+    # Write-only sheets cannot read headings back from cells; declare them
+    table.tableColumns = [TableColumn(id=i, name=h) for i, h in enumerate(LINE_SHEET_COLUMNS, 1)]
+    table.autoFilter = AutoFilter(ref=table_ref)
+    with warnings.catch_warnings():
+        # openpyxl warns on every write-only table, even with columns declared
+        warnings.simplefilter("ignore", UserWarning)
+        ws.add_table(table)
 
     # Conditional formatting
     # Range for data rows (excluding header)
@@ -809,65 +1409,248 @@ def write_line_sheet(wb_out, line_num, rows):
     ws.conditional_formatting.add(sku_range,
         CellIsRule(operator='equal', formula=['""'], fill=light_orange))
 
-    # Also update the sorted rows back (for consistency)
-    all_rows_for_line = rows_sorted
     return len(rows_sorted)
 
 
 # ──────────────────────────────────────────────────────────────────────
-# MAIN
+# CONSOLIDATION RUNS
 # ──────────────────────────────────────────────────────────────────────
-def main():
-    print("Loading input workbook...")
-    wb = openpyxl.load_workbook(INPUT_PATH, data_only=True)
-
-    print("Extracting schedule rows...")
-    all_rows, sheets_processed, sheets_skipped = extract_all_rows(wb)
-
-    print("Detecting duplicates...")
-    dup_count = detect_duplicates(all_rows)
+def write_output(output_path, all_rows, sheets_processed, sheets_skipped):
+    """Write the by-line workbook; returns {line_num: rows written}."""
+    wb_out = openpyxl.Workbook(write_only=True)
 
-    print("Creating output workbook...")
-    wb_out = openpyxl.Workbook()
-    # Remove default sheet
-    wb_out.remove(wb_out.active)
+    # Reconcile first so any errors reach the README counts and the issues sheet
+    summary = summarize_schedule(all_rows)
+    reconcile_summary(summary, all_rows)
 
-    # Write sheets
+    # Write sheets (write-only sheets keep creation order)
     write_readme(wb_out, all_rows, sheets_processed, sheets_skipped)
     write_issues(wb_out)
-    write_summary(wb_out, all_rows)
+    write_summary(wb_out, summary)
+    write_rollup_sheet(wb_out, "Weekly Summary", ["ISO_Week", "Line"], [12, 6], summary["week_line"])
+    write_rollup_sheet(wb_out, "Monthly Summary", ["Month", "Line"], [10, 6], summary["month_line"])
+    write_rollup_sheet(wb_out, "SKU Summary", ["Line", "SKU"], [6, 12], summary["line_sku"], "Count_Rows")
 
+    line_counts = {}
     for ln in LINE_NUMBERS:
-        rows = all_rows.get(ln, [])
-        row_count = write_line_sheet(wb_out, ln, rows)
-        print(f"  Line {ln}: {row_count} rows written")
+        line_counts[ln] = write_line_sheet(wb_out, ln, all_rows.get(ln, []))
+
+    wb_out.save(output_path)
+    return line_counts
+
+
+def finish_consolidation(output_path, all_rows, sheets_processed, sheets_skipped, stats,
+                         sku_catalog=None, dup_index=None, workbook_stem=None):
+    """
+    Detect duplicates (in-run and, with dup_index, against earlier runs),
+    write the output, update the SKU catalog and fill in the run stats.
+    """
+    if sku_catalog:
+        update_sku_catalog(sku_catalog, all_rows)
+    stats["duplicates"] = detect_duplicates(all_rows)
+    stats["history_duplicates"] = (detect_history_duplicates(dup_index, all_rows, workbook_stem)
+                                   if dup_index else 0)
+    stats["line_rows"] = write_output(output_path, all_rows, sheets_processed, sheets_skipped)
+    stats["output"] = str(output_path)
+    stats["sheets_processed"] = sheets_processed
+    stats["sheets_skipped"] = sheets_skipped
+    stats["rows"] = sum(stats["line_rows"].values())
+    stats["issues"] = dict(issues.severity_counts)
+    stats["issue_entries"] = len(issues)
+    return stats
+
+
+def consolidate(input_path, output_path, max_workers=None, cache_path=None, sku_catalog=None, dup_index=None):
+    """Consolidate one schedule workbook into one by-line workbook; returns run stats."""
+    started = time.perf_counter()
+    issues.clear()
+    stats = {"inputs": [str(input_path)]}
+    all_rows, sheets_processed, sheets_skipped = extract_all_rows_parallel(
+        input_path, max_workers, cache_path, stats, sku_catalog)
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    finish_consolidation(output_path, all_rows, sheets_processed, sheets_skipped, stats,
+                         sku_catalog, dup_index, stem)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def consolidate_merged(input_paths, output_path, max_workers=None, cache_path=None, sku_catalog=None,
+                       dup_index=None):
+    """
+    Consolidate several schedule workbooks into a single by-line workbook.
+    Sheets from all inputs share one process pool. SourceSheet and issue
+    SheetName are qualified as '<workbook stem>!<sheet>' so rows stay traceable.
+    """
+    started = time.perf_counter()
+    issues.clear()
+    stats = {"inputs": [str(p) for p in input_paths]}
+    per_input = extract_workbooks(input_paths, max_workers, cache_path, stats, sku_catalog)
+
+    results = []
+    for input_path, sheet_results in zip(input_paths, per_input):
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        for sheet_name, date_val, rows, sheet_issues in sheet_results:
+            label = f"{stem}!{sheet_name}"
+            for row_data in rows:
+                row_data["SourceSheet"] = label
+            for issue in sheet_issues:
+                issue["SheetName"] = label
+            results.append((label, date_val, rows, sheet_issues))
+
+    all_rows, sheets_processed, sheets_skipped = merge_sheet_results(results)
+    finish_consolidation(output_path, all_rows, sheets_processed, sheets_skipped, stats,
+                         sku_catalog, dup_index)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def consolidate_many(jobs, max_workers=None, cache_path=None, sku_catalog=None, dup_index=None):
+    """
+    Run (input_path, output_path) jobs, one workbook per pool process.
+    A single job keeps the per-sheet pool instead. Stats come back in job order.
+    With dup_index, whichever of two overlapping workbooks finishes second
+    reports the cross-workbook duplicates.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [consolidate(src, dst, max_workers, cache_path, sku_catalog, dup_index) for src, dst in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(consolidate, src, dst, 1, cache_path, sku_catalog, dup_index) for src, dst in jobs]
+        return [f.result() for f in futures]
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories (their .xlsx/.xlsm files) and globs, in order, without repeats."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.xlsx")) + glob.glob(os.path.join(pattern, "*.xlsm")))
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            # Skip Excel's "~$" lock files for workbooks that are open
+            if os.path.basename(path).startswith("~$") or path in paths:
+                continue
+            paths.append(path)
+    return paths
 
-    # Save
-    print(f"Saving to {OUTPUT_PATH}...")
-    wb_out.save(OUTPUT_PATH)
-    print("Done!")
 
-    # Print run log
+def output_path_for(input_path, output_dir):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem} - By Line.xlsx")
+
+
+def print_run_log(stats):
     print("\n" + "=" * 60)
     print("RUN LOG")
     print("=" * 60)
-    print(f"Sheets processed: {sheets_processed}")
-    print(f"Sheets skipped:   {sheets_skipped}")
+    print(f"Sheets processed: {stats['sheets_processed']}")
+    print(f"Sheets skipped:   {stats['sheets_skipped']}")
+    print(f"Sheets from cache: {stats['sheets_cached']}")
 
-    total = 0
     for ln in LINE_NUMBERS:
-        cnt = len(all_rows.get(ln, []))
-        total += cnt
-        print(f"  Line {ln}: {cnt} rows")
-    print(f"  TOTAL: {total} rows")
-    print(f"Duplicates found: {dup_count}")
-
-    sev_counts = defaultdict(int)
-    for i in issues:
-        sev_counts[i["Severity"]] += 1
-    print(f"Issues logged: {len(issues)}")
+        print(f"  Line {ln}: {stats['line_rows'][ln]} rows")
+    print(f"  TOTAL: {stats['rows']} rows")
+    print(f"Duplicates found: {stats['duplicates']}")
+    print(f"Duplicates of earlier runs: {stats['history_duplicates']}")
+
+    print(f"Issues logged: {sum(stats['issues'].values())} ({stats['issue_entries']} distinct entries)")
     for sev in ["Info", "Warning", "Error"]:
-        print(f"  {sev}: {sev_counts[sev]}")
+        print(f"  {sev}: {stats['issues'].get(sev, 0)}")
+
+
+def print_batch_log(all_stats, elapsed):
+    print("\n" + "=" * 60)
+    print("BATCH RUN LOG")
+    print("=" * 60)
+    for stats in all_stats:
+        print(f"{stats['output']}: {stats['rows']} rows from {stats['sheets_processed']} sheets "
+              f"({stats['sheets_cached']} cached) in {stats['seconds']:.1f}s")
+
+    totals = defaultdict(int)
+    for stats in all_stats:
+        for key in ("sheets_processed", "sheets_skipped", "sheets_cached", "rows", "duplicates",
+                    "history_duplicates"):
+            totals[key] += stats[key]
+        for sev, count in stats["issues"].items():
+            totals[sev] += count
+    print(f"Workbooks:        {sum(len(s['inputs']) for s in all_stats)}")
+    print(f"Sheets processed: {totals['sheets_processed']}")
+    print(f"Sheets skipped:   {totals['sheets_skipped']}")
+    print(f"Sheets from cache: {totals['sheets_cached']}")
+    print(f"Rows:             {totals['rows']}")
+    print(f"Duplicates found: {totals['duplicates']}")
+    print(f"Duplicates of earlier runs: {totals['history_duplicates']}")
+    print(f"Issues logged:    {sum(totals[sev] for sev in ('Info', 'Warning', 'Error'))} "
+          f"(Info {totals['Info']}, Warning {totals['Warning']}, Error {totals['Error']})")
+    print(f"Elapsed:          {elapsed:.1f}s ({totals['rows'] / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidate Daily Production Schedule workbooks by line.")
+    parser.add_argument("inputs", nargs="*", default=[INPUT_PATH],
+                        help="Schedule workbooks, directories or glob patterns")
+    parser.add_argument("--output", help="Output workbook (single input or --merge)")
+    parser.add_argument("--output-dir", help="Directory for one '<input> - By Line.xlsx' per input")
+    parser.add_argument("--merge", action="store_true", help="Write all inputs into one by-line workbook")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Worker processes (default: all cores)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Per-sheet extraction cache (SQLite)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extract every sheet")
+    parser.add_argument("--sku-catalog", default=SKU_CATALOG_PATH, help="Persistent SKU catalog (SQLite)")
+    parser.add_argument("--no-sku-catalog", action="store_true", help="Do not read or update the SKU catalog")
+    parser.add_argument("--dup-index", default=DUP_INDEX_PATH,
+                        help="Duplicate-key index shared across runs (SQLite)")
+    parser.add_argument("--no-dup-index", action="store_true", help="Only detect duplicates within this run")
+    parser.add_argument("--export-sku-master", metavar="CSV",
+                        help="After consolidating, write the catalog as a tblStandards-shaped SKU master")
+    args = parser.parse_args(argv)
+
+    input_paths = expand_inputs(args.inputs)
+    if not input_paths:
+        parser.error("no input workbooks found")
+    cache_path = None if args.no_cache else args.cache
+    sku_catalog = None if args.no_sku_catalog else args.sku_catalog
+    dup_index = None if args.no_dup_index else args.dup_index
+
+    started = time.perf_counter()
+    with run_metrics.track_run("consolidate_schedules", " ".join(input_paths)):
+        if args.merge or (len(input_paths) == 1 and not args.output_dir):
+            output_path = args.output or OUTPUT_PATH
+            print(f"Consolidating {len(input_paths)} workbook(s) into {output_path}...")
+            with run_metrics.stage("consolidate"):
+                if len(input_paths) == 1:
+                    all_stats = [consolidate(input_paths[0], output_path, args.workers, cache_path, sku_catalog,
+                                             dup_index)]
+                else:
+                    all_stats = [consolidate_merged(input_paths, output_path, args.workers, cache_path, sku_catalog,
+                                                    dup_index)]
+        else:
+            if args.output:
+                parser.error("--output needs a single input or --merge; use --output-dir")
+            output_dir = args.output_dir or os.path.dirname(OUTPUT_PATH)
+            os.makedirs(output_dir, exist_ok=True)
+            jobs = [(path, output_path_for(path, output_dir)) for path in input_paths]
+            print(f"Consolidating {len(jobs)} workbook(s) into {output_dir}...")
+            with run_metrics.stage("consolidate"):
+                all_stats = consolidate_many(jobs, args.workers, cache_path, sku_catalog, dup_index)
+        run_metrics.record_rows("consolidated", sum(stats["rows"] for stats in all_stats))
+        elapsed = time.perf_counter() - started
+        print("Done!")
+
+        if args.export_sku_master:
+            if not sku_catalog:
+                parser.error("--export-sku-master needs the SKU catalog")
+            with run_metrics.stage("sku_master"):
+                count = export_sku_master(sku_catalog, args.export_sku_master)
+            print(f"SKU master: {count} (Line, SKU) rows written to {args.export_sku_master}")
+
+    if len(all_stats) == 1:
+        print_run_log(all_stats[0])
+    else:
+        print_batch_log(all_stats, elapsed)
 
 
 if __name__ == "__main__":
@@ -4,18 +4,45 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import glob
+import heapq
+import importlib.util
 import json
+import math
+import os
 import re
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any
-
-from openpyxl import load_workbook
+from typing import Any, Callable
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+import archive_history
+import run_metrics
+import trigger_cooldown
+from build_or_repair_workbook import DEFAULT_RULES
+from forecast import RunRateForecaster
+from normalize import Normalizer
+from records import record_type
+from reference_data import ReferenceIndex, load_reference_index
+from schedule_integrity import ScheduleIssue, scan_schedule
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_WORKBOOK = REPO_ROOT / "excel" / "Shift_Flight_Deck.xlsm"
 DEFAULT_RULES_JSON = REPO_ROOT / "data" / "rules.json"
 LOG_DIR = REPO_ROOT / "data" / "logs"
+# Data Quality lists at most this many bad cells; the count covers all of them
+NORMALIZE_REPORT_LIMIT = 25
+# First Dash_Shift row of the per-line forecast block
+FORECAST_ROW = 14
+# Analysis_Report lists the top triggers; Recommended Actions the top few of those
+TRIGGER_REPORT_LIMIT = 50
+RECOMMENDED_ACTIONS_LIMIT = 10
+EXPORT_DIR = REPO_ROOT / "exports"
 
 SEVERITY_ORDER = {"Urgent": 4, "Action": 3, "Watch": 2, "Info": 1}
 REQ_RULE_COLS = [
@@ -23,9 +50,28 @@ REQ_RULE_COLS = [
     "Thresholds", "WindowHours", "ConsecutiveHours", "AppliesToLine", "AppliesToMachine", "AppliesToSKU", "Version",
     "LastEditedBy", "LastEditedDT",
 ]
-
-
-@dataclass
+HOURLY_DERIVED = ("StdCasesThisHour", "RateAttain_100", "TargetAttain")
+# Scope dimension -> column, per table that the rules engine reads
+SCOPE_COLUMNS = {
+    "schedule": {"Line": "Line", "SKU": "SKU"},
+    "hourly": {"Line": "Line", "SKU": "SKU_Resolved"},
+    "downtime": {"Line": "Line", "Machine": "Machine"},
+}
+# Engine table -> (sheet, Excel table)
+RULE_TABLES = {
+    "schedule": ("Schedule_Entry", "tblSchedule"),
+    "hourly": ("Hourly_Log", "tblHourly"),
+    "downtime": ("Downtime_Log", "tblDowntime"),
+}
+# Columns read by the analyzer itself (derived hourly columns and report sections), whatever the rules
+BASE_COLUMNS = {
+    "schedule": {"StartDT", "EndDT", "PlannedCases", "Order"},
+    "hourly": {"Date", "Shift", "HourEndingDT", "ActualCases", "Std_CPH", "TargetRateAttain"},
+    "downtime": set(),
+}
+
+
+@dataclass(slots=True)
 class Trigger:
     rule_id: str
     severity: str
@@ -36,22 +82,43 @@ class Trigger:
     affected_entity: str
     timestamp: str
     impact: float
+    line: str = ""
+    # Still inside its rule's cooldown: left out of Analysis_Report, kept for plant reports and history
+    suppressed: bool = False
 
 
-def table_rows(ws, table_name: str) -> list[dict[str, Any]]:
+def table_rows(ws, table_name: str, columns: set[str] | None = None, normalizer: Normalizer | None = None) -> list[dict[str, Any]]:
+    """Read a table as row records (dicts for other tables); with ``columns``, only those columns are materialized.
+
+    A row is kept when any of its cells has a value, projected or not, so row counts do not depend on ``columns``.
+    With ``normalizer``, cells are converted to their declared types and bad cells are logged on it.
+    """
     tab = ws.tables[table_name]
     min_cell, max_cell = tab.ref.split(":")
     min_col = ord(min_cell[0]) - 64
     min_row = int(min_cell[1:])
     max_col = ord(max_cell[0]) - 64
     max_row = int(max_cell[1:])
-    headers = [ws.cell(min_row, c).value for c in range(min_col, max_col + 1)]
+    headers = [(ws.cell(min_row, c).value, c) for c in range(min_col, max_col + 1)]
+    skipped = []
+    if columns is not None:
+        skipped = [c for h, c in headers if h not in columns]
+        headers = [(h, c) for h, c in headers if h in columns]
+    names = [h for h, _ in headers]
+    record = record_type(table_name, names)
     data = []
     for r in range(min_row + 1, max_row + 1):
-        row = {headers[i]: ws.cell(r, min_col + i).value for i in range(len(headers))}
-        if any(v not in (None, "") for v in row.values()):
-            row["_sheet_row"] = r
-            data.append(row)
+        vals = [ws.cell(r, c).value for _, c in headers]
+        # The columns left out are only read when the projected ones are all blank
+        if any(v not in (None, "") for v in vals) or any(ws.cell(r, c).value not in (None, "") for c in skipped):
+            if record is not None:
+                data.append(record.from_values(names, vals, r))
+            else:
+                row = dict(zip(names, vals))
+                row["_sheet_row"] = r
+                data.append(row)
+    if normalizer is not None:
+        normalizer.normalize_rows(table_name, ws.title, [(h, get_column_letter(c)) for h, c in headers], data)
     return data
 
 
@@ -78,18 +145,27 @@ def parse_call(expr: str) -> tuple[str, dict[str, Any]]:
 
 
 
-def to_float(v: Any) -> float:
-    if isinstance(v, (int, float)):
-        return float(v)
-    if v in (None, ""):
-        return 0.0
-    txt = str(v).strip()
-    if txt.startswith("="):
-        return 0.0
-    try:
-        return float(txt)
-    except ValueError:
-        return 0.0
+def derive_hourly_columns(hourly_rows: list[dict[str, Any]], ref: ReferenceIndex) -> list[dict[str, Any]]:
+    """Compute the tblHourly formula columns from the reference tables instead of trusting cached values.
+
+    Std_CPH comes from tblStandards by (Line, SKU_Resolved) and TargetRateAttain from tblLines by Line,
+    falling back to the row's own value. Results that divide by a missing standard or target are None.
+    """
+    if not hourly_rows:
+        return hourly_rows
+    actual = np.array([r.get("ActualCases") or 0.0 for r in hourly_rows], dtype=float)
+    std = np.array([ref.std_cph(r.get("Line"), r.get("SKU_Resolved")) or r.get("Std_CPH") or 0.0 for r in hourly_rows], dtype=float)
+    target = np.array([ref.target(r.get("Line")) or r.get("TargetRateAttain") or 0.0 for r in hourly_rows], dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(std > 0, actual / std, np.nan)
+        attain = np.where(target > 0, rate / target, np.nan)
+
+    for row, std_cases, rate_v, attain_v in zip(hourly_rows, std.tolist(), rate.tolist(), attain.tolist()):
+        row["StdCasesThisHour"] = std_cases if std_cases > 0 else None
+        row["RateAttain_100"] = None if math.isnan(rate_v) else rate_v
+        row["TargetAttain"] = None if math.isnan(attain_v) else attain_v
+    return hourly_rows
+
 
 def parse_iflogic(iflogic: str) -> list[tuple[str, dict[str, Any]]]:
     chunks = [c.strip() for c in re.split(r"\s+AND\s+", iflogic)]
@@ -100,7 +176,7 @@ def rolling_count(events: list[dict[str, Any]], window_hours: int, by: list[str]
     cutoff = dt.datetime.now() - dt.timedelta(hours=window_hours)
     counts: dict[tuple, int] = {}
     for e in events:
-        t = parse_dt(e.get("StartDT") or e.get("HourEndingDT"))
+        t = e.get("StartDT") or e.get("HourEndingDT")
         if t and t >= cutoff:
             key = tuple(e.get(k) for k in by)
             counts[key] = counts.get(key, 0) + 1
@@ -112,7 +188,9 @@ def consecutive_below(metric_series: list[dict[str, Any]], threshold: float, con
     grouped: dict[tuple, list[float]] = {}
     for row in metric_series:
         key = tuple(row.get(g) for g in groupby)
-        grouped.setdefault(key, []).append(to_float(row.get(metric)))
+        if row.get(metric) is None:
+            continue
+        grouped.setdefault(key, []).append(row.get(metric))
     for key, values in grouped.items():
         streak = 0
         for v in values[-consecutive_hours * 2:]:
@@ -134,26 +212,15 @@ def forecast_shortfall(planned: float, forecast: float, pct_threshold: float) ->
     return ((planned - forecast) / planned) >= pct_threshold
 
 
-def missing_standard(line: str, sku: str, standards: set[tuple[str, str]]) -> bool:
-    return (line, sku) not in standards
-
-
-def schedule_overlap(schedule_rows: list[dict[str, Any]], line: str) -> bool:
-    slots = sorted(
-        [(parse_dt(r.get("StartDT")), parse_dt(r.get("EndDT"))) for r in schedule_rows if r.get("Line") == line],
-        key=lambda x: x[0] or dt.datetime.min,
-    )
-    for i in range(1, len(slots)):
-        if slots[i - 1][1] and slots[i][0] and slots[i][0] < slots[i - 1][1]:
-            return True
-    return False
+def missing_standard(line: str, sku: str, ref: ReferenceIndex) -> bool:
+    return not ref.has_standard(line, sku)
 
 
 def missing_schedule_for_hourly(schedule_rows: list[dict[str, Any]], line: str, hour: dt.datetime) -> bool:
     for r in schedule_rows:
         if r.get("Line") != line:
             continue
-        st, en = parse_dt(r.get("StartDT")), parse_dt(r.get("EndDT"))
+        st, en = r.get("StartDT"), r.get("EndDT")
         if st and en and st <= hour <= en:
             return False
     return True
@@ -165,19 +232,6 @@ def outlier_rate(actual: float, std: float, z_or_pct_threshold: float) -> bool:
     return abs(actual - std) / std >= z_or_pct_threshold
 
 
-def parse_dt(v: Any):
-    if isinstance(v, dt.datetime):
-        return v
-    if not v:
-        return None
-    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
-        try:
-            return dt.datetime.strptime(str(v), fmt)
-        except ValueError:
-            pass
-    return None
-
-
 def lint_rules(rules: list[dict[str, Any]]) -> list[str]:
     issues: list[str] = []
     ids = [r.get("RuleID") for r in rules]
@@ -192,9 +246,13 @@ def lint_rules(rules: list[dict[str, Any]]) -> list[str]:
         if r.get("Scope") not in {"Line", "Machine", "Operator", "Shift"}:
             issues.append(f"Row {i}: invalid Scope")
         try:
-            parse_iflogic(str(r.get("IfLogic", "")))
+            calls = parse_iflogic(str(r.get("IfLogic", "")))
         except Exception as exc:
             issues.append(f"Row {i}: DSL parse error {exc}")
+        else:
+            unknown = sorted({fn for fn, _ in calls if fn not in DSL_FUNCTIONS})
+            if unknown:
+                issues.append(f"Row {i}: unknown DSL function {', '.join(unknown)}")
     return issues
 
 
@@ -205,65 +263,222 @@ def sanitize_recommendation(text: str) -> str:
     return text
 
 
-def evaluate_rules(rules, schedule_rows, hourly_rows, downtime_rows, standards_rows) -> list[Trigger]:
-    standards = {(r.get("Line"), r.get("SKU")) for r in standards_rows}
+def scope_values(value: Any) -> frozenset[str] | None:
+    """Parse an AppliesTo* cell; blank or ``*`` means unscoped (None)."""
+    txt = str(value or "").strip()
+    if txt in ("", "*"):
+        return None
+    return frozenset(p.strip() for p in txt.split(",") if p.strip())
+
+
+def rule_scope(rule: dict[str, Any]) -> dict[str, frozenset[str] | None]:
+    return {
+        "Line": scope_values(rule.get("AppliesToLine")),
+        "Machine": scope_values(rule.get("AppliesToMachine")),
+        "SKU": scope_values(rule.get("AppliesToSKU")),
+    }
+
+
+class Partitions:
+    """Rows of each table pre-partitioned by Line/Machine/SKU so scoped rules only touch their slice."""
+
+    def __init__(self, tables: dict[str, list[dict[str, Any]]], ref: ReferenceIndex | None = None):
+        self.tables = tables
+        self.index: dict[tuple[str, str], dict[str, list[dict[str, Any]]]] = {}
+        for table, rows in tables.items():
+            for dim, col in SCOPE_COLUMNS[table].items():
+                parts: dict[str, list[dict[str, Any]]] = {}
+                for r in rows:
+                    parts.setdefault(str(r.get(col)), []).append(r)
+                self.index[(table, dim)] = parts
+        # Tables without a Machine column are narrowed to the lines that own the machines
+        self.machine_lines = {m: line for line, ms in ref.machines_by_line.items() for m in ms} if ref else {}
+        self._cache: dict[tuple, list[dict[str, Any]]] = {}
+
+    def rows(self, table: str, scope: dict[str, frozenset[str] | None]) -> list[dict[str, Any]]:
+        dims = SCOPE_COLUMNS[table]
+        wanted = {d: v for d, v in scope.items() if v is not None and d in dims}
+        machines = scope.get("Machine")
+        if machines is not None and "Machine" not in dims:
+            # A machine that no line owns (e.g. a typo) matches no rows rather than every line
+            owners = frozenset(self.machine_lines[m] for m in machines if m in self.machine_lines)
+            wanted["Line"] = wanted["Line"] & owners if "Line" in wanted else owners
+        if not wanted:
+            return self.tables[table]
+        key = (table, tuple(sorted(wanted.items(), key=lambda kv: kv[0])))
+        if key in self._cache:
+            return self._cache[key]
+
+        # Scan the smallest matching partition and filter it by the remaining dimensions
+        def size(item):
+            return sum(len(self.index[(table, item[0])].get(v, ())) for v in item[1])
+
+        dim, values = min(wanted.items(), key=size)
+        picked = [r for v in values for r in self.index[(table, dim)].get(v, ())]
+        if len(values) > 1:
+            picked.sort(key=lambda r: r.get("_sheet_row", 0))
+        rest = [(dims[d], v) for d, v in wanted.items() if d != dim]
+        if rest:
+            picked = [r for r in picked if all(str(r.get(col)) in v for col, v in rest)]
+        self._cache[key] = picked
+        return picked
+
+
+@dataclass
+class RuleContext:
+    """Rows in the rule's scope plus the reference index, as seen by DSL functions."""
+
+    rows: dict[str, list[dict[str, Any]]]
+    ref: ReferenceIndex
+    forecast: RunRateForecaster | None = None
+    schedule_issues: list[ScheduleIssue] | None = None
+
+
+@dataclass(frozen=True)
+class DslFunction:
+    name: str
+    inputs: Callable[[dict[str, Any]], dict[str, list[str]]]
+    impl: Callable[[dict[str, Any], RuleContext], set[tuple]]
+
+
+DSL_FUNCTIONS: dict[str, DslFunction] = {}
+
+
+def dsl_function(name: str, inputs: dict[str, list[str]] | Callable[[dict[str, Any]], dict[str, list[str]]]):
+    """Register a DSL function with the tables/columns it reads (a dict, or a callable of the call's args)."""
+    def register(impl):
+        resolve = inputs if callable(inputs) else (lambda args: inputs)
+        DSL_FUNCTIONS[name] = DslFunction(name, resolve, impl)
+        return impl
+    return register
+
+
+def _split(value: Any) -> list[str]:
+    return [p for p in str(value).split(",") if p]
+
+
+def _rolling_group(args: dict[str, Any]) -> list[str]:
+    return _split(str(args.get("where", "Line={Line}")).replace("={Line}", "")) or ["Line"]
+
+
+@dsl_function("CONSEC_BELOW", lambda a: {"hourly": _split(a.get("groupby", "Line")) + [str(a.get("metric", "TargetAttain"))]})
+def _consec_below(args, ctx):
+    group = _split(args.get("groupby", "Line"))
+    return set(consecutive_below(ctx.rows["hourly"], float(args.get("threshold", 0.7)), int(args.get("hours", 2)), group, str(args.get("metric", "TargetAttain"))))
+
+
+@dsl_function("ROLLING_COUNT", lambda a: {"downtime": _rolling_group(a) + ["StartDT"]})
+def _rolling_count(args, ctx):
+    counts = rolling_count(ctx.rows["downtime"], int(args.get("window_hours", 2)), _rolling_group(args))
+    return {k for k, v in counts.items() if v >= int(args.get("min", 1))}
+
+
+@dsl_function("MISSING_STANDARD", {"hourly": ["Line", "SKU_Resolved"]})
+def _missing_standard(args, ctx):
+    return {(r.get("Line"), r.get("SKU_Resolved")) for r in ctx.rows["hourly"] if missing_standard(r.get("Line"), r.get("SKU_Resolved"), ctx.ref)}
+
+
+def _schedule_issue_lines(ctx, kind: str, min_minutes: float = 0) -> set[tuple]:
+    issues = ctx.schedule_issues if ctx.schedule_issues is not None else scan_schedule(ctx.rows["schedule"], ctx.ref.lines)
+    lines = {r.get("Line") for r in ctx.rows["schedule"]}
+    return {(i.line,) for i in issues if i.kind == kind and i.line in lines and i.minutes >= min_minutes}
+
+
+@dsl_function("SCHEDULE_OVERLAP", {"schedule": ["Line", "StartDT", "EndDT"]})
+def _schedule_overlap(args, ctx):
+    return _schedule_issue_lines(ctx, "overlap")
+
+
+@dsl_function("SCHEDULE_GAP", {"schedule": ["Line", "StartDT", "EndDT"]})
+def _schedule_gap(args, ctx):
+    return _schedule_issue_lines(ctx, "gap", float(args.get("min_minutes", 0)))
+
+
+@dsl_function("REPEAT_CAUSE", lambda a: {"downtime": _split(a.get("groupby", "Line,Machine,Cause")) + ["Cause", "StartDT"]})
+def _repeat_cause(args, ctx):
+    group = _split(args.get("groupby", "Line,Machine,Cause"))
+    return set(repeats_same_value(ctx.rows["downtime"], "Cause", int(args.get("min_repeats", 3)), int(args.get("window_hours", 12)), group[:-1]))
+
+
+@dsl_function("FORECAST_SHORTFALL", {"hourly": ["Line", "ActualCases", "HourEndingDT"], "schedule": ["Line", "PlannedCases", "EndDT"]})
+def _forecast_shortfall(args, ctx):
+    # Projections are per line, so a SKU-scoped rule still sees its lines' whole-shift forecast
+    forecaster = ctx.forecast or RunRateForecaster.from_rows(ctx.rows["schedule"], ctx.rows["hourly"])
+    pct = float(args.get("pct", 0.1))
+    hit = set()
+    for line in {r.get("Line") for r in ctx.rows["hourly"]}:
+        p = forecaster.projection(line)
+        if forecast_shortfall(p["planned"], p["projected"], pct):
+            hit.add((line,))
+    return hit
+
+
+def load_dsl_plugin(path: Path):
+    """Load a site module whose ``register(dsl_function)`` adds plant-specific DSL functions."""
+    spec = importlib.util.spec_from_file_location(f"dsl_plugin_{path.stem}", path)
+    if not spec or not spec.loader:
+        raise ValueError(f"Cannot load DSL plugin: {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.register(dsl_function)
+
+
+def required_columns(rules: list[dict[str, Any]]) -> dict[str, set[str]]:
+    """Union of the columns the analyzer itself and every enabled rule's DSL calls read, per table."""
+    needed = {table: set(cols) for table, cols in BASE_COLUMNS.items()}
+    for table, dims in SCOPE_COLUMNS.items():
+        needed[table].update(dims.values())
+    for rule in rules:
+        if str(rule.get("Enabled", "")).upper() != "TRUE":
+            continue
+        try:
+            calls = parse_iflogic(str(rule.get("IfLogic", "")))
+        except ValueError:
+            continue
+        for fn, args in calls:
+            if fn in DSL_FUNCTIONS:
+                for table, cols in DSL_FUNCTIONS[fn].inputs(args).items():
+                    needed.setdefault(table, set()).update(cols)
+    return needed
+
+
+def evaluate_rules(rules, schedule_rows, hourly_rows, downtime_rows, ref: ReferenceIndex,
+                   forecaster: RunRateForecaster | None = None, schedule_issues: list[ScheduleIssue] | None = None) -> list[Trigger]:
+    """Every enabled rule's triggers, in rule order; ``rank_triggers`` picks the top ones."""
     triggers: list[Trigger] = []
+    forecaster = forecaster or RunRateForecaster.from_rows(schedule_rows, hourly_rows)
+    if schedule_issues is None:
+        schedule_issues = scan_schedule(schedule_rows, ref.lines)
+    partitions = Partitions({"schedule": schedule_rows, "hourly": hourly_rows, "downtime": downtime_rows}, ref)
+    known_lines = set(ref.lines) | {r.get("Line") for rows in (schedule_rows, hourly_rows, downtime_rows) for r in rows}
 
     for rule in rules:
         if str(rule.get("Enabled", "")).upper() != "TRUE":
             continue
         parsed = parse_iflogic(str(rule.get("IfLogic", "")))
-        rule_hits = []
-
-        for fn, args in parsed:
-            if fn == "CONSEC_BELOW":
-                group = str(args.get("groupby", "Line")).split(",")
-                hits = consecutive_below(hourly_rows, float(args.get("threshold", 0.7)), int(args.get("hours", 2)), group, str(args.get("metric", "TargetAttain")))
-                rule_hits.append(set(hits))
-            elif fn == "ROLLING_COUNT":
-                group = [g for g in str(args.get("where", "Line={Line}")).replace("={Line}", "").split(",") if g]
-                counts = rolling_count(downtime_rows, int(args.get("window_hours", 2)), group or ["Line"])
-                hit = {k for k, v in counts.items() if v >= int(args.get("min", 1))}
-                rule_hits.append(hit)
-            elif fn == "MISSING_STANDARD":
-                hit = {(r.get("Line"), r.get("SKU_Resolved")) for r in hourly_rows if missing_standard(r.get("Line"), r.get("SKU_Resolved"), standards)}
-                rule_hits.append(hit)
-            elif fn == "SCHEDULE_OVERLAP":
-                lines = {r.get("Line") for r in schedule_rows}
-                hit = {(l,) for l in lines if schedule_overlap(schedule_rows, l)}
-                rule_hits.append(hit)
-            elif fn == "REPEAT_CAUSE":
-                group = str(args.get("groupby", "Line,Machine,Cause")).split(",")
-                hit = set(repeats_same_value(downtime_rows, "Cause", int(args.get("min_repeats", 3)), int(args.get("window_hours", 12)), group[:-1]))
-                rule_hits.append(hit)
-            elif fn == "FORECAST_SHORTFALL":
-                by_line = {}
-                for r in hourly_rows:
-                    by_line.setdefault(r.get("Line"), []).append(to_float(r.get("ActualCases")))
-                planned_by_line = {}
-                for r in schedule_rows:
-                    planned_by_line[r.get("Line")] = planned_by_line.get(r.get("Line"), 0) + to_float(r.get("PlannedCases"))
-                hit = set()
-                for line, vals in by_line.items():
-                    rolling = sum(vals[-3:]) / max(min(3, len(vals)), 1)
-                    forecast = sum(vals) + rolling * 2
-                    if forecast_shortfall(planned_by_line.get(line, 0), forecast, float(args.get("pct", 0.1))):
-                        hit.add((line,))
-                rule_hits.append(hit)
+        scope = rule_scope(rule)
+        ctx = RuleContext({table: partitions.rows(table, scope) for table in SCOPE_COLUMNS}, ref, forecaster, schedule_issues)
+        rule_hits = [set(DSL_FUNCTIONS[fn].impl(args, ctx)) for fn, args in parsed if fn in DSL_FUNCTIONS]
 
         if not rule_hits:
             continue
         inter = set.intersection(*rule_hits) if len(rule_hits) > 1 else set(rule_hits[0])
+        # One copy of the per-rule text for all of the rule's triggers
+        now = dt.datetime.now().isoformat(timespec="seconds")
+        recommendation = sanitize_recommendation(str(rule.get("ThenRecommendation", "")))
         for h in inter:
             entity = ",".join(str(x) for x in h if x not in (None, ""))
-            now = dt.datetime.now().isoformat(timespec="seconds")
-            recommendation = sanitize_recommendation(str(rule.get("ThenRecommendation", "")))
-            triggers.append(Trigger(rule.get("RuleID", ""), rule.get("Severity", "Info"), str(rule.get("Description", "")), str(rule.get("IfLogic", "")), recommendation, rule.get("Scope", "Line"), entity or "Unknown", now, float(len(entity))))
+            line = next((str(x) for x in h if x in known_lines and x not in (None, "")), "")
+            triggers.append(Trigger(rule.get("RuleID", ""), rule.get("Severity", "Info"), str(rule.get("Description", "")), str(rule.get("IfLogic", "")), recommendation, rule.get("Scope", "Line"), entity or "Unknown", now, float(len(entity)), line))
 
-    triggers.sort(key=lambda t: (-SEVERITY_ORDER.get(t.severity, 0), -t.impact, t.timestamp), reverse=False)
     return triggers
 
 
+def rank_triggers(triggers: list[Trigger], k: int) -> list[Trigger]:
+    """The ``k`` highest-ranked triggers (severity, then impact, then earliest), best first, without sorting them all."""
+    return heapq.nsmallest(k, triggers, key=lambda t: (-SEVERITY_ORDER.get(t.severity, 0), -t.impact, t.timestamp))
+
+
 def select_rules(wb, rules_json: Path):
     ws = wb["Rules_Authoring"]
     rules = table_rows(ws, "tblRules")
@@ -272,12 +487,35 @@ def select_rules(wb, rules_json: Path):
     if rules_json.exists():
         payload = json.loads(rules_json.read_text(encoding="utf-8"))
         return payload.get("rules", []), "json"
-    from scripts.build_or_repair_workbook import DEFAULT_RULES
-
     return DEFAULT_RULES, "default"
 
 
-def write_analysis_report(wb, sections: dict[str, list[str]], triggers: list[Trigger], lint_issues: list[str]):
+def shared_rules(rules_json: Path) -> list[dict[str, Any]]:
+    """Rule set applied to every workbook in a plant run: the rules JSON, else the defaults."""
+    if rules_json.exists():
+        return json.loads(rules_json.read_text(encoding="utf-8")).get("rules", [])
+    return DEFAULT_RULES
+
+
+def write_line_forecast(wb, projections: list[dict[str, Any]]):
+    """Per-line end-of-shift projections on Dash_Shift, below the data quality block."""
+    ws = wb["Dash_Shift"]
+    if ws.max_row >= FORECAST_ROW:
+        ws.delete_rows(FORECAST_ROW, ws.max_row - FORECAST_ROW + 1)
+    ws.cell(FORECAST_ROW, 1, "Line Forecast (end of shift)").font = Font(bold=True)
+    headers = ["Line", "Planned", "Actual", "Run rate/h", "Hours left", "Projected", "Projected vs plan"]
+    for col, header in enumerate(headers, start=1):
+        ws.cell(FORECAST_ROW + 1, col, header).font = Font(bold=True)
+    for row, p in enumerate(projections, start=FORECAST_ROW + 2):
+        vs_plan = p["projected"] / p["planned"] if p["planned"] else None
+        for col, value in enumerate([p["line"], p["planned"], p["actual"], p["rate"], p["remaining_hours"], p["projected"], vs_plan], start=1):
+            ws.cell(row, col, value)
+        if vs_plan is not None:
+            ws.cell(row, 7).number_format = "0%"
+
+
+def write_analysis_report(wb, sections: dict[str, list[str]], triggers: list[Trigger], lint_issues: list[str],
+                          schedule_issues: list[ScheduleIssue] = ()):
     ws = wb["Analysis_Report"]
     ws.delete_rows(1, ws.max_row)
     row = 1
@@ -313,6 +551,22 @@ def write_analysis_report(wb, sections: dict[str, list[str]], triggers: list[Tri
         ws.cell(row, 8, t.timestamp)
         row += 1
 
+    row += 1
+    ws.cell(row, 1, "Schedule Integrity Detail")
+    row += 1
+    for col, header in enumerate(["Line", "Issue", "From", "To", "Minutes", "Orders", "Schedule rows"], start=1):
+        ws.cell(row, col, header)
+    row += 1
+    for i in schedule_issues:
+        ws.cell(row, 1, i.line)
+        ws.cell(row, 2, i.kind)
+        ws.cell(row, 3, i.start)
+        ws.cell(row, 4, i.end)
+        ws.cell(row, 5, i.minutes)
+        ws.cell(row, 6, " / ".join(o for o in i.orders if o))
+        ws.cell(row, 7, ", ".join(str(n) for n in i.sheet_rows if n))
+        row += 1
+
     row += 1
     ws.cell(row, 1, "Rule Lint")
     row += 1
@@ -330,41 +584,174 @@ def export_rules(wb, path: Path):
     }
     path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
     LOG_DIR.mkdir(parents=True, exist_ok=True)
-    (LOG_DIR / "rules_export.log").write_text(f"{dt.datetime.now().isoformat()} exported {len(rules)} rules\n", encoding="utf-8")
+    with open(LOG_DIR / "rules_export.log", "a", encoding="utf-8") as log:
+        log.write(f"{dt.datetime.now().isoformat()} exported {len(rules)} rules\n")
 
 
-def analyze(workbook_path: Path, rules_path: Path, export_only: bool = False):
-    wb = load_workbook(workbook_path, keep_vba=True)
+def analyze(workbook_path: Path, rules_path: Path, export_only: bool = False, rules: list[dict[str, Any]] | None = None,
+            cooldown: bool = True) -> list[Trigger]:
+    """Analyze one workbook and write its Analysis_Report; ``rules`` overrides the workbook's own rules.
+
+    Returns every trigger that fired. With ``cooldown``, repeats still inside their rule's cooldown are flagged
+    ``suppressed`` and left out of the report.
+    """
+    with run_metrics.stage("load"):
+        wb = load_workbook(workbook_path, keep_vba=True)
     if export_only:
         export_rules(wb, rules_path)
         wb.save(workbook_path)
-        return
+        return []
 
-    schedule_rows = table_rows(wb["Schedule_Entry"], "tblSchedule")
-    hourly_rows = table_rows(wb["Hourly_Log"], "tblHourly")
-    downtime_rows = table_rows(wb["Downtime_Log"], "tblDowntime")
-    standards_rows = table_rows(wb["Parameters"], "tblStandards")
-
-    rules, source = select_rules(wb, rules_path)
+    if rules is None:
+        rules, source = select_rules(wb, rules_path)
+    else:
+        source = "shared"
     lint_issues = lint_rules(rules)
-    triggers = evaluate_rules(rules, schedule_rows, hourly_rows, downtime_rows, standards_rows)
 
-    missing_schedule = sum(1 for r in hourly_rows if missing_schedule_for_hourly(schedule_rows, r.get("Line"), parse_dt(r.get("HourEndingDT")) or dt.datetime.now()))
-    missing_stds = sum(1 for r in hourly_rows if missing_standard(r.get("Line"), r.get("SKU_Resolved"), {(s.get("Line"), s.get("SKU")) for s in standards_rows}))
+    # Projection pushdown: only materialize the columns the enabled rules and report need
+    columns = required_columns(rules)
+    normalizer = Normalizer()
+    with run_metrics.stage("read"):
+        schedule_rows, hourly_rows, downtime_rows = (
+            table_rows(wb[sheet], table, columns[key], normalizer) for key, (sheet, table) in RULE_TABLES.items()
+        )
+        ref = load_reference_index(workbook_path)
+    for (_, table), rows in zip(RULE_TABLES.values(), (schedule_rows, hourly_rows, downtime_rows)):
+        run_metrics.record_rows(table, len(rows))
+    with run_metrics.stage("evaluate"):
+        derive_hourly_columns(hourly_rows, ref)
+        forecaster = RunRateForecaster.from_rows(schedule_rows, hourly_rows)
+        schedule_issues = scan_schedule(schedule_rows, ref.lines)
+        triggers = evaluate_rules(rules, schedule_rows, hourly_rows, downtime_rows, ref, forecaster, schedule_issues)
+        if cooldown:
+            reported, suppressed = trigger_cooldown.apply_cooldown(Path(workbook_path).stem, rules, triggers)
+            for t in suppressed:
+                t.suppressed = True
+        else:
+            reported, suppressed = triggers, []
+        ranked = rank_triggers(reported, TRIGGER_REPORT_LIMIT)
+    run_metrics.record_triggers(len(triggers))
+
+    missing_schedule = sum(1 for r in hourly_rows if missing_schedule_for_hourly(schedule_rows, r.get("Line"), r.get("HourEndingDT") or dt.datetime.now()))
+    missing_stds = sum(1 for r in hourly_rows if missing_standard(r.get("Line"), r.get("SKU_Resolved"), ref))
 
     sections = {
         "Data Quality": [
             f"Hourly rows: {len(hourly_rows)}",
             f"Downtime rows: {len(downtime_rows)}",
             f"Rules source: {source}",
+            f"Cells not matching their column type (left blank): {len(normalizer.issues)}",
+            *(str(issue) for issue in normalizer.issues[:NORMALIZE_REPORT_LIMIT]),
+        ],
+        "Schedule Integrity": [
+            f"Hourly rows without schedule: {missing_schedule}",
+            f"Overlapping order pairs: {sum(1 for i in schedule_issues if i.kind == 'overlap')}",
+            f"Unscheduled gaps in shift hours: {sum(1 for i in schedule_issues if i.kind == 'gap')}",
         ],
-        "Schedule Integrity": [f"Hourly rows without schedule: {missing_schedule}"],
         "Standards Coverage": [f"Rows missing standards: {missing_stds}"],
-        "Operational Risks": [f"Triggered prompts: {len(triggers)}"],
-        "Recommended Actions (ranked)": [f"{t.severity}: {t.recommendation} ({t.affected_entity})" for t in triggers[:10]],
+        "Operational Risks": [
+            f"Triggered prompts: {len(reported)}",
+            f"Repeats suppressed (in cooldown): {len(suppressed)}",
+            *([f"Showing the top {TRIGGER_REPORT_LIMIT} prompts"] if len(reported) > TRIGGER_REPORT_LIMIT else []),
+        ],
+        "Recommended Actions (ranked)": [f"{t.severity}: {t.recommendation} ({t.affected_entity})" for t in ranked[:RECOMMENDED_ACTIONS_LIMIT]],
     }
-    write_analysis_report(wb, sections, triggers, lint_issues)
-    wb.save(workbook_path)
+    with run_metrics.stage("report"):
+        write_analysis_report(wb, sections, ranked, lint_issues, schedule_issues)
+        write_line_forecast(wb, forecaster.projections())
+        wb.save(workbook_path)
+    date, shift = current_shift(hourly_rows)
+    archive_history.record_triggers(Path(workbook_path).stem, date, shift, [asdict(t) for t in triggers])
+    return triggers
+
+
+def current_shift(hourly_rows) -> tuple[str, str]:
+    """(Date, Shift) of the latest logged hour, which is what the triggers describe; today otherwise."""
+    latest = max(hourly_rows, key=lambda r: r.get("HourEndingDT") or dt.datetime.min, default=None)
+    if latest is None:
+        return dt.date.today().isoformat(), ""
+    return archive_history.row_date(latest.get("Date")) or dt.date.today().isoformat(), str(latest.get("Shift") or "")
+
+
+def expand_workbooks(patterns: list[str]) -> list[Path]:
+    """Resolve workbook files, directories (their .xlsm/.xlsx files) and globs, in order, without repeats."""
+    paths: list[Path] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.xlsm")) + glob.glob(os.path.join(pattern, "*.xlsx")))
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        for match in matches:
+            path = Path(match)
+            # Skip Excel's "~$" lock files for workbooks that are open
+            if path.name.startswith("~$") or path in paths:
+                continue
+            paths.append(path)
+    return paths
+
+
+def _load_plugins(plugins: list[str]):
+    for plugin in plugins:
+        load_dsl_plugin(Path(plugin))
+
+
+def _analyze_one(workbook_path: Path, rules: list[dict[str, Any]], cooldown: bool = True) -> dict[str, Any]:
+    try:
+        triggers = analyze(workbook_path, DEFAULT_RULES_JSON, rules=rules, cooldown=cooldown)
+    except Exception as exc:
+        return {"workbook": str(workbook_path), "triggers": [], "error": f"{type(exc).__name__}: {exc}"}
+    return {"workbook": str(workbook_path), "triggers": [asdict(t) for t in triggers], "error": None}
+
+
+def analyze_many(workbooks: list[Path], rules: list[dict[str, Any]], max_workers: int | None = None, plugins: list[str] | None = None,
+                 cooldown: bool = True) -> list[dict[str, Any]]:
+    """Analyze workbooks concurrently, one per pool process; results come back in input order.
+
+    A workbook that fails is reported with its error instead of stopping the run.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(workbooks))
+    if workers <= 1:
+        return [_analyze_one(path, rules, cooldown) for path in workbooks]
+    # Plugins are registered again in each worker so spawn-based platforms see them too
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_plugins, initargs=(plugins or [],)) as pool:
+        return list(pool.map(_analyze_one, workbooks, [rules] * len(workbooks), [cooldown] * len(workbooks)))
+
+
+PLANT_REPORT_COLUMNS = ["Rank", "Workbook", "RuleID", "Severity", "Trigger", "Recommendation", "Scope", "AffectedEntity", "Impact", "Timestamp", "InCooldown"]
+
+
+def plant_report(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Rank every trigger across workbooks by severity, then impact."""
+    ranked = [dict(t, workbook=Path(r["workbook"]).stem) for r in results for t in r["triggers"]]
+    ranked.sort(key=lambda t: (-SEVERITY_ORDER.get(t["severity"], 0), -t["impact"], t["workbook"], t["rule_id"], t["affected_entity"]))
+    for rank, t in enumerate(ranked, start=1):
+        t["rank"] = rank
+    return {
+        "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "workbooks": [{"workbook": r["workbook"], "triggers": len(r["triggers"]), "error": r["error"]} for r in results],
+        "triggers": ranked,
+    }
+
+
+def write_plant_report(report: dict[str, Any], json_path: Path, xlsx_path: Path):
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Plant Triggers"
+    ws.append(PLANT_REPORT_COLUMNS)
+    for t in report["triggers"]:
+        ws.append([t["rank"], t["workbook"], t["rule_id"], t["severity"], t["trigger"], t["recommendation"], t["scope"], t["affected_entity"], t["impact"], t["timestamp"], "Y" if t.get("suppressed") else ""])
+    ws.freeze_panes = "A2"
+    books = wb.create_sheet("Workbooks")
+    books.append(["Workbook", "Triggers", "Error"])
+    for w in report["workbooks"]:
+        books.append([w["workbook"], w["triggers"], w["error"] or ""])
+    for sheet in (ws, books):
+        for cell in sheet[1]:
+            cell.font = Font(bold=True)
+    wb.save(xlsx_path)
 
 
 def main():
@@ -372,9 +759,31 @@ def main():
     parser.add_argument("--workbook", default=str(DEFAULT_WORKBOOK))
     parser.add_argument("--rules", default=str(DEFAULT_RULES_JSON))
     parser.add_argument("--export-rules", action="store_true")
+    parser.add_argument("--dsl-plugin", action="append", default=[], help="Python file with register(dsl_function) adding site DSL functions")
+    parser.add_argument("--workbooks", nargs="+", help="Workbook files, directories or globs to analyze together with the shared --rules")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--report-dir", default=str(EXPORT_DIR), help="Where the plant-wide trigger report is written")
+    parser.add_argument("--no-cooldown", action="store_true", help="Report every trigger, including repeats still in their rule's cooldown")
     args = parser.parse_args()
 
-    analyze(Path(args.workbook), Path(args.rules), export_only=args.export_rules)
+    _load_plugins(args.dsl_plugin)
+    if args.workbooks:
+        with run_metrics.track_run("analyze_workbook", " ".join(args.workbooks)):
+            workbooks = expand_workbooks(args.workbooks)
+            with run_metrics.stage("analyze"):
+                results = analyze_many(workbooks, shared_rules(Path(args.rules)), args.workers, args.dsl_plugin, not args.no_cooldown)
+            with run_metrics.stage("report"):
+                report = plant_report(results)
+                stem = Path(args.report_dir) / f"Plant_Trigger_Report_{dt.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                write_plant_report(report, stem.with_suffix(".json"), stem.with_suffix(".xlsx"))
+            run_metrics.record_triggers(len(report["triggers"]))
+        for w in report["workbooks"]:
+            print(f"{w['workbook']}: {w['error'] or str(w['triggers']) + ' triggers'}")
+        print(f"Plant report: {stem.with_suffix('.xlsx')} ({len(report['triggers'])} triggers)")
+        return
+
+    with run_metrics.track_run("analyze_workbook", args.workbook):
+        analyze(Path(args.workbook), Path(args.rules), export_only=args.export_rules, cooldown=not args.no_cooldown)
     print("Analyze complete")
 
 
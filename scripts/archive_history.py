@@ -3,14 +3,39 @@
 from __future__ import annotations
 
 import argparse
+import ast
+import datetime as dt
+import json
+import re
 import sqlite3
 from pathlib import Path
 
 from openpyxl import load_workbook
 
+import run_metrics
+from forecast import RunRateForecaster
+from records import record_type
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_WORKBOOK = REPO_ROOT / "excel" / "Shift_Flight_Deck.xlsm"
 DB_PATH = REPO_ROOT / "data" / "history.sqlite"
+ARCHIVE_TABLES = {"tblSchedule": "schedule_log", "tblHourly": "hourly_log", "tblDowntime": "downtime_log"}
+LEGACY_DATETIME = re.compile(r"datetime\.(datetime|date|time)\(([\d, ]*)\)")
+# Indexed columns kept alongside each JSON payload; older archives are backfilled on open
+INDEXED_COLUMNS = {"Date": "TEXT", "Line": "TEXT", "SheetRow": "INTEGER", "Shift": "TEXT"}
+# Per (Date, Shift, Line) aggregates maintained on every archive, read by the shift summary
+AGGREGATE_TABLES = {
+    "downtime_agg": "Date TEXT, Shift TEXT, Line TEXT, Cause TEXT, Minutes REAL, Events INTEGER, PRIMARY KEY (Date, Shift, Line, Cause)",
+    "production_agg": "Date TEXT, Shift TEXT, Line TEXT, Hours INTEGER, ActualCases REAL, RunRate REAL, LastHourEnding TEXT, PRIMARY KEY (Date, Shift, Line)",
+    "plan_agg": "Date TEXT, Shift TEXT, Line TEXT, PlannedCases REAL, ScheduledEnd TEXT, PRIMARY KEY (Date, Shift, Line)",
+}
+TRIGGER_LOG_DDL = (
+    "CREATE TABLE IF NOT EXISTS trigger_log (Workbook TEXT, Date TEXT, Shift TEXT, Line TEXT, RuleID TEXT, "
+    "Severity TEXT, Description TEXT, Entity TEXT, Recommendation TEXT, Impact REAL, RecordedAt TEXT, "
+    "PRIMARY KEY (Workbook, Date, Shift, RuleID, Entity))"
+)
+# RowIDs per "WHERE RowID IN (...)" lookup, under SQLite's bound-parameter limit
+ROWID_CHUNK = 500
 
 
 def table_rows(ws, table_name):
@@ -21,37 +46,219 @@ def table_rows(ws, table_name):
     max_col = ord(max_cell[0]) - 64
     max_row = int(max_cell[1:])
     headers = [ws.cell(min_row, c).value for c in range(min_col, max_col + 1)]
+    record = record_type(table_name, headers)
     rows = []
     for r in range(min_row + 1, max_row + 1):
         vals = [ws.cell(r, c).value for c in range(min_col, max_col + 1)]
         if any(v not in (None, "") for v in vals):
-            rows.append(dict(zip(headers, vals)))
+            if record is not None:
+                rows.append(record.from_values(headers, vals, r))
+            else:
+                row = dict(zip(headers, vals))
+                row["_sheet_row"] = r
+                rows.append(row)
     return rows
 
 
+def _json_default(value):
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def load_payload(payload: str) -> dict:
+    """Decode an archived row; older archives stored ``str(row)`` instead of JSON."""
+    try:
+        return json.loads(payload)
+    except ValueError:
+        def iso(match):
+            parts = [int(p) for p in match.group(2).split(",") if p.strip()]
+            return repr(getattr(dt, match.group(1))(*parts).isoformat())
+        return ast.literal_eval(LEGACY_DATETIME.sub(iso, payload))
+
+
+def row_date(value) -> str | None:
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()[:10]
+    if value in (None, ""):
+        return None
+    return str(value)[:10]
+
+
 def ensure_tables(conn: sqlite3.Connection):
-    conn.execute("CREATE TABLE IF NOT EXISTS schedule_log (RowID TEXT PRIMARY KEY, payload TEXT)")
-    conn.execute("CREATE TABLE IF NOT EXISTS hourly_log (RowID TEXT PRIMARY KEY, payload TEXT)")
-    conn.execute("CREATE TABLE IF NOT EXISTS downtime_log (RowID TEXT PRIMARY KEY, payload TEXT)")
+    for table_name in ARCHIVE_TABLES.values():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} (RowID TEXT PRIMARY KEY, payload TEXT)")
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table_name})")}
+        missing = [c for c in INDEXED_COLUMNS if c not in cols]
+        if missing:
+            # Archives written before these columns were indexed; backfill them from the payloads
+            for col in missing:
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {col} {INDEXED_COLUMNS[col]}")
+            updates = []
+            for rid, payload in conn.execute(f"SELECT RowID, payload FROM {table_name}").fetchall():
+                row = load_payload(payload)
+                updates.append((row_date(row.get("Date")), row.get("Line"), str(row.get("Shift") or ""), rid))
+            conn.executemany(f"UPDATE {table_name} SET Date = ?, Line = ?, Shift = ? WHERE RowID = ?", updates)
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table_name}_date_line")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_key ON {table_name}(Date, Shift, Line)")
+    conn.execute(TRIGGER_LOG_DDL)
+    if "RunRate" not in {r[1] for r in conn.execute("PRAGMA table_info(production_agg)")}:
+        # Older archives kept a last-three-hours total instead of the run rate; rebuild it
+        conn.execute("DROP TABLE IF EXISTS production_agg")
+    new_aggregates = [t for t in AGGREGATE_TABLES if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (t,)).fetchone()]
+    for table_name, ddl in AGGREGATE_TABLES.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({ddl})")
+    if new_aggregates:
+        refresh_aggregates(conn)
+
+
+def require_tables(conn: sqlite3.Connection, table_names) -> None:
+    """Raise if any of ``table_names`` is missing or predates its current columns; only archiving migrates."""
+    expected = {t: set(INDEXED_COLUMNS) for t in ARCHIVE_TABLES.values()}
+    expected.update({t: {c.split()[0] for c in ddl.split(", PRIMARY KEY")[0].split(", ")} for t, ddl in AGGREGATE_TABLES.items()})
+    stale = []
+    for table_name in table_names:
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table_name})")}
+        if not cols or not expected.get(table_name, set()) <= cols:
+            stale.append(table_name)
+    if stale:
+        raise sqlite3.OperationalError(
+            f"History database is missing or has outdated tables: {', '.join(stale)}; run archive_history.py to create or migrate them"
+        )
+
+
+def upsert_rows(conn, table_name, rows) -> set[tuple]:
+    """Insert or replace rows; returns the (Date, Shift, Line) keys whose aggregates need refreshing."""
+    records = [
+        (
+            row.get("RowID"),
+            json.dumps({k: v for k, v in row.items() if k != "_sheet_row"}, default=_json_default),
+            row_date(row.get("Date")),
+            row.get("Line"),
+            row.get("_sheet_row"),
+            str(row.get("Shift") or ""),
+        )
+        for row in rows
+    ]
+    touched = {(r[2], r[5], r[3]) for r in records}
+    # A replaced row may have moved to another date, shift or line
+    rids = [r[0] for r in records]
+    for i in range(0, len(rids), ROWID_CHUNK):
+        chunk = rids[i:i + ROWID_CHUNK]
+        touched.update(conn.execute(
+            f"SELECT Date, Shift, Line FROM {table_name} WHERE RowID IN ({','.join('?' for _ in chunk)})", chunk
+        ))
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table_name}(RowID, payload, Date, Line, SheetRow, Shift) VALUES (?, ?, ?, ?, ?, ?)",
+        records,
+    )
+    return touched
+
+
+def _number(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _minutes(row: dict) -> float:
+    if row.get("Minutes") not in (None, ""):
+        return _number(row["Minutes"])
+    try:
+        start, end = dt.datetime.fromisoformat(str(row["StartDT"])), dt.datetime.fromisoformat(str(row["EndDT"]))
+    except (KeyError, ValueError):
+        return 0.0
+    return max((end - start).total_seconds() / 60, 0.0)
+
+
+def _key_payloads(conn, table_name, key):
+    rows = conn.execute(
+        f"SELECT payload FROM {table_name} WHERE Date IS ? AND Shift IS ? AND Line IS ? ORDER BY SheetRow, RowID", key
+    )
+    return [load_payload(p) for (p,) in rows]
+
+
+def refresh_aggregates(conn: sqlite3.Connection, keys: set[tuple] | None = None):
+    """Recompute downtime/production/plan aggregates for the given (Date, Shift, Line) keys, or all of them."""
+    if keys is None:
+        keys = set()
+        for table_name in ARCHIVE_TABLES.values():
+            keys.update(conn.execute(f"SELECT DISTINCT Date, Shift, Line FROM {table_name}"))
+    for key in keys:
+        for table_name in AGGREGATE_TABLES:
+            conn.execute(f"DELETE FROM {table_name} WHERE Date IS ? AND Shift IS ? AND Line IS ?", key)
+
+        causes: dict[str, list[float]] = {}
+        for row in _key_payloads(conn, "downtime_log", key):
+            agg = causes.setdefault(str(row.get("Cause") or "Unspecified"), [0.0, 0])
+            agg[0] += _minutes(row)
+            agg[1] += 1
+        conn.executemany(
+            "INSERT INTO downtime_agg VALUES (?, ?, ?, ?, ?, ?)", [(*key, cause, m, n) for cause, (m, n) in causes.items()]
+        )
+
+        hourly = sorted(_key_payloads(conn, "hourly_log", key), key=lambda r: str(r.get("HourEndingDT") or ""))
+        if hourly:
+            # The same EWMA run rate the analyzer shows on Dash_Shift
+            forecaster = RunRateForecaster()
+            for r in hourly:
+                forecaster.update({"Line": key[2], "HourEndingDT": r.get("HourEndingDT") or None, "ActualCases": _number(r.get("ActualCases"))})
+            state = forecaster.lines[key[2]]
+            conn.execute(
+                "INSERT INTO production_agg VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, state.hours, state.actual, state.rate, str(hourly[-1].get("HourEndingDT") or "")),
+            )
+
+        schedule = _key_payloads(conn, "schedule_log", key)
+        if schedule:
+            ends = [str(r.get("EndDT")) for r in schedule if r.get("EndDT")]
+            conn.execute(
+                "INSERT INTO plan_agg VALUES (?, ?, ?, ?, ?)",
+                (*key, sum(_number(r.get("PlannedCases")) for r in schedule), max(ends) if ends else None),
+            )
 
 
-def upsert_rows(conn, table_name, rows):
-    for row in rows:
-        conn.execute(f"INSERT OR REPLACE INTO {table_name}(RowID, payload) VALUES (?, ?)", (row.get("RowID"), str(row)))
+def record_triggers(workbook: str, date: str, shift: str, triggers: list[dict], db_path: Path | None = None):
+    """Store an analysis run's triggers for the shift summary; a rerun for the same shift replaces them."""
+    db_path = db_path or DB_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        with conn:
+            conn.execute(TRIGGER_LOG_DDL)
+            conn.execute("DELETE FROM trigger_log WHERE Workbook = ? AND Date = ? AND Shift = ?", (workbook, date, shift))
+            now = dt.datetime.now().isoformat(timespec="seconds")
+            conn.executemany(
+                "INSERT OR REPLACE INTO trigger_log VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (workbook, date, shift, t["line"], t["rule_id"], t["severity"], t["trigger"], t["affected_entity"],
+                     t["recommendation"], t["impact"], now)
+                    for t in triggers
+                ],
+            )
+    finally:
+        conn.close()
 
 
 def archive(workbook_path: Path, clear_current: bool):
-    wb = load_workbook(workbook_path, keep_vba=True)
-    schedule = table_rows(wb["Schedule_Entry"], "tblSchedule")
-    hourly = table_rows(wb["Hourly_Log"], "tblHourly")
-    downtime = table_rows(wb["Downtime_Log"], "tblDowntime")
+    with run_metrics.stage("read"):
+        wb = load_workbook(workbook_path, keep_vba=True)
+        schedule = table_rows(wb["Schedule_Entry"], "tblSchedule")
+        hourly = table_rows(wb["Hourly_Log"], "tblHourly")
+        downtime = table_rows(wb["Downtime_Log"], "tblDowntime")
+    for table, rows in zip(ARCHIVE_TABLES, (schedule, hourly, downtime)):
+        run_metrics.record_rows(table, len(rows))
 
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
-    ensure_tables(conn)
-    upsert_rows(conn, "schedule_log", schedule)
-    upsert_rows(conn, "hourly_log", hourly)
-    upsert_rows(conn, "downtime_log", downtime)
+    with run_metrics.stage("upsert"):
+        ensure_tables(conn)
+        touched = upsert_rows(conn, "schedule_log", schedule)
+        touched |= upsert_rows(conn, "hourly_log", hourly)
+        touched |= upsert_rows(conn, "downtime_log", downtime)
+    with run_metrics.stage("aggregate"):
+        refresh_aggregates(conn, touched)
     conn.commit()
     conn.close()
 
@@ -71,7 +278,8 @@ def main():
     parser.add_argument("--workbook", default=str(DEFAULT_WORKBOOK))
     parser.add_argument("--clear-current", action="store_true")
     args = parser.parse_args()
-    archive(Path(args.workbook), args.clear_current)
+    with run_metrics.track_run("archive_history", args.workbook):
+        archive(Path(args.workbook), args.clear_current)
     print("Archive complete")
 
 
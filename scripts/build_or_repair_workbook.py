@@ -6,14 +6,21 @@ import argparse
 import datetime as dt
 import hashlib
 import json
+import posixpath
+import re
+import zipfile
 from pathlib import Path
 from typing import Iterable
+from xml.etree import ElementTree as ET
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.worksheet.table import Table, TableStyleInfo
 
+import run_metrics
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 WORKBOOK_PATH = REPO_ROOT / "excel" / "Shift_Flight_Deck.xlsm"
 RULES_JSON = REPO_ROOT / "data" / "rules.json"
@@ -48,6 +55,39 @@ TABLE_DEFS = {
     ),
 }
 
+# Parameters holds four tables; they sit side by side with a blank column between them.
+TABLE_START_COL = {"tblStandards": 7, "tblMachines": 12, "tblOperators": 15}
+
+RULE_VALIDATIONS = [
+    ("B2:B1000", '"TRUE,FALSE"'),
+    ("C2:C1000", '"Info,Watch,Action,Urgent"'),
+    ("D2:D1000", '"Line,Machine,Operator,Shift"'),
+]
+
+# Placeholder cells per sheet; the first cell is the anchor that marks the sheet as initialized.
+DASHBOARD_CELLS = {
+    "Dash_Shift": {
+        "A1": "Shift Flight Deck",
+        "A3": "Data Quality Score",
+        "B3": "=IFERROR(AVERAGE(B6:B8),0)",
+        "A6": "% Hourly with SKU",
+        "A7": "% Standards present",
+        "A8": "% Downtime required fields",
+        "B6": "=IFERROR(COUNTA(Hourly_Log!G:G)/MAX(COUNTA(Hourly_Log!A:A)-1,1),0)",
+        "B7": "=0",
+        "B8": '=IFERROR(COUNTIFS(Downtime_Log!A:A,"<>",Downtime_Log!H:H,"<>",Downtime_Log!J:J,"<>")/MAX(COUNTA(Downtime_Log!A:A)-1,1),0)',
+        "A10": "Changeover Prep Needed",
+        "B10": "=\"Check schedule in next 90 minutes\"",
+    },
+    "Dash_Trends": {"A1": "Trend Dashboard", "A2": "Generated by automation scripts"},
+    "Analysis_Report": {"A1": "Analysis Report", "A2": "Run Analyze (Deep) to refresh"},
+    "Rules_Authoring": {"T1": "Rule Linter", "T2": "Issues are written by analyzer"},
+}
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
 DEFAULT_RULES = [
     {
         "RuleID": "R1_UNDERPERFORM_STOPS",
@@ -106,32 +146,42 @@ def clear_table(ws, table_name: str):
         del ws.tables[table_name]
 
 
-def write_table(ws, table_name: str, columns: list[str], rows: list[list[object]], start_row: int = 1):
-    for i, col in enumerate(columns, start=1):
+def write_table(ws, table_name: str, columns: list[str], rows: list[list[object]], start_row: int = 1, start_col: int | None = None):
+    start_col = start_col or TABLE_START_COL.get(table_name, 1)
+    for i, col in enumerate(columns, start=start_col):
         ws.cell(start_row, i, col).font = Font(bold=True)
     for r, row in enumerate(rows, start=start_row + 1):
-        for c, val in enumerate(row, start=1):
+        for c, val in enumerate(row, start=start_col):
             ws.cell(r, c, val)
     end_row = max(start_row + 1, start_row + len(rows))
-    end_col = len(columns)
-    ref = f"A{start_row}:{chr(64 + end_col)}{end_row}"
+    end_col = start_col + len(columns) - 1
+    ref = f"{get_column_letter(start_col)}{start_row}:{get_column_letter(end_col)}{end_row}"
     clear_table(ws, table_name)
     tab = Table(displayName=table_name, ref=ref)
     tab.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True)
     ws.add_table(tab)
 
 
-def ensure_validations(wb: Workbook):
+def ensure_validations(wb: Workbook) -> bool:
+    """Add the Rules_Authoring list validations that are missing and drop duplicates."""
     ws_rules = wb["Rules_Authoring"]
-    dv_enabled = DataValidation(type="list", formula1='"TRUE,FALSE"', allow_blank=False)
-    dv_severity = DataValidation(type="list", formula1='"Info,Watch,Action,Urgent"', allow_blank=False)
-    dv_scope = DataValidation(type="list", formula1='"Line,Machine,Operator,Shift"', allow_blank=False)
-    ws_rules.add_data_validation(dv_enabled)
-    ws_rules.add_data_validation(dv_severity)
-    ws_rules.add_data_validation(dv_scope)
-    dv_enabled.add("B2:B1000")
-    dv_severity.add("C2:C1000")
-    dv_scope.add("D2:D1000")
+    seen = set()
+    kept = []
+    for dv in ws_rules.data_validations.dataValidation:
+        key = (dv.type, dv.formula1, str(dv.sqref))
+        if key not in seen:
+            seen.add(key)
+            kept.append(dv)
+    changed = len(kept) != len(ws_rules.data_validations.dataValidation)
+    ws_rules.data_validations.dataValidation = kept
+    for sqref, formula in RULE_VALIDATIONS:
+        if ("list", formula, sqref) in seen:
+            continue
+        dv = DataValidation(type="list", formula1=formula, allow_blank=False)
+        ws_rules.add_data_validation(dv)
+        dv.add(sqref)
+        changed = True
+    return changed
 
 
 def seed_defaults(wb: Workbook):
@@ -172,32 +222,128 @@ def seed_defaults(wb: Workbook):
     write_table(wb["Rules_Authoring"], "tblRules", TABLE_DEFS["tblRules"][1], [[r.get(c, "") for c in TABLE_DEFS["tblRules"][1]] for r in DEFAULT_RULES])
 
 
-def setup_dashboards(wb: Workbook):
-    dash = wb["Dash_Shift"]
-    dash["A1"] = "Shift Flight Deck"
-    dash["A1"].font = Font(size=16, bold=True)
-    dash["A3"] = "Data Quality Score"
-    dash["B3"] = "=IFERROR(AVERAGE(B6:B8),0)"
-    dash["A6"] = "% Hourly with SKU"
-    dash["A7"] = "% Standards present"
-    dash["A8"] = "% Downtime required fields"
-    dash["B6"] = "=IFERROR(COUNTA(Hourly_Log!G:G)/MAX(COUNTA(Hourly_Log!A:A)-1,1),0)"
-    dash["B7"] = "=0"
-    dash["B8"] = '=IFERROR(COUNTIFS(Downtime_Log!A:A,"<>",Downtime_Log!H:H,"<>",Downtime_Log!J:J,"<>")/MAX(COUNTA(Downtime_Log!A:A)-1,1),0)'
-    dash["A10"] = "Changeover Prep Needed"
-    dash["B10"] = "=\"Check schedule in next 90 minutes\""
+def setup_dashboards(wb: Workbook) -> bool:
+    """Write placeholder cells on sheets whose anchor cell is still empty."""
+    changed = False
+    for sheet_name, cells in DASHBOARD_CELLS.items():
+        ws = wb[sheet_name]
+        anchor = next(iter(cells))
+        if ws[anchor].value not in (None, ""):
+            continue
+        for ref, value in cells.items():
+            ws[ref] = value
+        changed = True
+    if changed:
+        wb["Dash_Shift"]["A1"].font = Font(size=16, bold=True)
+    return changed
+
+
+def _part_path(base: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _relationships(zf: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    if rels_path not in zf.namelist():
+        return {}
+    root = ET.fromstring(zf.read(rels_path))
+    return {
+        rel.get("Id"): (rel.get("Type", "").rsplit("/", 1)[-1], _part_path(part, rel.get("Target", "")))
+        for rel in root.iter(f"{REL_NS}Relationship")
+    }
+
+
+def _has_value(sheet_xml: bytes, ref: str) -> bool:
+    match = re.search(rb'<c r="' + ref.encode() + rb'"[^>]*?(/?)>(.*?)</c>', sheet_xml, re.S)
+    return bool(match and not match.group(1) and re.search(rb"<(?:\w+:)?(?:v|f|is)\b", match.group(2)))
+
+
+def table_parts(zf: zipfile.ZipFile, sheet_part: str) -> list[tuple[str, ET.Element]]:
+    """Return (part name, parsed XML) for every table attached to a worksheet part."""
+    return [
+        (target, ET.fromstring(zf.read(target)))
+        for rel_type, target in _relationships(zf, sheet_part.lstrip("/")).values()
+        if rel_type == "table"
+    ]
+
 
-    trends = wb["Dash_Trends"]
-    trends["A1"] = "Trend Dashboard"
-    trends["A2"] = "Generated by automation scripts"
+def sheet_parts(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Return {sheet name: part name} in workbook order, resolved through xl/workbook.xml and its rels."""
+    workbook_part = "xl/workbook.xml"
+    rels = _relationships(zf, workbook_part)
+    root = ET.fromstring(zf.read(workbook_part))
+    return {sheet.get("name"): rels[sheet.get(f"{DOC_REL_NS}id")][1] for sheet in root.iter(f"{MAIN_NS}sheet")}
 
-    report = wb["Analysis_Report"]
-    report["A1"] = "Analysis Report"
-    report["A2"] = "Run Analyze (Deep) to refresh"
 
-    rules = wb["Rules_Authoring"]
-    rules["T1"] = "Rule Linter"
-    rules["T2"] = "Issues are written by analyzer"
+# Matches a shared-string cell in worksheet XML and captures its index into the string table
+SHARED_STRING_REF = re.compile(rb'<c\b[^>]*?\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+def shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    """Return the shared string table as plain text; rich-text runs are joined, phonetic hints dropped."""
+    part = next((target for rel_type, target in _relationships(zf, "xl/workbook.xml").values() if rel_type == "sharedStrings"), None)
+    if part is None:
+        return []
+    root = ET.fromstring(zf.read(part))
+    return [
+        "".join(t.text or "" for t in si.findall(f"{MAIN_NS}t") + si.findall(f"{MAIN_NS}r/{MAIN_NS}t"))
+        for si in root.iter(f"{MAIN_NS}si")
+    ]
+
+
+def read_contract(path: Path) -> dict:
+    """Read sheets, table headers, validations and dashboard anchors straight from the package XML."""
+    contract = {"sheets": [], "tables": {}, "validations": {}, "initialized": {}}
+    with zipfile.ZipFile(path) as zf:
+        for name, sheet_part in sheet_parts(zf).items():
+            contract["sheets"].append(name)
+            for _, table in table_parts(zf, sheet_part):
+                columns = [c.get("name") for c in table.iter(f"{MAIN_NS}tableColumn")]
+                contract["tables"][table.get("displayName")] = (name, columns)
+            if name != "Rules_Authoring" and name not in DASHBOARD_CELLS:
+                continue
+            sheet_xml = zf.read(sheet_part)
+            if name == "Rules_Authoring":
+                validations = []
+                for dv in ET.fromstring(sheet_xml).iter(f"{MAIN_NS}dataValidation"):
+                    formula = dv.find(f"{MAIN_NS}formula1")
+                    validations.append((dv.get("type"), formula.text if formula is not None else None, dv.get("sqref")))
+                contract["validations"][name] = validations
+            if name in DASHBOARD_CELLS:
+                contract["initialized"][name] = _has_value(sheet_xml, next(iter(DASHBOARD_CELLS[name])))
+    return contract
+
+
+def contract_problems(contract: dict) -> list[str]:
+    """List what the workbook is missing relative to SHEETS, TABLE_DEFS, validations and dashboards."""
+    problems = [f"missing sheet {name}" for name in SHEETS if name not in contract["sheets"]]
+    for table_name, (sheet_name, cols) in TABLE_DEFS.items():
+        found = contract["tables"].get(table_name)
+        if found is None:
+            problems.append(f"missing table {table_name}")
+        elif found[0] != sheet_name:
+            problems.append(f"table {table_name} on {found[0]}, expected {sheet_name}")
+        elif found[1] != cols:
+            problems.append(f"table {table_name} headers differ from contract")
+    validations = contract["validations"].get("Rules_Authoring", [])
+    for sqref, formula in RULE_VALIDATIONS:
+        if ("list", formula, sqref) not in validations:
+            problems.append(f"missing validation {sqref}")
+    if len(set(validations)) != len(validations):
+        problems.append(f"{len(validations) - len(set(validations))} duplicate validations")
+    for sheet_name in DASHBOARD_CELLS:
+        if sheet_name in contract["sheets"] and not contract["initialized"].get(sheet_name):
+            problems.append(f"{sheet_name} not initialized")
+    return problems
+
+
+def vba_module_present(path: Path) -> bool:
+    with zipfile.ZipFile(path) as zf:
+        if "xl/vbaProject.bin" not in zf.namelist():
+            return False
+        return "ShiftDeckMacros".encode("utf-16-le") in zf.read("xl/vbaProject.bin")
 
 
 def try_inject_vba_and_buttons(workbook_path: Path):
@@ -211,6 +357,8 @@ def try_inject_vba_and_buttons(workbook_path: Path):
     xl.DisplayAlerts = False
     wb = xl.Workbooks.Open(str(workbook_path))
     try:
+        if any(c.Name == "ShiftDeckMacros" for c in wb.VBProject.VBComponents):
+            return "VBA module already present; injection skipped"
         module = wb.VBProject.VBComponents.Add(1)
         module.Name = "ShiftDeckMacros"
         code = '''
@@ -247,36 +395,59 @@ def export_default_rules_json():
 
 
 def build_or_repair(path: Path):
-    if path.exists():
-        wb = load_workbook(path, keep_vba=True)
+    created = not path.exists()
+    problems = ["workbook missing"] if created else contract_problems(read_contract(path))
+    # Header mismatches are reported but never rewritten; that would clobber table data.
+    fixable = [p for p in problems if not p.endswith("headers differ from contract")]
+    messages = [f"Contract problems: {'; '.join(problems)}"] if problems else ["Workbook contract intact"]
+
+    if fixable:
+        if created:
+            wb = Workbook()
+            wb.remove(wb.active)
+        else:
+            wb = load_workbook(path, keep_vba=True)
+
+        changed = created
+        for name in SHEETS:
+            if name not in wb.sheetnames:
+                ensure_sheet(wb, name)
+                changed = True
+
+        for table_name, (sheet_name, cols) in TABLE_DEFS.items():
+            ws = wb[sheet_name]
+            if table_name not in ws.tables:
+                write_table(ws, table_name, cols, [])
+                changed = True
+
+        if wb["Parameters"].max_row <= 1:
+            seed_defaults(wb)
+            changed = True
+
+        changed = ensure_validations(wb) | changed
+        changed = setup_dashboards(wb) | changed
+        if changed:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            wb.save(path)
+            messages.append("Workbook repaired and saved")
     else:
-        wb = Workbook()
-        wb.remove(wb.active)
-
-    for name in SHEETS:
-        ensure_sheet(wb, name)
+        messages.append("No changes; save skipped")
 
-    for table_name, (sheet_name, cols) in TABLE_DEFS.items():
-        ws = wb[sheet_name]
-        if table_name not in ws.tables:
-            write_table(ws, table_name, cols, [])
-
-    if wb["Parameters"].max_row <= 1:
-        seed_defaults(wb)
-
-    ensure_validations(wb)
-    setup_dashboards(wb)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    wb.save(path)
-    export_default_rules_json()
-    return try_inject_vba_and_buttons(path)
+    if created or not RULES_JSON.exists():
+        export_default_rules_json()
+    if vba_module_present(path):
+        messages.append("VBA module already present; injection skipped")
+    else:
+        messages.append(try_inject_vba_and_buttons(path))
+    return "\n".join(messages)
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--workbook", default=str(WORKBOOK_PATH))
     args = parser.parse_args()
-    msg = build_or_repair(Path(args.workbook))
+    with run_metrics.track_run("build_or_repair_workbook", args.workbook):
+        msg = build_or_repair(Path(args.workbook))
     print(f"Workbook ready: {args.workbook}")
     print(msg)
 
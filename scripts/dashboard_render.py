@@ -0,0 +1,219 @@
+"""Render dashboard sheets to static HTML and PDF without Excel."""
+from __future__ import annotations
+
+import datetime as dt
+import html
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from reference_data import load_reference_index
+
+DASHBOARD_SHEETS = ["Dash_Shift", "Dash_Trends", "Analysis_Report"]
+# Dash_Shift cells whose formulas are computed in Python when the workbook has no cached value
+DASH_SHIFT_KPIS = ("B3", "B6", "B7", "B8")
+KPI_FORMAT = "0.0%"
+
+HTML_STYLE = """
+body { font-family: Segoe UI, Arial, sans-serif; margin: 24px; color: #1f2933; }
+h1 { font-size: 20px; }
+table { border-collapse: collapse; }
+td { border: 1px solid #d9dee3; padding: 4px 8px; vertical-align: top; }
+td.num { text-align: right; }
+td.b { font-weight: bold; }
+td.formula { color: #8a94a0; font-style: italic; }
+footer { margin-top: 16px; font-size: 11px; color: #8a94a0; }
+"""
+
+# Landscape US Letter, Courier 8pt: 0.6em per character
+PDF_PAGE = (792, 612)
+PDF_FONT_SIZE = 8
+PDF_MARGIN = 36
+PDF_LINE_HEIGHT = 10
+PDF_MAX_CHARS = int((PDF_PAGE[0] - 2 * PDF_MARGIN) / (PDF_FONT_SIZE * 0.6))
+PDF_COL_WIDTH = 40
+
+
+def format_value(value, number_format: str | None = None) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        if number_format and "%" in number_format:
+            return f"{value:.1%}"
+        if isinstance(value, float) and not value.is_integer():
+            return f"{value:,.2f}"
+        return f"{value:,.0f}"
+    if isinstance(value, dt.datetime):
+        return value.isoformat(sep=" ", timespec="minutes")
+    if isinstance(value, (dt.date, dt.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _log_rows(wb, sheet: str) -> list[dict]:
+    """Rows of a log sheet keyed by its header, counting those with a RowID as COUNTA(A:A) does."""
+    if sheet not in wb.sheetnames:
+        return []
+    values = wb[sheet].iter_rows(values_only=True)
+    headers = next(values, ())
+    return [dict(zip(headers, v)) for v in values if v and v[0] not in (None, "")]
+
+
+def _share(rows: list[dict], test) -> float:
+    return sum(1 for r in rows if test(r)) / max(len(rows), 1)
+
+
+def dash_shift_kpis(workbook_path: Path, wb) -> dict[str, float]:
+    """Data quality KPIs for Dash_Shift, computed from the logs the way its formulas would."""
+    def filled(v):
+        return v not in (None, "")
+
+    ref = load_reference_index(workbook_path)
+    hourly, downtime = _log_rows(wb, "Hourly_Log"), _log_rows(wb, "Downtime_Log")
+    kpis = {
+        "B6": _share(hourly, lambda r: filled(r.get("SKU_Resolved"))),
+        "B7": _share(hourly, lambda r: ref.has_standard(r.get("Line"), r.get("SKU_Resolved"))),
+        "B8": _share(downtime, lambda r: filled(r.get("Machine")) and filled(r.get("Category"))),
+    }
+    kpis["B3"] = sum(kpis.values()) / len(kpis)
+    return kpis
+
+
+def sheet_grids(workbook_path: Path, sheets: list[str]) -> dict[str, list[list[tuple[str, str]]]]:
+    """Return {sheet: rows of (text, css class)} using cached values.
+
+    Without a cached value (the workbook was last saved by openpyxl, not Excel), string-literal
+    formulas show their text and the Dash_Shift KPIs are computed in Python; other formulas show
+    their formula text.
+    """
+    values_wb = load_workbook(workbook_path, read_only=True, data_only=True)
+    formulas_wb = load_workbook(workbook_path, read_only=True)
+    grids = {}
+    kpis = None
+    try:
+        for sheet in sheets:
+            if sheet not in values_wb.sheetnames:
+                continue
+            rows = []
+            for value_row, formula_row in zip(values_wb[sheet].iter_rows(), formulas_wb[sheet].iter_rows()):
+                row = []
+                for cell, formula_cell in zip(value_row, formula_row):
+                    value = getattr(cell, "value", None)
+                    number_format = getattr(cell, "number_format", None)
+                    formula = getattr(formula_cell, "value", None)
+                    if value is None and isinstance(formula, str) and formula.startswith("="):
+                        if len(formula) > 2 and formula[1] == formula[-1] == '"':
+                            value = formula[2:-1].replace('""', '"')
+                        elif sheet == "Dash_Shift" and formula_cell.coordinate in DASH_SHIFT_KPIS:
+                            kpis = kpis or dash_shift_kpis(workbook_path, formulas_wb)
+                            value, number_format = kpis[formula_cell.coordinate], KPI_FORMAT
+                        else:
+                            row.append((formula, "formula"))
+                            continue
+                    css = "num" if isinstance(value, (int, float)) and not isinstance(value, bool) else ""
+                    font = getattr(cell, "font", None)
+                    if font is not None and font.b:
+                        css = f"{css} b".strip()
+                    row.append((format_value(value, number_format), css))
+                while row and not row[-1][0]:
+                    row.pop()
+                rows.append(row)
+            while rows and not rows[-1]:
+                rows.pop()
+            grids[sheet] = rows
+    finally:
+        values_wb.close()
+        formulas_wb.close()
+    return grids
+
+
+def render_html(title: str, grid: list[list[tuple[str, str]]], generated_at: str) -> str:
+    width = max((len(r) for r in grid), default=0)
+    body = []
+    for row in grid:
+        cells = list(row) + [("", "")] * (width - len(row))
+        tds = "".join(f'<td class="{css}">{html.escape(text)}</td>' if css else f"<td>{html.escape(text)}</td>" for text, css in cells)
+        body.append(f"<tr>{tds}</tr>")
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{HTML_STYLE}</style></head><body>"
+        f"<h1>{html.escape(title)}</h1><table>{''.join(body)}</table>"
+        f"<footer>Generated {html.escape(generated_at)} from the workbook's saved values</footer></body></html>\n"
+    )
+
+
+def grid_text_lines(grid: list[list[tuple[str, str]]]) -> list[str]:
+    width = max((len(r) for r in grid), default=0)
+    col_widths = [0] * width
+    for row in grid:
+        for i, (text, _) in enumerate(row):
+            col_widths[i] = min(max(col_widths[i], len(text)), PDF_COL_WIDTH)
+    lines = []
+    for row in grid:
+        parts = [text[:PDF_COL_WIDTH].ljust(col_widths[i]) for i, (text, _) in enumerate(row)]
+        lines.append("  ".join(parts).rstrip()[:PDF_MAX_CHARS])
+    return lines
+
+
+def _pdf_text(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, title: str, lines: list[str]):
+    """Write a minimal multi-page PDF of monospaced text lines using the built-in Courier font."""
+    per_page = int((PDF_PAGE[1] - 2 * PDF_MARGIN) / PDF_LINE_HEIGHT) - 2
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+    objects: list[bytes] = []
+    page_ids = []
+    font_id = 3
+    for n, page_lines in enumerate(pages, start=1):
+        y = PDF_PAGE[1] - PDF_MARGIN
+        ops = [f"BT /F1 {PDF_FONT_SIZE + 4} Tf {PDF_MARGIN} {y} Td ({_pdf_text(title)}  -  page {n}/{len(pages)}) Tj ET"]
+        y -= 2 * PDF_LINE_HEIGHT
+        for line in page_lines:
+            ops.append(f"BT /F1 {PDF_FONT_SIZE} Tf {PDF_MARGIN} {y} Td ({_pdf_text(line)}) Tj ET")
+            y -= PDF_LINE_HEIGHT
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = 4 + 2 * (n - 1) + 1
+        page_ids.append(content_id - 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_PAGE[0]} {PDF_PAGE[1]}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode("latin-1"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+    ] + objects
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{o:010d} 00000 n \n".encode() for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def render_dashboards(workbook_path: Path, out_dir: Path, stamp: str, sheets: list[str] = DASHBOARD_SHEETS, pdf: bool = True) -> list[str]:
+    """Render each sheet to ``<sheet>_<stamp>.html`` (and ``.pdf``) in ``out_dir``; returns the paths written."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    generated_at = dt.datetime.now().isoformat(sep=" ", timespec="seconds")
+    outputs = []
+    for sheet, grid in sheet_grids(workbook_path, sheets).items():
+        html_path = out_dir / f"{sheet}_{stamp}.html"
+        html_path.write_text(render_html(sheet.replace("_", " "), grid, generated_at), encoding="utf-8")
+        outputs.append(str(html_path))
+        if pdf:
+            pdf_path = out_dir / f"{sheet}_{stamp}.pdf"
+            write_text_pdf(pdf_path, sheet.replace("_", " "), grid_text_lines(grid))
+            outputs.append(str(pdf_path))
+    return outputs
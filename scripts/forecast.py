@@ -0,0 +1,93 @@
+"""Per-line end-of-shift forecast: running totals and an EWMA run rate, updated one hourly row at a time."""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Iterable
+
+# Weight of the newest hour in the run rate
+DEFAULT_ALPHA = 0.5
+
+
+def project(actual: float, rate: float | None, last_hour: dt.datetime | None,
+            scheduled_end: dt.datetime | None) -> tuple[float, float]:
+    """(remaining hours, projected cases): actual so far plus the run rate until the scheduled end."""
+    remaining = 0.0
+    if scheduled_end is not None and last_hour is not None:
+        remaining = max((scheduled_end - last_hour).total_seconds() / 3600, 0.0)
+    return remaining, actual + (rate or 0.0) * remaining
+
+
+class LineForecast:
+    __slots__ = ("actual", "hours", "rate", "last_hour", "planned", "scheduled_end")
+
+    def __init__(self):
+        self.actual = 0.0
+        self.hours = 0
+        self.rate: float | None = None
+        self.last_hour: dt.datetime | None = None
+        self.planned = 0.0
+        self.scheduled_end: dt.datetime | None = None
+
+
+class RunRateForecaster:
+    """Keeps one LineForecast per line; ``update`` costs the same whatever the log length."""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self.lines: dict[Any, LineForecast] = {}
+
+    def _line(self, line) -> LineForecast:
+        state = self.lines.get(line)
+        if state is None:
+            state = self.lines[line] = LineForecast()
+        return state
+
+    def add_schedule(self, row) -> None:
+        state = self._line(row.get("Line"))
+        state.planned += row.get("PlannedCases") or 0.0
+        end = row.get("EndDT")
+        if end is not None and (state.scheduled_end is None or end > state.scheduled_end):
+            state.scheduled_end = end
+
+    def update(self, row) -> None:
+        """Fold one hourly row in. A row older than the line's latest hour adds to the total only."""
+        state = self._line(row.get("Line"))
+        cases = row.get("ActualCases") or 0.0
+        hour = row.get("HourEndingDT")
+        state.actual += cases
+        state.hours += 1
+        if hour is None or (state.last_hour is not None and hour < state.last_hour):
+            return
+        state.last_hour = hour
+        state.rate = cases if state.rate is None else self.alpha * cases + (1 - self.alpha) * state.rate
+
+    def projection(self, line) -> dict[str, Any]:
+        state = self.lines.get(line) or LineForecast()
+        rate = state.rate or 0.0
+        remaining, projected = project(state.actual, rate, state.last_hour, state.scheduled_end)
+        return {
+            "line": line,
+            "planned": state.planned,
+            "actual": state.actual,
+            "hours": state.hours,
+            "rate": round(rate, 2),
+            "remaining_hours": round(remaining, 2),
+            "projected": round(projected, 1),
+            "shortfall": round(state.planned - projected, 1),
+        }
+
+    def projections(self) -> list[dict[str, Any]]:
+        """Lines that have logged hours, in line order."""
+        return [self.projection(line) for line in sorted(self.lines, key=str) if self.lines[line].hours]
+
+    @classmethod
+    def from_rows(cls, schedule_rows: Iterable, hourly_rows: Iterable, alpha: float = DEFAULT_ALPHA) -> "RunRateForecaster":
+        forecaster = cls(alpha)
+        for row in schedule_rows:
+            forecaster.add_schedule(row)
+        # The log is usually in time order already; sorting once keeps the run rate right when it is not
+        for row in sorted(hourly_rows, key=lambda r: r.get("HourEndingDT") or dt.datetime.min):
+            forecaster.update(row)
+        return forecaster
@@ -0,0 +1,158 @@
+"""Typed ingest: convert log-table cells to their declared types once, when the tables are read."""
+from __future__ import annotations
+
+import datetime as dt
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from openpyxl.utils.datetime import from_excel
+
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p", "%m/%d/%Y")
+MEMO_SIZE = 4096
+# Formula columns the analyzer recomputes itself; their cells are not read
+DERIVED = "derived"
+
+COLUMN_TYPES: dict[str, dict[str, str]] = {
+    "tblSchedule": {
+        "RowID": "text", "Date": "date", "Shift": "category", "Line": "category", "StartDT": "datetime",
+        "EndDT": "datetime", "Order": "text", "SKU": "category", "PlannedCases": "float", "Notes": "text",
+    },
+    "tblHourly": {
+        "RowID": "text", "Date": "date", "Shift": "category", "Line": "category", "HourEndingDT": "datetime",
+        "ActualCases": "float", "SKU_Resolved": "category", "Std_CPH": "float", "StdCasesThisHour": DERIVED,
+        "RateAttain_100": DERIVED, "TargetRateAttain": "float", "TargetAttain": DERIVED,
+    },
+    "tblDowntime": {
+        "RowID": "text", "Date": "date", "Shift": "category", "Line": "category", "StartDT": "datetime",
+        "EndDT": "datetime", "Minutes": "float", "Machine": "category", "OperatorEmpID": "category",
+        "Category": "category", "Cause": "category", "ActionTaken": "text", "EscalatedYN": "category",
+        "ResolvedBy": "text", "Notes": "text",
+    },
+}
+
+
+class NormalizationError(ValueError):
+    pass
+
+
+@dataclass
+class NormalizeIssue:
+    cell: str
+    column: str
+    value: Any
+    expected: str
+
+    def __str__(self):
+        return f"{self.cell} {self.column}: {self.value!r} is not a valid {self.expected}"
+
+
+def _float(v: Any) -> float:
+    if isinstance(v, bool):
+        raise NormalizationError
+    if isinstance(v, (int, float)):
+        return float(v)
+    txt = str(v).strip().replace(",", "")
+    if txt.endswith("%"):
+        return float(txt[:-1]) / 100
+    return float(txt)
+
+
+def _naive(v: dt.datetime) -> dt.datetime:
+    # Offset-bearing text ("...Z", "+02:00") becomes local time so it compares with the column's other values
+    return v if v.tzinfo is None else v.astimezone().replace(tzinfo=None)
+
+
+def _category(v: Any):
+    return sys.intern(v.strip()) if isinstance(v, str) else v
+
+
+def _text(v: Any) -> str:
+    return v if isinstance(v, str) else str(v)
+
+
+@dataclass
+class Normalizer:
+    """Per-run converter; remembers each column's datetime format and recently seen values."""
+
+    issues: list[NormalizeIssue] = field(default_factory=list)
+    _formats: dict[tuple[str, str], str] = field(default_factory=dict)
+    _memo: dict[tuple[str, str], dict] = field(default_factory=dict)
+
+    def parse_datetime(self, v: Any, key: tuple[str, str] = ("", "")) -> dt.datetime:
+        if isinstance(v, dt.datetime):
+            return _naive(v)
+        if isinstance(v, dt.date):
+            return dt.datetime.combine(v, dt.time())
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return from_excel(v)
+        txt = str(v).strip()
+        fmt = self._formats.get(key)
+        if fmt is not None:
+            try:
+                return _naive(dt.datetime.fromisoformat(txt)) if fmt == "iso" else dt.datetime.strptime(txt, fmt)
+            except ValueError:
+                pass
+        # Detect the column's format on its first value, and again only if it changes
+        try:
+            parsed = _naive(dt.datetime.fromisoformat(txt))
+            self._formats[key] = "iso"
+            return parsed
+        except ValueError:
+            pass
+        for candidate in DATETIME_FORMATS:
+            try:
+                parsed = dt.datetime.strptime(txt, candidate)
+            except ValueError:
+                continue
+            self._formats[key] = candidate
+            return parsed
+        raise NormalizationError
+
+    def converter(self, table: str, column: str) -> Callable[[Any], Any] | None:
+        kind = COLUMN_TYPES.get(table, {}).get(column)
+        key = (table, column)
+        if kind == "datetime":
+            return lambda v: self.parse_datetime(v, key)
+        if kind == "date":
+            return lambda v: v if type(v) is dt.date else self.parse_datetime(v, key).date()
+        return {"float": _float, "category": _category, "text": _text}.get(kind)
+
+    def normalize_rows(self, table: str, sheet: str, columns: list[tuple[str, str]], rows) -> None:
+        """Convert ``rows`` in place; ``columns`` pairs each column name with its sheet column letter.
+
+        Blank cells become None. A cell that cannot be converted becomes None and is reported once.
+        """
+        for column, letter in columns:
+            kind = COLUMN_TYPES.get(table, {}).get(column)
+            if kind is None:
+                continue
+            convert = self.converter(table, column)
+            memo = self._memo.setdefault((table, column), {})
+            for row in rows:
+                raw = row.get(column)
+                if raw is None or (isinstance(raw, str) and not raw.strip()):
+                    row[column] = None
+                    continue
+                if kind == DERIVED:
+                    row[column] = None if isinstance(raw, str) else raw
+                    continue
+                if isinstance(raw, str) and raw.startswith("="):
+                    self.issues.append(NormalizeIssue(f"{sheet}!{letter}{row.get('_sheet_row')}", column, raw, f"{kind} (formula has no value)"))
+                    row[column] = None
+                    continue
+                hashable = type(raw) in (str, int, float)
+                if hashable and raw in memo:
+                    row[column] = memo[raw]
+                    continue
+                try:
+                    value = convert(raw)
+                except (NormalizationError, ValueError, TypeError, OverflowError):
+                    self.issues.append(NormalizeIssue(f"{sheet}!{letter}{row.get('_sheet_row')}", column, raw, kind))
+                    row[column] = None
+                    continue
+                if hashable:
+                    if len(memo) >= MEMO_SIZE:
+                        memo.clear()
+                    memo[raw] = value
+                row[column] = value
@@ -4,22 +4,44 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import json
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
+
+import archive_history
+import run_metrics
+import snapshot_store
+from dashboard_render import DASHBOARD_SHEETS, render_dashboards
+from reference_data import ReferenceIndex, load_reference_index
+from shift_summary import render_text, shift_summary, unavailable_summary
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_WORKBOOK = REPO_ROOT / "excel" / "Shift_Flight_Deck.xlsm"
 EXPORT_DIR = REPO_ROOT / "exports"
 LOG_PATH = REPO_ROOT / "data" / "logs" / "publish.log"
+PDF_SHEETS = ["Dash_Shift", "Dash_Trends"]
+
+
+def com_available() -> bool:
+    try:
+        import win32com.client  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
 
 
 def export_pdf_via_com(workbook_path: Path, sheets: list[str]):
     try:
+        import pythoncom  # type: ignore
         import win32com.client  # type: ignore
     except Exception:
         return [f"win32com unavailable: skipped PDF export for {','.join(sheets)}"]
 
     EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    # Publish runs this on a worker thread, which needs its own COM apartment
+    pythoncom.CoInitialize()
     xl = win32com.client.Dispatch("Excel.Application")
     xl.Visible = False
     wb = xl.Workbooks.Open(str(workbook_path))
@@ -32,38 +54,81 @@ def export_pdf_via_com(workbook_path: Path, sheets: list[str]):
     finally:
         wb.Close(SaveChanges=False)
         xl.Quit()
+        pythoncom.CoUninitialize()
     return outputs
 
 
-def write_shift_summary(summary_path: Path):
-    summary_path.write_text(
-        "Shift Summary\n"
-        "- Top issues by line: see Analysis_Report\n"
-        "- Key downtime events: see Downtime_Log\n"
-        "- Forecast vs plan: see Dash_Shift\n"
-        "- Top 3 prompts: see Analysis_Report rules section\n",
-        encoding="utf-8",
-    )
+def export_dashboards(workbook_path: Path, ts: str) -> list[str]:
+    """HTML for every dashboard sheet; PDFs through Excel when COM is available, else rendered in Python."""
+    use_com = com_available()
+    with run_metrics.stage("dashboards"):
+        outputs = render_dashboards(workbook_path, EXPORT_DIR, ts, DASHBOARD_SHEETS, pdf=not use_com)
+        if use_com:
+            outputs += export_pdf_via_com(workbook_path, PDF_SHEETS)
+    return outputs
+
+
+def write_shift_summary(summary_path: Path, ref: ReferenceIndex, date: dt.date, shift: str | None = None):
+    """Text and JSON summary from the archived aggregates, plus the lines on file in the workbook.
+
+    Before archive_history.py has run there is nothing to summarize; the summary says so and publish goes on.
+    """
+    with run_metrics.stage("summary"):
+        try:
+            summary = shift_summary(archive_history.DB_PATH, date, date, shift)
+        except (FileNotFoundError, sqlite3.OperationalError) as exc:
+            print(f"Warning: shift summary has no archived data ({exc})", file=sys.stderr)
+            summary = unavailable_summary(date, date, shift, str(exc))
+    lines = []
+    for line in sorted(ref.lines, key=str):
+        target = ref.target(line)
+        stds = sum(1 for std_line, _ in ref.standards if std_line == line)
+        target_txt = f"target {target:.0%}" if target is not None else "no target"
+        lines.append(f"  - {line}: {target_txt}, {stds} standards, {len(ref.machines(line))} machines, {len(ref.trained_operators(line))} trained operators\n")
+    summary_path.write_text(render_text(summary) + "Lines on file:\n" + "".join(lines), encoding="utf-8")
+    summary_path.with_suffix(".json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def take_snapshot(workbook_path: Path, taken_at: dt.datetime) -> Path:
+    """Store only the workbook parts that changed since earlier publishes, then apply retention."""
+    store = EXPORT_DIR / "snapshots"
+    with run_metrics.stage("snapshot"):
+        manifest = snapshot_store.save_snapshot(workbook_path, store, taken_at)
+    with run_metrics.stage("retention"):
+        snapshot_store.apply_retention(store, taken_at)
+    return store / "manifests" / f"{manifest['id']}.json"
 
 
-def publish(workbook_path: Path):
+def publish(workbook_path: Path, date: dt.date | None = None, shift: str | None = None) -> dict[str, object]:
+    """Produce the snapshot, dashboards and summary concurrently; the slowest artifact bounds the run."""
     EXPORT_DIR.mkdir(parents=True, exist_ok=True)
-    ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-    snapshot = EXPORT_DIR / f"Shift_Flight_Deck_{ts}.xlsm"
-    shutil.copy2(workbook_path, snapshot)
-    pdfs = export_pdf_via_com(workbook_path, ["Dash_Shift", "Dash_Trends"])
+    now = dt.datetime.now()
+    ts = now.strftime("%Y%m%d_%H%M%S")
     summary = EXPORT_DIR / f"Shift_Summary_{ts}.txt"
-    write_shift_summary(summary)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        snapshot_job = pool.submit(take_snapshot, workbook_path, now)
+        dashboards_job = pool.submit(export_dashboards, workbook_path, ts)
+        summary_job = pool.submit(
+            lambda: write_shift_summary(summary, load_reference_index(workbook_path), date or dt.date.today(), shift)
+        )
+        snapshot = snapshot_job.result()
+        dashboards = dashboards_job.result()
+        summary_job.result()
 
     LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    LOG_PATH.write_text(f"{dt.datetime.now().isoformat()} published snapshot={snapshot} pdfs={pdfs} summary={summary}\n", encoding="utf-8")
+    with open(LOG_PATH, "a", encoding="utf-8") as log:
+        log.write(f"{dt.datetime.now().isoformat()} published snapshot={snapshot} dashboards={dashboards} summary={summary}\n")
+    return {"snapshot": str(snapshot), "dashboards": dashboards, "summary": str(summary)}
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--workbook", default=str(DEFAULT_WORKBOOK))
+    parser.add_argument("--date", help="Summary date (YYYY-MM-DD); defaults to today")
+    parser.add_argument("--shift", help="Summarize only this shift")
     args = parser.parse_args()
-    publish(Path(args.workbook))
+    with run_metrics.track_run("publish_reports", args.workbook):
+        publish(Path(args.workbook), dt.date.fromisoformat(args.date) if args.date else None, args.shift)
     print("Publish complete")
 
 
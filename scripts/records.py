@@ -0,0 +1,100 @@
+"""Compact row records for the log tables: one slot per column instead of a dict per row."""
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterable, Mapping, MutableMapping
+
+from build_or_repair_workbook import TABLE_DEFS
+
+# Low-cardinality text columns; every row shares one copy of each value
+INTERNED = frozenset({"Line", "Shift", "SKU", "SKU_Resolved", "Machine", "Category", "Cause", "OperatorEmpID", "EscalatedYN"})
+
+
+class Record(MutableMapping):
+    """Dict-compatible row with a fixed set of columns; an unset column reads as a missing key."""
+
+    __slots__ = ()
+    _fields: tuple[str, ...] = ()
+    _field_set: frozenset[str] = frozenset()
+    # Columns whose text values are interned; subclasses may name their own
+    _interned: frozenset[str] = INTERNED
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    def __init__(self, items: Mapping | Iterable[tuple[str, object]] = (), **kwargs):
+        for key, value in (items.items() if isinstance(items, Mapping) else items):
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    @classmethod
+    def from_values(cls, headers, values, sheet_row: int | None = None) -> "Record":
+        row = cls.__new__(cls)
+        for key, value in zip(headers, values):
+            if key in cls._interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(row, key, value)
+        if sheet_row is not None:
+            row._sheet_row = sheet_row
+        return row
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._field_set else default
+
+    def __setitem__(self, key, value):
+        if key not in self._field_set:
+            raise KeyError(f"{type(self).__name__} has no column {key!r}")
+        if key in self._interned and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self._field_set and hasattr(self, key)
+
+    def __iter__(self):
+        return (f for f in self._fields if hasattr(self, f))
+
+    def __len__(self):
+        return sum(1 for f in self._fields if hasattr(self, f))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class ScheduleRecord(Record):
+    __slots__ = _fields = (*TABLE_DEFS["tblSchedule"][1], "_sheet_row")
+
+
+class HourlyRecord(Record):
+    __slots__ = _fields = (*TABLE_DEFS["tblHourly"][1], "_sheet_row")
+
+
+class DowntimeRecord(Record):
+    __slots__ = _fields = (*TABLE_DEFS["tblDowntime"][1], "_sheet_row")
+
+
+RECORD_TYPES = {"tblSchedule": ScheduleRecord, "tblHourly": HourlyRecord, "tblDowntime": DowntimeRecord}
+
+
+def record_type(table_name: str, headers) -> type[Record] | None:
+    """The record class for a table, or None when its headers drifted from TABLE_DEFS (rows stay dicts)."""
+    cls = RECORD_TYPES.get(table_name)
+    if cls is None or not all(isinstance(h, str) and h in cls._field_set for h in headers):
+        return None
+    return cls
@@ -0,0 +1,204 @@
+"""Reference-data index over the Parameters tables, cached by a hash of the sheet."""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import sqlite3
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from build_or_repair_workbook import SHARED_STRING_REF, TABLE_DEFS, shared_strings, sheet_parts, table_parts
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CACHE_PATH = REPO_ROOT / "data" / "reference_cache.sqlite"
+INDEX_VERSION = "1"
+CACHE_KEEP = 50
+PARAMETER_TABLES = [name for name, (sheet, _) in TABLE_DEFS.items() if sheet == "Parameters"]
+
+_memo: dict[str, "ReferenceIndex"] = {}
+# load_reference_index's default cache: CACHE_PATH as set at call time, so tests can redirect it
+_DEFAULT_CACHE = object()
+
+
+def _num(v) -> float | None:
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _clock(v):
+    """A time-typed Parameters cell as an ISO string, so the index stays JSON; other values are kept as read."""
+    if isinstance(v, dt.datetime):
+        v = v.time()
+    return v.isoformat() if isinstance(v, dt.time) else v
+
+
+@dataclass
+class ReferenceIndex:
+    """O(1) lookups over tblStandards, tblLines, tblMachines and tblOperators."""
+
+    standards: dict[tuple[str, str], dict] = field(default_factory=dict)
+    lines: dict[str, dict] = field(default_factory=dict)
+    machines_by_line: dict[str, list[str]] = field(default_factory=dict)
+    operators_by_line: dict[str, list[str]] = field(default_factory=dict)
+    operators: dict[str, dict] = field(default_factory=dict)
+
+    @classmethod
+    def from_tables(cls, tables: dict[str, list[dict]]) -> "ReferenceIndex":
+        index = cls()
+        for r in tables.get("tblStandards", []):
+            index.standards[(r.get("Line"), r.get("SKU"))] = {"ProductName": r.get("ProductName"), "Std_CPH": _num(r.get("Std_CPH"))}
+        for r in tables.get("tblLines", []):
+            index.lines[r.get("Line")] = {
+                "TargetRateAttain": _num(r.get("TargetRateAttain")),
+                "ShiftStartTime": _clock(r.get("ShiftStartTime")),
+                "ShiftEndTime": _clock(r.get("ShiftEndTime")),
+            }
+        for r in tables.get("tblMachines", []):
+            index.machines_by_line.setdefault(r.get("Line"), []).append(r.get("Machine"))
+        for r in tables.get("tblOperators", []):
+            emp = str(r.get("EmpID"))
+            index.operators[emp] = {"OperatorName": r.get("OperatorName"), "Role": r.get("Role")}
+            for line in str(r.get("TrainedLines") or "").split(","):
+                if line.strip():
+                    index.operators_by_line.setdefault(line.strip(), []).append(emp)
+        return index
+
+    def std_cph(self, line, sku) -> float | None:
+        std = self.standards.get((line, sku))
+        return std["Std_CPH"] if std else None
+
+    def has_standard(self, line, sku) -> bool:
+        return (line, sku) in self.standards
+
+    def target(self, line) -> float | None:
+        info = self.lines.get(line)
+        return info["TargetRateAttain"] if info else None
+
+    def machines(self, line) -> list[str]:
+        return self.machines_by_line.get(line, [])
+
+    def trained_operators(self, line) -> list[str]:
+        return self.operators_by_line.get(line, [])
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "standards": [[line, sku, v] for (line, sku), v in self.standards.items()],
+            "lines": self.lines,
+            "machines_by_line": self.machines_by_line,
+            "operators_by_line": self.operators_by_line,
+            "operators": self.operators,
+        })
+
+    @classmethod
+    def from_json(cls, payload: str) -> "ReferenceIndex":
+        data = json.loads(payload)
+        return cls(
+            standards={(line, sku): v for line, sku, v in data["standards"]},
+            lines=data["lines"],
+            machines_by_line=data["machines_by_line"],
+            operators_by_line=data["operators_by_line"],
+            operators=data["operators"],
+        )
+
+
+def parameters_fingerprint(zf: zipfile.ZipFile, sheet_part: str) -> str:
+    """Hash the Parameters sheet XML, its table parts and the shared strings it references."""
+    digest = hashlib.sha256(INDEX_VERSION.encode("utf-8"))
+    xml = zf.read(sheet_part)
+    digest.update(xml)
+    refs = SHARED_STRING_REF.findall(xml)
+    strings = shared_strings(zf) if refs else []
+    for idx in refs:
+        digest.update(b"\0" + strings[int(idx)].encode("utf-8"))
+    for part, _ in table_parts(zf, sheet_part):
+        digest.update(zf.read(part))
+    return digest.hexdigest()
+
+
+def read_parameter_tables(zf: zipfile.ZipFile, ws, sheet_part: str) -> dict[str, list[dict]]:
+    grid = list(ws.iter_rows(values_only=True))
+    tables = {}
+    for _, table in table_parts(zf, sheet_part):
+        name = table.get("displayName")
+        if name not in PARAMETER_TABLES:
+            continue
+        min_cell, max_cell = table.get("ref").split(":")
+        min_col, min_row = ord(min_cell[0]) - 65, int(min_cell[1:]) - 1
+        max_col, max_row = ord(max_cell[0]) - 65, int(max_cell[1:]) - 1
+
+        def cell(r, c):
+            row = grid[r] if r < len(grid) else ()
+            return row[c] if c < len(row) else None
+
+        headers = [cell(min_row, c) for c in range(min_col, max_col + 1)]
+        rows = []
+        for r in range(min_row + 1, max_row + 1):
+            vals = [cell(r, c) for c in range(min_col, max_col + 1)]
+            if any(v not in (None, "") for v in vals):
+                rows.append(dict(zip(headers, vals)))
+        tables[name] = rows
+    return tables
+
+
+def open_cache(cache_path: Path):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=60)
+    conn.execute("CREATE TABLE IF NOT EXISTS reference_index (Fingerprint TEXT PRIMARY KEY, IndexJSON TEXT, BuiltAt TEXT)")
+    return conn
+
+
+def load_reference_index(workbook_path: Path, cache_path: Path | None = _DEFAULT_CACHE, stats: dict | None = None) -> ReferenceIndex:
+    """Return the reference index for a workbook, building it only when the Parameters sheet changed.
+
+    ``cache_path`` defaults to CACHE_PATH; None keeps the index in this process only.
+    """
+    if cache_path is _DEFAULT_CACHE:
+        cache_path = CACHE_PATH
+    with zipfile.ZipFile(workbook_path) as zf:
+        sheet_part = sheet_parts(zf)["Parameters"]
+        fingerprint = parameters_fingerprint(zf, sheet_part)
+        if fingerprint in _memo:
+            _count(stats, "memo")
+            return _memo[fingerprint]
+        conn = open_cache(cache_path) if cache_path else None
+        try:
+            hit = conn.execute("SELECT IndexJSON FROM reference_index WHERE Fingerprint = ?", (fingerprint,)).fetchone() if conn else None
+            if hit:
+                index = ReferenceIndex.from_json(hit[0])
+                _count(stats, "cached")
+            else:
+                wb = load_workbook(workbook_path, read_only=True, data_only=True)
+                try:
+                    index = ReferenceIndex.from_tables(read_parameter_tables(zf, wb["Parameters"], sheet_part))
+                finally:
+                    wb.close()
+                _count(stats, "built")
+                if conn:
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO reference_index VALUES (?, ?, ?)",
+                            (fingerprint, index.to_json(), dt.datetime.now().isoformat()),
+                        )
+                        conn.execute(
+                            "DELETE FROM reference_index WHERE Fingerprint NOT IN "
+                            "(SELECT Fingerprint FROM reference_index ORDER BY BuiltAt DESC LIMIT ?)",
+                            (CACHE_KEEP,),
+                        )
+        finally:
+            if conn:
+                conn.close()
+    _memo[fingerprint] = index
+    return index
+
+
+def _count(stats: dict | None, key: str):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Rebuild a Shift Flight Deck workbook from history.sqlite for a date range and line set."""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import sqlite3
+import warnings
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formula.translate import Translator
+from openpyxl.styles import Font
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+import run_metrics
+from archive_history import ARCHIVE_TABLES, DB_PATH, DEFAULT_WORKBOOK, load_payload, require_tables, table_rows
+from build_or_repair_workbook import DASHBOARD_CELLS, RULE_VALIDATIONS, SHEETS, TABLE_DEFS, TABLE_START_COL
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+OUTPUT_DIR = REPO_ROOT / "excel"
+DATETIME_COLUMNS = {"Date", "StartDT", "EndDT", "HourEndingDT"}
+
+
+def restore_value(column: str, letter: str, value, origin_row: int | None, target_row: int):
+    """Turn an archived JSON value back into a cell value at its new row."""
+    if not isinstance(value, str):
+        return value
+    if value.startswith("=") and origin_row:
+        return Translator(value, origin=f"{letter}{origin_row}").translate_formula(f"{letter}{target_row}")
+    if column in DATETIME_COLUMNS:
+        try:
+            return dt.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def history_rows(conn: sqlite3.Connection, table_name: str, start: dt.date, end: dt.date, lines: list[str] | None):
+    """Yield archived rows for the range in original sheet order, one value list per row."""
+    columns = TABLE_DEFS[table_name][1]
+    letters = [get_column_letter(i) for i in range(1, len(columns) + 1)]  # archived tables start at column A
+    sql = f"SELECT payload, SheetRow FROM {ARCHIVE_TABLES[table_name]} WHERE Date BETWEEN ? AND ?"
+    params: list = [start.isoformat(), end.isoformat()]
+    if lines:
+        sql += f" AND Line IN ({','.join('?' for _ in lines)})"
+        params.extend(lines)
+    sql += " ORDER BY Date, SheetRow, RowID"
+    target_row = 1
+    for payload, sheet_row in conn.execute(sql, params):
+        target_row += 1
+        row = load_payload(payload)
+        yield [restore_value(c, letter, row.get(c), sheet_row, target_row) for c, letter in zip(columns, letters)]
+
+
+def reference_rows(reference: Path | None) -> dict[str, list[list]]:
+    """Parameters tables and rules come from the live workbook; history only holds the logs."""
+    if reference is None or not reference.exists():
+        return {}
+    wb = load_workbook(reference, keep_vba=True)
+    refs = {}
+    for table_name, (sheet_name, cols) in TABLE_DEFS.items():
+        if table_name in ARCHIVE_TABLES or sheet_name not in wb.sheetnames:
+            continue
+        if table_name in wb[sheet_name].tables:
+            refs[table_name] = [[row.get(c) for c in cols] for row in table_rows(wb[sheet_name], table_name)]
+    wb.close()
+    return refs
+
+
+def write_sheet(ws, blocks: list[tuple[str, object]], cells: dict | None = None):
+    """Stream table blocks side by side, plus loose cells, into a write-only sheet and add the tables."""
+    placed: dict[int, dict[int, object]] = {}
+    for ref, value in (cells or {}).items():
+        col, row = coordinate_from_string(ref)
+        placed.setdefault(row, {})[column_index_from_string(col)] = value
+    last_placed = max(placed, default=0)
+    live = [(name, TABLE_START_COL.get(name, 1), iter(rows)) for name, rows in blocks]
+    counts = {name: 0 for name, _ in blocks}
+
+    r = 0
+    while live or r < last_placed:
+        r += 1
+        values = dict(placed.get(r, {}))
+        for stream in list(live):
+            name, start, it = stream
+            vals = next(it, None)
+            if vals is None:
+                live.remove(stream)
+                continue
+            if counts[name] == 0:
+                vals = [WriteOnlyCell(ws, v) for v in vals]
+                for cell in vals:
+                    cell.font = Font(bold=True)
+            counts[name] += 1
+            for i, v in enumerate(vals):
+                values[start + i] = v
+        if not values and not live and r > last_placed:
+            break
+        ws.append([values.get(c) for c in range(1, max(values, default=0) + 1)])
+
+    for name, _ in blocks:
+        cols = TABLE_DEFS[name][1]
+        start = TABLE_START_COL.get(name, 1)
+        ref = f"{get_column_letter(start)}1:{get_column_letter(start + len(cols) - 1)}{max(2, counts[name])}"
+        tab = Table(displayName=name, ref=ref)
+        tab.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True)
+        # Write-only sheets cannot read headings back from cells; declare them
+        tab.tableColumns = [TableColumn(id=i, name=c) for i, c in enumerate(cols, 1)]
+        tab.autoFilter = AutoFilter(ref=ref)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            ws.add_table(tab)
+    return counts
+
+
+def rehydrate(db_path: Path, output_path: Path, start: dt.date, end: dt.date, lines: list[str] | None = None,
+              reference: Path | None = None) -> dict[str, int]:
+    """Write a TABLE_DEFS-compliant workbook holding the archived logs for ``start``..``end``."""
+    if not db_path.exists():
+        raise FileNotFoundError(f"History database not found: {db_path}")
+    refs = reference_rows(reference)
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        require_tables(conn, ARCHIVE_TABLES.values())
+    except sqlite3.Error:
+        conn.close()
+        raise
+
+    wb = Workbook(write_only=True)
+    counts = {}
+    for sheet_name in SHEETS:
+        ws = wb.create_sheet(sheet_name)
+        blocks = []
+        for table_name, (table_sheet, cols) in TABLE_DEFS.items():
+            if table_sheet != sheet_name:
+                continue
+            if table_name in ARCHIVE_TABLES:
+                body = history_rows(conn, table_name, start, end, lines)
+            else:
+                body = refs.get(table_name, [])
+            blocks.append((table_name, _with_header(cols, body)))
+        cells = dict(DASHBOARD_CELLS.get(sheet_name, {}))
+        if sheet_name == "Dash_Shift":
+            cells["A1"] = WriteOnlyCell(ws, cells["A1"])
+            cells["A1"].font = Font(size=16, bold=True)
+            scope = ", ".join(lines) if lines else "all lines"
+            cells["A12"] = f"Rehydrated from history: {start.isoformat()} to {end.isoformat()} ({scope})"
+        if sheet_name == "Rules_Authoring":
+            for sqref, formula in RULE_VALIDATIONS:
+                dv = DataValidation(type="list", formula1=formula, allow_blank=False)
+                dv.add(sqref)
+                ws.data_validations.append(dv)
+        written = write_sheet(ws, blocks, cells)
+        counts.update({name: n - 1 for name, n in written.items()})
+    conn.close()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(output_path)
+    return counts
+
+
+def _with_header(columns, body):
+    yield columns
+    yield from body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--from", dest="start", required=True, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="Last date (YYYY-MM-DD); defaults to --from")
+    parser.add_argument("--lines", default="", help='Comma-separated lines, e.g. "Line 1,Line 2"; default all')
+    parser.add_argument("--reference", default=str(DEFAULT_WORKBOOK), help="Workbook providing Parameters tables and rules")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    start = dt.date.fromisoformat(args.start)
+    end = dt.date.fromisoformat(args.end) if args.end else start
+    lines = [s.strip() for s in args.lines.split(",") if s.strip()] or None
+    output = Path(args.output) if args.output else OUTPUT_DIR / f"Shift_Flight_Deck_{start}_{end}.xlsx"
+    with run_metrics.track_run("rehydrate_workbook", output):
+        counts = rehydrate(Path(args.db), output, start, end, lines, Path(args.reference))
+        for table_name, n in counts.items():
+            run_metrics.record_rows(table_name, n)
+    print(f"Rehydrated workbook: {output}")
+    for table_name in ARCHIVE_TABLES:
+        print(f"  {table_name}: {counts.get(table_name, 0)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Per-run metrics for the scripts, appended to data/metrics.sqlite, and a CLI to query them."""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+METRICS_DB = REPO_ROOT / "data" / "metrics.sqlite"
+PERCENTILES = (50, 90, 99)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs (RunID INTEGER PRIMARY KEY AUTOINCREMENT, Script TEXT, Workbook TEXT, "
+    "StartedAt TEXT, DurationMs REAL, Status TEXT, Error TEXT, PeakMemoryKB INTEGER, Triggers INTEGER, "
+    "TotalRows INTEGER, RowCounts TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_script_started ON runs(Script, StartedAt)",
+    "CREATE TABLE IF NOT EXISTS run_stages (RunID INTEGER, Stage TEXT, DurationMs REAL, PRIMARY KEY (RunID, Stage))",
+]
+
+
+@dataclass
+class RunRecord:
+    script: str
+    workbook: str
+    started_at: dt.datetime
+    stages: dict[str, float] = field(default_factory=dict)
+    rows: dict[str, int] = field(default_factory=dict)
+    triggers: int | None = None
+
+
+_active: RunRecord | None = None
+
+
+def peak_memory_kb() -> int | None:
+    """Peak resident memory of this process, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+    try:
+        import psutil  # type: ignore
+    except Exception:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) // 1024
+
+
+def open_metrics(db_path: Path | None = None) -> sqlite3.Connection:
+    db_path = db_path or METRICS_DB
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    return conn
+
+
+@contextmanager
+def track_run(script: str, workbook: str | Path | None = None, db_path: Path | None = None):
+    """Record one script run: stages, row counts and triggers reported inside it, duration, memory and status."""
+    global _active
+    record = RunRecord(script, str(workbook or ""), dt.datetime.now())
+    previous, _active = _active, record
+    start = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield record
+    except BaseException as exc:
+        status, error = ("interrupted" if isinstance(exc, KeyboardInterrupt) else "error"), f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _active = previous
+        try:
+            _store(record, (time.perf_counter() - start) * 1000, status, error, db_path)
+        except (sqlite3.Error, OSError) as exc:
+            # Metrics are best effort: a locked or unwritable store must not fail or mask the run itself
+            print(f"Warning: run metrics not recorded ({type(exc).__name__}: {exc})", file=sys.stderr)
+
+
+def _store(record: RunRecord, duration_ms: float, status: str, error: str | None, db_path: Path | None):
+    conn = open_metrics(db_path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO runs (Script, Workbook, StartedAt, DurationMs, Status, Error, PeakMemoryKB, Triggers, TotalRows, RowCounts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record.script, record.workbook, record.started_at.isoformat(timespec="seconds"), round(duration_ms, 1),
+                 status, error, peak_memory_kb(), record.triggers, sum(record.rows.values()) if record.rows else None,
+                 json.dumps(record.rows)),
+            )
+            conn.executemany(
+                "INSERT INTO run_stages VALUES (?, ?, ?)",
+                [(cur.lastrowid, name, round(ms, 1)) for name, ms in record.stages.items()],
+            )
+    finally:
+        conn.close()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the active run; a no-op outside ``track_run``."""
+    record = _active
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record.stages[name] = record.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def record_rows(table: str, count: int):
+    if _active is not None:
+        _active.rows[table] = _active.rows.get(table, 0) + count
+
+
+def record_triggers(count: int):
+    if _active is not None:
+        _active.triggers = (_active.triggers or 0) + count
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Linear-interpolated percentile of ``values``."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _filters(script: str | None, workbook: str | None, since: str | None) -> tuple[str, list]:
+    clauses, params = [], []
+    for column, value, op in (("Script", script, "="), ("Workbook", workbook, "LIKE"), ("StartedAt", since, ">=")):
+        if value:
+            clauses.append(f"r.{column} {op} ?")
+            params.append(f"%{value}%" if op == "LIKE" else value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def summarize(conn: sqlite3.Connection, script: str | None = None, workbook: str | None = None,
+              since: str | None = None) -> list[dict]:
+    """Duration percentiles per script and per stage, with run counts and error counts."""
+    where, params = _filters(script, workbook, since)
+    groups: dict[tuple[str, str], dict] = {}
+    for name, status, ms, mem in conn.execute(f"SELECT r.Script, r.Status, r.DurationMs, r.PeakMemoryKB FROM runs r{where}", params):
+        g = groups.setdefault((name, ""), {"durations": [], "memory": [], "errors": 0})
+        g["durations"].append(ms)
+        g["errors"] += status != "ok"
+        if mem is not None:
+            g["memory"].append(mem)
+    for name, stage_name, ms in conn.execute(
+        f"SELECT r.Script, s.Stage, s.DurationMs FROM run_stages s JOIN runs r ON r.RunID = s.RunID{where}", params
+    ):
+        groups.setdefault((name, stage_name), {"durations": [], "memory": [], "errors": 0})["durations"].append(ms)
+
+    out = []
+    for (name, stage_name), g in sorted(groups.items()):
+        row = {"script": name, "stage": stage_name or "(run)", "runs": len(g["durations"])}
+        row.update({f"p{p}_ms": percentile(g["durations"], p) for p in PERCENTILES})
+        row["max_ms"] = max(g["durations"])
+        if not stage_name:
+            row["errors"] = g["errors"]
+            row["peak_memory_kb"] = max(g["memory"], default=None)
+        out.append(row)
+    return out
+
+
+def trend(conn: sqlite3.Connection, script: str, workbook: str | None = None, since: str | None = None,
+          period: str = "day") -> list[dict]:
+    """Median duration, rows and peak memory per day or ISO week, to spot slowdowns as workbooks grow."""
+    where, params = _filters(script, workbook, since)
+    buckets: dict[str, dict[str, list]] = {}
+    for started, ms, rows, mem, status in conn.execute(
+        f"SELECT r.StartedAt, r.DurationMs, r.TotalRows, r.PeakMemoryKB, r.Status FROM runs r{where} ORDER BY r.StartedAt", params
+    ):
+        day = dt.datetime.fromisoformat(started).date()
+        key = f"{day.isocalendar()[0]}-W{day.isocalendar()[1]:02d}" if period == "week" else day.isoformat()
+        b = buckets.setdefault(key, {"durations": [], "rows": [], "memory": [], "errors": 0})
+        b["durations"].append(ms)
+        b["errors"] += status != "ok"
+        if rows is not None:
+            b["rows"].append(rows)
+        if mem is not None:
+            b["memory"].append(mem)
+    return [
+        {
+            "period": key,
+            "runs": len(b["durations"]),
+            "errors": b["errors"],
+            "p50_ms": percentile(b["durations"], 50),
+            "p90_ms": percentile(b["durations"], 90),
+            "p50_rows": percentile(b["rows"], 50),
+            "peak_memory_kb": max(b["memory"], default=None),
+        }
+        for key, b in buckets.items()
+    ]
+
+
+def _fmt(v) -> str:
+    if v is None:
+        return "-"
+    return f"{v:,.0f}" if isinstance(v, (int, float)) else str(v)
+
+
+def print_table(rows: list[dict]):
+    if not rows:
+        print("No runs recorded")
+        return
+    headers = list(rows[0])
+    for row in rows[1:]:
+        headers += [h for h in row if h not in headers]
+    cells = [[_fmt(r.get(h)) for h in headers] for r in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for c in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(c, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(METRICS_DB))
+    parser.add_argument("--script", help="e.g. analyze_workbook")
+    parser.add_argument("--workbook", help="Substring of the workbook path")
+    parser.add_argument("--since", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--trend", choices=["day", "week"], help="Show a per-day or per-week trend for --script")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.trend and not args.script:
+        parser.error("--trend needs --script")
+
+    conn = open_metrics(Path(args.db))
+    try:
+        if args.trend:
+            rows = trend(conn, args.script, args.workbook, args.since, args.trend)
+        else:
+            rows = summarize(conn, args.script, args.workbook, args.since)
+    finally:
+        conn.close()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Schedule integrity: overlapping orders and unscheduled shift time, found in one sweep over tblSchedule."""
+from __future__ import annotations
+
+import datetime as dt
+import heapq
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+
+@dataclass(slots=True)
+class ScheduleIssue:
+    line: str
+    kind: str  # "overlap" or "gap"
+    start: dt.datetime
+    end: dt.datetime
+    orders: tuple[str, ...] = ()
+    sheet_rows: tuple[int, ...] = ()
+
+    @property
+    def minutes(self) -> float:
+        return round((self.end - self.start).total_seconds() / 60, 1)
+
+
+def _time_of(v: Any) -> dt.time | None:
+    if isinstance(v, dt.datetime):
+        return v.time()
+    if isinstance(v, dt.time):
+        return v
+    if isinstance(v, (int, float)) and not isinstance(v, bool) and 0 <= v < 1:
+        # Excel stores a time of day as a fraction of a day
+        minutes = round(v * 24 * 60)
+        return dt.time(minutes // 60, minutes % 60)
+    try:
+        return dt.time.fromisoformat(str(v).strip())
+    except ValueError:
+        return None
+
+
+def shift_windows(lines: dict[str, dict]) -> dict[str, tuple[dt.time, dt.time]]:
+    """(ShiftStartTime, ShiftEndTime) per line from tblLines; lines without both are left out."""
+    windows = {}
+    for line, info in lines.items():
+        start, end = _time_of(info.get("ShiftStartTime")), _time_of(info.get("ShiftEndTime"))
+        if start is not None and end is not None and start != end:
+            windows[line] = (start, end)
+    return windows
+
+
+def _window(start: dt.datetime, shift: tuple[dt.time, dt.time]) -> tuple[dt.datetime, dt.datetime]:
+    """The shift window containing ``start``, or the next one if ``start`` falls between shifts."""
+    open_t, close_t = shift
+    day = start.date()
+    if close_t <= open_t and start.time() < close_t:
+        day -= dt.timedelta(days=1)  # overnight shift that began the day before
+    opens = dt.datetime.combine(day, open_t)
+    closes = dt.datetime.combine(day + dt.timedelta(days=close_t <= open_t), close_t)
+    if start >= closes:
+        opens, closes = opens + dt.timedelta(days=1), closes + dt.timedelta(days=1)
+    return opens, closes
+
+
+def scan_schedule(schedule_rows: Iterable, lines: dict[str, dict] | None = None) -> list[ScheduleIssue]:
+    """Every overlapping pair of orders and every unscheduled gap inside a line's shift hours.
+
+    Rows are sorted once by (Line, StartDT) and swept in order, keeping a heap of orders still
+    running; rows without both StartDT and EndDT are skipped. Gaps are only reported for lines
+    with shift hours in ``lines`` (tblLines), in shifts that an order starts in or runs into.
+    """
+    windows = shift_windows(lines or {})
+    slots = sorted(
+        (r for r in schedule_rows if r.get("StartDT") and r.get("EndDT")),
+        key=lambda r: (str(r.get("Line")), r.get("StartDT"), r.get("EndDT")),
+    )
+    issues: list[ScheduleIssue] = []
+    active: list[tuple[dt.datetime, int, Any]] = []  # (EndDT, seq, row) of orders not yet finished
+    line = shift = reach = None  # current line, its open shift window, and the latest EndDT seen on the line
+
+    def close_shift(next_start):
+        if shift is None:
+            return
+        if reach < shift[1]:
+            issues.append(ScheduleIssue(line, "gap", max(reach, shift[0]), shift[1]))
+            return
+        # An order ran past this shift: the rest of the shift it ends in is a gap unless the next order starts there
+        later = _window(reach, windows[line])
+        if later[0] < reach < later[1] and (next_start is None or next_start >= later[1]):
+            issues.append(ScheduleIssue(line, "gap", reach, later[1]))
+
+    for seq, r in enumerate(slots):
+        start, end = r.get("StartDT"), r.get("EndDT")
+        if r.get("Line") != line:
+            close_shift(None)
+            line, active, shift, reach = r.get("Line"), [], None, None
+
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            issues.append(ScheduleIssue(line, "overlap", start, min(end, other.get("EndDT")),
+                                        (str(other.get("Order") or ""), str(r.get("Order") or "")),
+                                        (other.get("_sheet_row"), r.get("_sheet_row"))))
+        heapq.heappush(active, (end, seq, r))
+
+        if line in windows:
+            if shift is None or start >= shift[1]:
+                close_shift(start)
+                window = _window(start, windows[line])
+                shift = window if end > window[0] else None  # orders wholly between shifts open no window
+            if shift is not None and start < shift[1]:
+                # Orders still running from an earlier shift cover the start of this one
+                covered = shift[0] if reach is None else max(shift[0], reach)
+                if start > covered:
+                    issues.append(ScheduleIssue(line, "gap", covered, start))
+        reach = end if reach is None else max(reach, end)
+    close_shift(None)
+    return issues
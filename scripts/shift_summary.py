@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Shift summary built from the archived aggregates in history.sqlite."""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import sqlite3
+from pathlib import Path
+
+import run_metrics
+from archive_history import AGGREGATE_TABLES, DB_PATH, require_tables
+from forecast import project
+
+TOP_N = 3
+
+
+def _where(start: str, end: str, shift: str | None, lines: list[str] | None, alias: str = "") -> tuple[str, list]:
+    p = f"{alias}." if alias else ""
+    sql = f" WHERE {p}Date BETWEEN ? AND ?"
+    params: list = [start, end]
+    if shift:
+        sql += f" AND {p}Shift = ?"
+        params.append(shift)
+    if lines:
+        sql += f" AND {p}Line IN ({','.join('?' for _ in lines)})"
+        params.extend(lines)
+    return sql, params
+
+
+def forecast_cases(actual: float, rate: float | None, last_hour: str | None, scheduled_end: str | None) -> float:
+    """Actual so far plus the archived EWMA run rate over the hours still scheduled, as on Dash_Shift."""
+    if not last_hour or not scheduled_end:
+        return actual
+    try:
+        return project(actual, rate, dt.datetime.fromisoformat(last_hour), dt.datetime.fromisoformat(scheduled_end))[1]
+    except ValueError:
+        return actual
+
+
+def shift_summary(db_path: Path, start: dt.date, end: dt.date, shift: str | None = None, lines: list[str] | None = None,
+                  top: int = TOP_N) -> dict:
+    """Per-line plan vs actual, forecast, top downtime causes and top triggers for the range."""
+    if not db_path.exists():
+        raise FileNotFoundError(f"History database not found: {db_path}")
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        require_tables(conn, [*AGGREGATE_TABLES, "trigger_log"])
+        where, params = _where(start.isoformat(), end.isoformat(), shift, lines)
+        per_line: dict[str, dict] = {}
+
+        def entry(line):
+            return per_line.setdefault(line or "Unassigned", {
+                "planned": 0.0, "actual": 0.0, "forecast": 0.0, "attainment": None, "hours": 0,
+                "downtime_minutes": 0.0, "top_causes": [], "top_triggers": [],
+            })
+
+        for line, planned in conn.execute(f"SELECT Line, SUM(PlannedCases) FROM plan_agg{where} GROUP BY Line", params):
+            entry(line)["planned"] = planned or 0.0
+
+        # The forecast is per shift: each shift's actual plus its run rate over its own remaining schedule
+        for line, actual, hours, rate, last_hour, scheduled_end in conn.execute(
+            "SELECT p.Line, p.ActualCases, p.Hours, p.RunRate, p.LastHourEnding, s.ScheduledEnd FROM production_agg p "
+            "LEFT JOIN plan_agg s ON s.Date = p.Date AND s.Shift = p.Shift AND s.Line IS p.Line"
+            + _where(start.isoformat(), end.isoformat(), shift, lines, "p")[0],
+            params,
+        ):
+            e = entry(line)
+            e["actual"] += actual or 0.0
+            e["hours"] += hours or 0
+            e["forecast"] += forecast_cases(actual or 0.0, rate, last_hour, scheduled_end)
+
+        for line, cause, minutes, events in conn.execute(
+            f"SELECT Line, Cause, SUM(Minutes) AS m, SUM(Events) FROM downtime_agg{where} GROUP BY Line, Cause ORDER BY Line, m DESC, Cause",
+            params,
+        ):
+            e = entry(line)
+            e["downtime_minutes"] += minutes or 0.0
+            if len(e["top_causes"]) < top:
+                e["top_causes"].append({"cause": cause, "minutes": round(minutes or 0.0, 1), "events": events})
+
+        for line, rule_id, severity, description, count, impact in conn.execute(
+            f"SELECT Line, RuleID, Severity, Description, COUNT(*), SUM(Impact) AS i FROM trigger_log{where} "
+            "GROUP BY Line, RuleID, Severity, Description "
+            "ORDER BY Line, CASE Severity WHEN 'Urgent' THEN 4 WHEN 'Action' THEN 3 WHEN 'Watch' THEN 2 WHEN 'Info' THEN 1 ELSE 0 END DESC, i DESC, RuleID",
+            params,
+        ):
+            e = entry(line)
+            if len(e["top_triggers"]) < top:
+                e["top_triggers"].append({"rule_id": rule_id, "severity": severity, "description": description, "count": count})
+    finally:
+        conn.close()
+
+    for e in per_line.values():
+        e["attainment"] = round(e["actual"] / e["planned"], 4) if e["planned"] else None
+        e["forecast"] = round(e["forecast"], 1)
+        e["downtime_minutes"] = round(e["downtime_minutes"], 1)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "shift": shift,
+        "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "lines": dict(sorted(per_line.items())),
+    }
+
+
+def unavailable_summary(start: dt.date, end: dt.date, shift: str | None, reason: str) -> dict:
+    """An empty summary for a history database that archive_history.py has not created yet."""
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "shift": shift,
+        "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "lines": {},
+        "unavailable": reason,
+    }
+
+
+def render_text(summary: dict) -> str:
+    period = summary["from"] if summary["from"] == summary["to"] else f"{summary['from']} to {summary['to']}"
+    out = [f"Shift Summary - {period}" + (f", shift {summary['shift']}" if summary["shift"] else "")]
+    if summary.get("unavailable"):
+        out.append("- No archived data; run archive_history.py")
+    elif not summary["lines"]:
+        out.append("- No archived data for this period")
+    for line, e in summary["lines"].items():
+        attain = f"{e['attainment']:.0%}" if e["attainment"] is not None else "n/a"
+        out.append(f"- {line}: planned {e['planned']:,.0f}, actual {e['actual']:,.0f} ({attain}), forecast {e['forecast']:,.0f}")
+        if e["top_causes"]:
+            out.append(f"  Downtime {e['downtime_minutes']:,.0f} min; top causes: "
+                       + "; ".join(f"{c['cause']} {c['minutes']:,.0f} min ({c['events']}x)" for c in e["top_causes"]))
+        if e["top_triggers"]:
+            out.append("  Top prompts: " + "; ".join(f"{t['severity']} {t['rule_id']} {t['description']}" for t in e["top_triggers"]))
+    return "\n".join(out) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--from", dest="start", help="First date (YYYY-MM-DD); defaults to today")
+    parser.add_argument("--to", dest="end", help="Last date (YYYY-MM-DD); defaults to --from")
+    parser.add_argument("--shift", help="Only this shift")
+    parser.add_argument("--lines", default="", help='Comma-separated lines, e.g. "Line 1,Line 2"; default all')
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    args = parser.parse_args()
+
+    start = dt.date.fromisoformat(args.start) if args.start else dt.date.today()
+    end = dt.date.fromisoformat(args.end) if args.end else start
+    lines = [s.strip() for s in args.lines.split(",") if s.strip()] or None
+    with run_metrics.track_run("shift_summary"):
+        summary = shift_summary(Path(args.db), start, end, args.shift, lines, args.top)
+    print(json.dumps(summary, indent=2) if args.json else render_text(summary).rstrip("\n"))
+
+
+if __name__ == "__main__":
+    main()
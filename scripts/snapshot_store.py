@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Content-addressed snapshots of published workbooks: each unique zip part is stored once."""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import time
+import zipfile
+import zlib
+from pathlib import Path
+
+import run_metrics
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STORE_DIR = REPO_ROOT / "exports" / "snapshots"
+KEEP_HOURLY_DAYS = 2
+KEEP_DAILY_DAYS = 90
+STAMP_FORMAT = "%Y%m%d_%H%M%S"
+# Parts written or reused this recently are never collected: a publish running alongside may not have written its manifest yet
+GC_GRACE_SECONDS = 3600
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _object_path(store: Path, digest: str) -> Path:
+    return store / "objects" / digest[:2] / digest
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _touch(path: Path) -> bool:
+    """Mark a stored part as in use; False if it is gone."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def list_snapshots(store: Path | None = None) -> list[dict]:
+    """Manifests, oldest first."""
+    store = store or STORE_DIR
+    manifests = [json.loads(p.read_text(encoding="utf-8")) for p in (store / "manifests").glob("*.json")]
+    return sorted(manifests, key=lambda m: (m["taken_at"], m["id"]))
+
+
+def save_snapshot(workbook_path: Path, store: Path | None = None, taken_at: dt.datetime | None = None) -> dict:
+    """Store the workbook's parts that are not already in the store and write a manifest for it."""
+    store = store or STORE_DIR
+    taken_at = taken_at or dt.datetime.now()
+    workbook_sha = _file_sha256(workbook_path)
+    previous = list_snapshots(store)
+    new_objects = new_bytes = 0
+
+    same = next((m for m in reversed(previous) if m["sha256"] == workbook_sha), None)
+    if same is not None and all(_touch(_object_path(store, p["sha256"])) for p in same["parts"]):
+        # Unchanged since an earlier publish: reuse its part list without opening the zip
+        parts = same["parts"]
+    else:
+        parts = []
+        with zipfile.ZipFile(workbook_path) as zf:
+            for info in zf.infolist():
+                data = zf.read(info)
+                digest = _sha256(data)
+                obj = _object_path(store, digest)
+                if not _touch(obj):
+                    packed = zlib.compress(data, 6)
+                    _write_atomic(obj, packed)
+                    new_objects += 1
+                    new_bytes += len(packed)
+                parts.append({
+                    "name": info.filename,
+                    "sha256": digest,
+                    "size": info.file_size,
+                    "compress_type": info.compress_type,
+                    "date_time": list(info.date_time),
+                    "external_attr": info.external_attr,
+                })
+
+    snapshot_id = taken_at.strftime(STAMP_FORMAT)
+    taken = {m["id"] for m in previous}
+    n = 1
+    while snapshot_id in taken:
+        n += 1
+        snapshot_id = f"{taken_at.strftime(STAMP_FORMAT)}_{n}"
+    manifest = {
+        "id": snapshot_id,
+        "source": Path(workbook_path).name,
+        "taken_at": taken_at.isoformat(timespec="seconds"),
+        "sha256": workbook_sha,
+        "size": Path(workbook_path).stat().st_size,
+        "new_objects": new_objects,
+        "new_bytes": new_bytes,
+        "parts": parts,
+    }
+    _write_atomic(store / "manifests" / f"{snapshot_id}.json", json.dumps(manifest, indent=1).encode("utf-8"))
+    return manifest
+
+
+def restore_snapshot(snapshot_id: str, output_path: Path, store: Path | None = None) -> Path:
+    """Rebuild the workbook for a snapshot; every part is checked against its recorded hash."""
+    store = store or STORE_DIR
+    manifest_path = store / "manifests" / f"{snapshot_id}.json"
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(output_path, "w") as zf:
+        for part in manifest["parts"]:
+            data = zlib.decompress(_object_path(store, part["sha256"]).read_bytes())
+            if _sha256(data) != part["sha256"]:
+                raise ValueError(f"Snapshot {snapshot_id}: part {part['name']} is corrupt")
+            info = zipfile.ZipInfo(part["name"], date_time=tuple(part["date_time"]))
+            info.compress_type = part["compress_type"]
+            info.external_attr = part["external_attr"]
+            zf.writestr(info, data)
+    return output_path
+
+
+def retained_ids(manifests: list[dict], now: dt.datetime, hourly_days: int = KEEP_HOURLY_DAYS,
+                 daily_days: int = KEEP_DAILY_DAYS) -> set[str]:
+    """Latest snapshot per hour for ``hourly_days``, then latest per day for ``daily_days``."""
+    keep: dict[str, str] = {}
+    for m in manifests:  # oldest first, so later snapshots win their bucket
+        taken = dt.datetime.fromisoformat(m["taken_at"])
+        age = now - taken
+        if age <= dt.timedelta(days=hourly_days):
+            keep[taken.strftime("h%Y%m%d%H")] = m["id"]
+        elif age <= dt.timedelta(days=daily_days):
+            keep[taken.strftime("d%Y%m%d")] = m["id"]
+    return set(keep.values())
+
+
+def apply_retention(store: Path | None = None, now: dt.datetime | None = None, hourly_days: int = KEEP_HOURLY_DAYS,
+                    daily_days: int = KEEP_DAILY_DAYS, grace_seconds: float = GC_GRACE_SECONDS) -> dict[str, int]:
+    """Drop manifests outside the retention policy, then objects no manifest references.
+
+    Objects modified within ``grace_seconds`` are kept even if unreferenced, so a snapshot being
+    saved concurrently keeps its parts until its manifest is written.
+    """
+    store = store or STORE_DIR
+    manifests = list_snapshots(store)
+    keep = retained_ids(manifests, now or dt.datetime.now(), hourly_days, daily_days)
+    removed = 0
+    for m in manifests:
+        if m["id"] not in keep:
+            (store / "manifests" / f"{m['id']}.json").unlink()
+            removed += 1
+
+    referenced = {p["sha256"] for m in manifests if m["id"] in keep for p in m["parts"]}
+    freed = objects = 0
+    cutoff = time.time() - grace_seconds
+    for obj in (store / "objects").glob("*/*"):
+        if obj.name in referenced:
+            continue
+        try:
+            stat = obj.stat()
+            if stat.st_mtime >= cutoff:
+                continue
+            obj.unlink()
+        except FileNotFoundError:
+            continue
+        freed += stat.st_size
+        objects += 1
+    return {"snapshots_removed": removed, "objects_removed": objects, "bytes_freed": freed}
+
+
+def store_size(store: Path | None = None) -> int:
+    store = store or STORE_DIR
+    return sum(p.stat().st_size for p in store.rglob("*") if p.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--workbook", help="Take a snapshot of this workbook")
+    parser.add_argument("--list", action="store_true", help="List snapshots")
+    parser.add_argument("--restore", metavar="ID", help="Rebuild snapshot ID to --output")
+    parser.add_argument("--output")
+    parser.add_argument("--prune", action="store_true", help="Apply the retention policy")
+    parser.add_argument("--hourly-days", type=int, default=KEEP_HOURLY_DAYS)
+    parser.add_argument("--daily-days", type=int, default=KEEP_DAILY_DAYS)
+    args = parser.parse_args()
+    store = Path(args.store)
+
+    with run_metrics.track_run("snapshot_store", args.workbook):
+        if args.workbook:
+            with run_metrics.stage("snapshot"):
+                manifest = save_snapshot(Path(args.workbook), store)
+            print(f"Snapshot {manifest['id']}: {manifest['new_objects']} new parts, {manifest['new_bytes']:,} bytes written")
+        if args.restore:
+            output = Path(args.output) if args.output else Path(f"Shift_Flight_Deck_{args.restore}.xlsm")
+            with run_metrics.stage("restore"):
+                print(f"Restored: {restore_snapshot(args.restore, output, store)}")
+        if args.prune:
+            with run_metrics.stage("retention"):
+                result = apply_retention(store, hourly_days=args.hourly_days, daily_days=args.daily_days)
+            print(f"Pruned {result['snapshots_removed']} snapshots, {result['objects_removed']} parts ({result['bytes_freed']:,} bytes)")
+    if args.list:
+        for m in list_snapshots(store):
+            print(f"{m['id']}  {m['taken_at']}  {m['source']}  {m['size']:,} bytes  +{m['new_bytes']:,} stored")
+        print(f"Store size: {store_size(store):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Trigger cooldown: a rule that keeps firing for the same entity is reported once per cooldown window.
+
+State is kept per (Workbook, RuleID, Entity) in the ``trigger_cooldown`` table of data/history.sqlite.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import archive_history
+
+# Cooldown for rules without WindowHours
+DEFAULT_COOLDOWN_HOURS = 1.0
+COOLDOWN_DDL = (
+    "CREATE TABLE IF NOT EXISTS trigger_cooldown (Workbook TEXT, RuleID TEXT, Entity TEXT, FirstSeen TEXT, "
+    "LastSeen TEXT, LastReported TEXT, Count INTEGER, Escalated INTEGER, PRIMARY KEY (Workbook, RuleID, Entity))"
+)
+_HOURS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:more\s+)?(?:hours?|hrs?|h)\b", re.IGNORECASE)
+
+
+def cooldown_hours(rule: dict[str, Any]) -> float:
+    try:
+        hours = float(rule.get("WindowHours") or 0)
+    except (TypeError, ValueError):
+        hours = 0.0
+    return hours if hours > 0 else DEFAULT_COOLDOWN_HOURS
+
+
+def escalation_hours(rule: dict[str, Any]) -> float | None:
+    """Hours a condition must persist before its escalation applies, from ThenEscalation ("... for 2 more hours")."""
+    match = _HOURS.search(str(rule.get("ThenEscalation") or ""))
+    return float(match.group(1)) if match else None
+
+
+def apply_cooldown(workbook: str, rules: list[dict[str, Any]], triggers: list, now: dt.datetime | None = None,
+                   db_path: Path | None = None) -> tuple[list, list]:
+    """Split ``triggers`` into (reported, suppressed) and update the cooldown state.
+
+    A trigger is reported when its rule/entity is new, has not fired for longer than the cooldown
+    (a new episode), was last reported a full cooldown ago, or has persisted past the rule's
+    escalation time; the escalation is then added to its recommendation, once per episode.
+    A suppressed re-fire only bumps the count and last-seen time.
+    """
+    now = now or dt.datetime.now()
+    stamp = now.isoformat(timespec="seconds")
+    by_id = {r.get("RuleID", ""): r for r in rules}
+    db_path = db_path or archive_history.DB_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    reported, suppressed = [], []
+    try:
+        with conn:
+            conn.execute(COOLDOWN_DDL)
+            state = {
+                (rule_id, entity): rest
+                for rule_id, entity, *rest in conn.execute(
+                    "SELECT RuleID, Entity, FirstSeen, LastSeen, LastReported, Count, Escalated FROM trigger_cooldown WHERE Workbook = ?",
+                    (workbook,),
+                )
+            }
+            updates = []
+            for t in triggers:
+                rule = by_id.get(t.rule_id, {})
+                cooldown = dt.timedelta(hours=cooldown_hours(rule))
+                previous = state.get((t.rule_id, t.affected_entity))
+                if previous is None or now - dt.datetime.fromisoformat(previous[1]) > cooldown:
+                    first, last_reported, count, escalated, report = stamp, stamp, 1, 0, True
+                else:
+                    first, _, last_reported, count, escalated = previous
+                    count += 1
+                    report = False
+                    escalate_after = escalation_hours(rule)
+                    if not escalated and escalate_after is not None and now - dt.datetime.fromisoformat(first) >= dt.timedelta(hours=escalate_after):
+                        t.recommendation = f"{t.recommendation} Escalation: {rule.get('ThenEscalation')}"
+                        escalated, report = 1, True
+                    elif now - dt.datetime.fromisoformat(last_reported) >= cooldown:
+                        report = True
+                    if report:
+                        last_reported = stamp
+                (reported if report else suppressed).append(t)
+                updates.append((workbook, t.rule_id, t.affected_entity, first, stamp, last_reported, count, escalated))
+            conn.executemany("INSERT OR REPLACE INTO trigger_cooldown VALUES (?, ?, ?, ?, ?, ?, ?, ?)", updates)
+    finally:
+        conn.close()
+    return reported, suppressed
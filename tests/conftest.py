@@ -0,0 +1,19 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+# Scripts import their sibling modules directly, as they do when run from scripts/
+sys.path.insert(0, str(SCRIPTS))
+
+
+@pytest.fixture
+def analyzer():
+    """A freshly loaded analyze_workbook, so DSL functions registered by one test do not leak into the next."""
+    spec = importlib.util.spec_from_file_location("analyze_workbook", SCRIPTS / "analyze_workbook.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["analyze_workbook"] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,273 @@
+from pathlib import Path
+
+import pytest
+
+import archive_history
+import build_or_repair_workbook
+import reference_data
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_derive_hourly_columns_ignores_formula_strings(analyzer):
+    aw = analyzer
+    hourly = [
+        {"Line": "Line 1", "SKU_Resolved": "SKU-001", "ActualCases": 88, "Std_CPH": 110, "StdCasesThisHour": 110,
+         "RateAttain_100": "=(F2/I2)", "TargetRateAttain": 0.85, "TargetAttain": "=(J2/K2)"},
+        {"Line": "Line 2", "SKU_Resolved": "SKU-404", "ActualCases": 50, "Std_CPH": None,
+         "RateAttain_100": "=(F3/I3)", "TargetRateAttain": 0.85, "TargetAttain": "=(J3/K3)"},
+    ]
+    ref = aw.ReferenceIndex.from_tables({
+        "tblStandards": [{"Line": "Line 1", "SKU": "SKU-001", "Std_CPH": 100}],
+        "tblLines": [{"Line": "Line 1", "TargetRateAttain": 0.8}],
+    })
+
+    aw.derive_hourly_columns(hourly, ref)
+
+    assert hourly[0]["StdCasesThisHour"] == 100
+    assert hourly[0]["RateAttain_100"] == pytest.approx(0.88)
+    assert hourly[0]["TargetAttain"] == pytest.approx(1.1)
+    assert [hourly[1][c] for c in aw.HOURLY_DERIVED] == [None, None, None]
+    assert aw.consecutive_below(hourly, 0.7, 1, ["Line"], "TargetAttain") == []
+
+
+def test_reference_index_is_cached_by_parameters_hash(deck, monkeypatch):
+    from openpyxl import load_workbook
+
+    wb_path = deck
+    cache = reference_data.CACHE_PATH
+    stats = {}
+
+    ref = reference_data.load_reference_index(wb_path, cache, stats)
+    assert ref.std_cph("Line 2", "SKU-001") == 110
+    assert ref.target("Line 3") == 0.85
+    assert ref.machines("Line 1") == ["M1-1", "M1-2"]
+    assert len(ref.trained_operators("Line 2")) == 10
+    monkeypatch.setattr(reference_data, "_memo", {})
+    assert reference_data.load_reference_index(wb_path, cache, stats).standards == ref.standards
+    assert stats == {"built": 1, "cached": 1}
+
+    wb = load_workbook(wb_path, keep_vba=True)
+    wb["Parameters"]["J2"] = 140
+    wb["Dash_Shift"]["A3"] = "unrelated edit"
+    wb.save(wb_path)
+    assert reference_data.load_reference_index(wb_path, cache, stats).std_cph("Line 1", "SKU-001") == 140
+    assert stats == {"built": 2, "cached": 1}
+
+    # None disables the on-disk cache; the default follows CACHE_PATH at call time
+    monkeypatch.setattr(reference_data, "_memo", {})
+    monkeypatch.setattr(reference_data, "CACHE_PATH", wb_path.parent / "redirected.sqlite")
+    reference_data.load_reference_index(wb_path, None, stats)
+    assert stats == {"built": 3, "cached": 1} and not reference_data.CACHE_PATH.exists()
+    monkeypatch.setattr(reference_data, "_memo", {})
+    reference_data.load_reference_index(wb_path, stats=stats)
+    assert stats == {"built": 4, "cached": 1} and reference_data.CACHE_PATH.exists()
+
+
+def test_reference_index_caches_time_typed_shift_cells(deck, monkeypatch):
+    import datetime as dt
+
+    from openpyxl import load_workbook
+    from schedule_integrity import shift_windows
+
+    wb = load_workbook(deck, keep_vba=True)
+    wb["Parameters"]["C2"] = dt.time(6, 0)
+    wb["Parameters"]["D2"] = dt.time(18, 0)
+    wb.save(deck)
+
+    stats = {}
+    built = reference_data.load_reference_index(deck, stats=stats)
+    monkeypatch.setattr(reference_data, "_memo", {})
+    cached = reference_data.load_reference_index(deck, stats=stats)
+    assert stats == {"built": 1, "cached": 1}
+    assert built.lines["Line 1"] == cached.lines["Line 1"]
+    assert (cached.lines["Line 1"]["ShiftStartTime"], cached.lines["Line 1"]["ShiftEndTime"]) == ("06:00:00", "18:00:00")
+    assert shift_windows(cached.lines)["Line 1"] == (dt.time(6, 0), dt.time(18, 0))
+
+
+def test_rule_scope_limits_evaluation_to_partition(analyzer):
+    import datetime as dt
+
+    aw = analyzer
+    now = dt.datetime.now()
+    downtime = [
+        {"Line": line, "Machine": machine, "StartDT": now - dt.timedelta(minutes=10 * i), "_sheet_row": n}
+        for n, (line, machine, i) in enumerate(
+            [("Line 1", "M1-1", 1), ("Line 1", "M1-2", 2), ("Line 1", "M1-1", 3), ("Line 2", "M2-1", 1), ("Line 2", "M2-1", 2)],
+            start=2,
+        )
+    ]
+    hourly = [{"Line": "Line 1", "SKU_Resolved": "SKU-404", "_sheet_row": 2}, {"Line": "Line 2", "SKU_Resolved": "SKU-404", "_sheet_row": 3}]
+    ref = aw.ReferenceIndex.from_tables({"tblMachines": [{"Line": "Line 1", "Machine": "M1-1"}, {"Line": "Line 2", "Machine": "M2-1"}]})
+    base = {"Enabled": "TRUE", "Severity": "Action", "Scope": "Line", "AppliesToSKU": "*"}
+    rules = [
+        dict(base, RuleID="ALL", IfLogic='ROLLING_COUNT(table="Downtime", window_hours=2, where="Line={Line}", min=2)', AppliesToLine="*", AppliesToMachine="*"),
+        dict(base, RuleID="L2", IfLogic='ROLLING_COUNT(table="Downtime", window_hours=2, where="Line={Line}", min=2)', AppliesToLine="Line 2", AppliesToMachine=""),
+        dict(base, RuleID="M11", IfLogic='ROLLING_COUNT(table="Downtime", window_hours=2, where="Line,Machine", min=2)', AppliesToLine="*", AppliesToMachine="M1-1"),
+        dict(base, RuleID="STD", IfLogic='MISSING_STANDARD(groupby="Line,SKU_Resolved")', AppliesToLine="*", AppliesToMachine="M2-1"),
+    ]
+
+    hits = {(t.rule_id, t.affected_entity) for t in aw.evaluate_rules(rules, [], hourly, downtime, ref)}
+
+    assert hits == {("ALL", "Line 1"), ("ALL", "Line 2"), ("L2", "Line 2"), ("M11", "Line 1,M1-1"), ("STD", "Line 2,SKU-404")}
+    partitions = aw.Partitions({"schedule": [], "hourly": hourly, "downtime": downtime}, ref)
+    scoped = partitions.rows("downtime", aw.rule_scope({"AppliesToLine": "Line 1,Line 2", "AppliesToMachine": "M1-1,M2-1"}))
+    assert [r["_sheet_row"] for r in scoped] == [2, 4, 5, 6]
+    unknown = aw.rule_scope({"AppliesToLine": "*", "AppliesToMachine": "M9-9"})
+    assert partitions.rows("hourly", unknown) == [] and partitions.rows("downtime", unknown) == []
+
+
+def test_dsl_registry_projects_columns_and_loads_plugins(tmp_path, analyzer):
+    aw = analyzer
+    plugin = tmp_path / "site_rules.py"
+    plugin.write_text(
+        "def register(dsl_function):\n"
+        "    @dsl_function('LOW_OUTPUT', {'hourly': ['Line', 'ActualCases']})\n"
+        "    def low_output(args, ctx):\n"
+        "        return {(r['Line'],) for r in ctx.rows['hourly'] if r['ActualCases'] < args['min']}\n",
+        encoding="utf-8",
+    )
+    aw.load_dsl_plugin(plugin)
+    rules = [
+        {"RuleID": "R1", "Enabled": "TRUE", "IfLogic": 'REPEAT_CAUSE(groupby="Line,Machine,Cause", min_repeats=3)'},
+        {"RuleID": "R2", "Enabled": "TRUE", "IfLogic": "LOW_OUTPUT(min=50)", "Severity": "Watch"},
+        {"RuleID": "R3", "Enabled": "FALSE", "IfLogic": 'CONSEC_BELOW(metric="Scrap", hours=2)'},
+    ]
+
+    columns = aw.required_columns(rules)
+
+    assert columns["downtime"] == {"Line", "Machine", "Cause", "StartDT"}
+    assert "Scrap" not in columns["hourly"]
+    assert {"ActualCases", "SKU_Resolved", "HourEndingDT"} <= columns["hourly"]
+    hourly = [{"Line": "Line 1", "ActualCases": 40, "_sheet_row": 2}, {"Line": "Line 2", "ActualCases": 90, "_sheet_row": 3}]
+    triggers = aw.evaluate_rules(rules[1:], [], hourly, [], aw.ReferenceIndex())
+    assert [(t.rule_id, t.affected_entity) for t in triggers] == [("R2", "Line 1")]
+    assert aw.lint_rules([dict(rules[1], IfLogic="NOT_A_FN(x=1)")])[-1] == "Row 2: unknown DSL function NOT_A_FN"
+
+
+def test_analyze_many_writes_ranked_plant_report(tmp_path, monkeypatch, analyzer):
+    import json
+    import sqlite3
+
+    from openpyxl import load_workbook
+
+    aw = analyzer
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    cells = tmp_path / "cells"
+    cells.mkdir()
+    for name in ("cell_a", "cell_b"):
+        build_or_repair_workbook.build_or_repair(cells / f"{name}.xlsm")
+    wb = load_workbook(cells / "cell_b.xlsm", keep_vba=True)
+    wb["Hourly_Log"]["G3"] = "SKU-999"
+    wb.save(cells / "cell_b.xlsm")
+    (cells / "broken.xlsm").write_text("not a workbook", encoding="utf-8")
+
+    workbooks = aw.expand_workbooks([str(cells)])
+    results = aw.analyze_many(workbooks, aw.DEFAULT_RULES, max_workers=2)
+    report = aw.plant_report(results)
+    aw.write_plant_report(report, tmp_path / "plant.json", tmp_path / "plant.xlsx")
+
+    assert [Path(w["workbook"]).name for w in report["workbooks"]] == ["broken.xlsm", "cell_a.xlsm", "cell_b.xlsm"]
+    assert report["workbooks"][0]["error"] and report["workbooks"][1]["triggers"] == 0
+    assert [(t["rank"], t["workbook"], t["rule_id"], t["affected_entity"]) for t in report["triggers"]] == [
+        (1, "cell_b", "R2_MISSING_STANDARD", "Line 1,SKU-999"),
+    ]
+    assert json.loads((tmp_path / "plant.json").read_text(encoding="utf-8"))["triggers"][0]["severity"] == "Urgent"
+    assert load_workbook(tmp_path / "plant.xlsx")["Plant Triggers"]["C2"].value == "R2_MISSING_STANDARD"
+    # A rerun inside the cooldown still lists the trigger, flagged
+    rerun = aw.plant_report(aw.analyze_many(workbooks, aw.DEFAULT_RULES, max_workers=2))
+    assert [(t["rule_id"], t["suppressed"]) for t in rerun["triggers"]] == [("R2_MISSING_STANDARD", True)]
+    report_ws = load_workbook(cells / "cell_b.xlsm")["Analysis_Report"]
+    assert "Rules source: shared" in [c.value.lstrip("- ") for c in report_ws["A"] if c.value]
+    conn = sqlite3.connect(tmp_path / "history.sqlite")
+    assert conn.execute("SELECT Workbook, Line, RuleID, Entity FROM trigger_log").fetchall() == [
+        ("cell_b", "Line 1", "R2_MISSING_STANDARD", "Line 1,SKU-999"),
+    ]
+    conn.close()
+
+
+def test_tables_are_normalized_once_with_bad_cells_reported(tmp_path, deck, analyzer):
+    import datetime as dt
+
+    from normalize import Normalizer
+    from openpyxl import load_workbook
+
+    aw, wb_path = analyzer, deck
+    wb = load_workbook(wb_path, keep_vba=True)
+    wb["Hourly_Log"]["F3"] = "abc"
+    wb["Hourly_Log"]["F4"] = "1,204"
+    wb["Hourly_Log"]["E4"] = "08/01/2025 09:00"
+    wb["Downtime_Log"]["G2"] = "=H9*2"
+    wb.save(wb_path)
+
+    normalizer = Normalizer()
+    wb = load_workbook(wb_path)
+    hourly = aw.table_rows(wb["Hourly_Log"], "tblHourly", None, normalizer)
+    assert [r["ActualCases"] for r in hourly] == [92.0, None, 1204.0]
+    assert hourly[2]["HourEndingDT"] == dt.datetime(2025, 8, 1, 9)
+    assert isinstance(hourly[0]["Date"], dt.date) and hourly[0]["TargetAttain"] is None
+    assert normalizer._formats[("tblHourly", "HourEndingDT")] == "%m/%d/%Y %H:%M"
+    assert [str(i) for i in normalizer.issues] == ["Hourly_Log!F3 ActualCases: 'abc' is not a valid float"]
+    aw.table_rows(wb["Downtime_Log"], "tblDowntime", None, normalizer)
+    assert str(normalizer.issues[-1]) == "Downtime_Log!G2 Minutes: '=H9*2' is not a valid float (formula has no value)"
+
+    # Only the columns the rules read are normalized, so the Minutes formula is not reported here
+    aw.analyze(wb_path, tmp_path / "rules.json")
+    report = [c.value for c in load_workbook(wb_path)["Analysis_Report"]["A"] if c.value]
+    assert "- Cells not matching their column type (left blank): 1" in report
+    assert "- Hourly_Log!F3 ActualCases: 'abc' is not a valid float" in report
+
+
+def test_offset_datetimes_are_normalized_to_naive_local_time(analyzer):
+    import datetime as dt
+
+    from normalize import Normalizer
+
+    aw = analyzer
+    normalizer = Normalizer()
+    rows = [
+        {"Line": "Line 1", "StartDT": "2025-08-01T07:00:00Z", "_sheet_row": 2},
+        {"Line": "Line 1", "StartDT": "2025-08-01T08:00:00", "_sheet_row": 3},
+        {"Line": "Line 1", "StartDT": "2025-08-01T09:00:00+02:00", "_sheet_row": 4},
+    ]
+    normalizer.normalize_rows("tblDowntime", "Downtime_Log", [("StartDT", "E")], rows)
+    utc = dt.datetime(2025, 8, 1, 7, tzinfo=dt.timezone.utc)
+    assert rows[0]["StartDT"] == utc.astimezone().replace(tzinfo=None)
+    assert all(r["StartDT"].tzinfo is None for r in rows) and not normalizer.issues
+    # Mixed offset and plain text in one column still compares
+    assert aw.rolling_count(rows, 24 * 365 * 100, ["Line"]) == {("Line 1",): 3}
+
+
+def test_row_counts_do_not_depend_on_projected_columns(tmp_path, deck, analyzer):
+    from openpyxl import load_workbook
+
+    aw, wb_path = analyzer, deck
+    wb = load_workbook(wb_path, keep_vba=True)
+    ws = wb["Hourly_Log"]
+    base = aw.required_columns([])["hourly"]
+    # A row whose only value is in a column no rule reads
+    extra = next(c.column for c in ws[1] if c.value not in base)
+    ws.cell(5, extra, "note only")
+    ws.tables["tblHourly"].ref = "A1:L5"
+    wb.save(wb_path)
+
+    ws = load_workbook(wb_path)["Hourly_Log"]
+    projected = aw.table_rows(ws, "tblHourly", base)
+    assert len(projected) == len(aw.table_rows(ws, "tblHourly")) == 4
+    assert projected[-1]["_sheet_row"] == 5
+
+    rules = [{"RuleID": "R1", "Enabled": "TRUE", "Severity": "Watch", "IfLogic": "MISSING_STANDARD()"}]
+    for rule_set in (rules, [dict(rules[0], IfLogic='CONSEC_BELOW(metric="TargetAttain", hours=2)')]):
+        aw.analyze(wb_path, tmp_path / "rules.json", rules=rule_set)
+        assert "- Hourly rows: 4" in [c.value for c in load_workbook(wb_path)["Analysis_Report"]["A"]]
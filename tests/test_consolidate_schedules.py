@@ -0,0 +1,250 @@
+import datetime
+import importlib.util
+import sqlite3
+import sys
+from pathlib import Path
+
+import openpyxl
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("consolidate_schedules", REPO / "consolidate_schedules.py")
+    module = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader
+    sys.modules["consolidate_schedules"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_schedule(path: Path):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for day in (6, 7):
+        ws = wb.create_sheet(f"8.{day}.25")
+        ws.cell(1, 1, datetime.datetime(2025, 8, day))
+        for col, header in {3: "Cases", 4: "Shifts", 6: "Target per Shift", 10: "Comments", 12: "Work order made"}.items():
+            ws.cell(2, col, header)
+        ws.cell(6, 1, "Line 1")
+        ws.append([1, "2001427 / CORN 15.25OZ", 1000, 2, 800, 500, None, "rush", None, "extra", None, "Y"])
+        ws.append([None, None, None, None, None, 700])
+        ws.cell(9, 1, "Line 2 ")
+        ws.append(["2", "1571 SMALL", "2,000", 1, None, None])
+    wb.create_sheet("Notes")
+    wb.save(path)
+
+
+def test_extract_all_rows_single_pass(tmp_path):
+    cs = load_module()
+    src = tmp_path / "schedule.xlsx"
+    build_schedule(src)
+
+    wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    all_rows, processed, skipped = cs.extract_all_rows(wb)
+    wb.close()
+
+    assert (processed, skipped) == (2, 1)
+    assert [len(all_rows[1]), len(all_rows[2])] == [2, 2]
+    first = all_rows[1][0]
+    assert first["SKU"] == "2001427"
+    assert first["Description"] == "CORN 15.25OZ"
+    assert first["Percent_Complete"] == 0.8
+    assert first["WorkOrderMade"] == "Y"
+    assert first["ExtraFields_JSON"] == '{"Comments": "extra"}'
+    assert all_rows[2][0]["Cases_Planned"] == 2000.0
+    problems = [i["Problem"] for i in cs.issues]
+    assert "Target per Shift (700) on filler row" in problems
+    assert "Cannot determine date from cell or sheet name" in problems
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    cs = load_module()
+    src = tmp_path / "schedule.xlsx"
+    build_schedule(src)
+
+    wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    serial = cs.extract_all_rows(wb)
+    wb.close()
+    serial_issues = list(cs.issues)
+    assert serial_issues
+
+    cs.issues.clear()
+    parallel = cs.extract_all_rows_parallel(str(src), max_workers=2)
+
+    assert parallel == serial
+    assert list(cs.issues) == serial_issues
+
+
+def test_write_only_output_keeps_table_and_panes(tmp_path):
+    cs = load_module()
+    src = tmp_path / "schedule.xlsx"
+    build_schedule(src)
+    all_rows, processed, skipped = cs.extract_all_rows_parallel(str(src), max_workers=1)
+
+    out = tmp_path / "by_line.xlsx"
+    cs.write_output(str(out), all_rows, processed, skipped)
+
+    wb = openpyxl.load_workbook(out)
+    assert wb.sheetnames[:3] == ["README", "Assumptions & Data Issues", "Summary"]
+    ws = wb["Line 1"]
+    assert ws.freeze_panes == "D2"
+    assert ws["A2"].number_format == "m/d/yyyy"
+    assert ws["K2"].number_format == "0.0%"
+    table = ws.tables["tblLine1Schedule"]
+    assert table.ref == "A1:N3"
+    assert [c.name for c in table.tableColumns] == cs.LINE_SHEET_COLUMNS
+
+
+def test_sheet_cache_reextracts_only_changed_sheets(tmp_path):
+    cs = load_module()
+    src = tmp_path / "schedule.xlsx"
+    cache = tmp_path / "cache.sqlite"
+    build_schedule(src)
+
+    stats = {}
+    first = cs.extract_all_rows_parallel(str(src), 1, str(cache), stats)
+    first_issues = list(cs.issues)
+    assert stats == {"sheets_cached": 0, "sheets_extracted": 3}
+
+    cs.issues.clear()
+    assert cs.extract_all_rows_parallel(str(src), 1, str(cache), stats) == first
+    assert list(cs.issues) == first_issues
+    assert stats == {"sheets_cached": 3, "sheets_extracted": 0}
+
+    wb = openpyxl.load_workbook(src)
+    wb["8.7.25"]["C7"] = 1200
+    wb.save(src)
+    cs.issues.clear()
+    all_rows, _, _ = cs.extract_all_rows_parallel(str(src), 1, str(cache), stats)
+    assert stats == {"sheets_cached": 2, "sheets_extracted": 1}
+    assert all_rows[1][1]["Cases_Planned"] == 1200
+    # The changed sheet's old entry is pruned, and so is a sheet that is gone
+    conn = sqlite3.connect(cache)
+    assert conn.execute("SELECT COUNT(*) FROM sheet_cache").fetchone() == (3,)
+    wb = openpyxl.load_workbook(src)
+    del wb["8.7.25"]
+    wb.save(src)
+    cs.extract_all_rows_parallel(str(src), 1, str(cache), stats)
+    assert sorted(n for (n,) in conn.execute("SELECT SheetName FROM sheet_cache")) == sorted(wb.sheetnames)
+    conn.close()
+
+
+def test_sheet_cache_is_kept_per_workbook(tmp_path):
+    cs = load_module()
+    cache = tmp_path / "cache.sqlite"
+    plants = [tmp_path / "plant_a.xlsx", tmp_path / "plant_b.xlsx"]
+    for path in plants:
+        build_schedule(path)
+
+    runs = []
+    for path in plants + plants:
+        stats = {}
+        cs.issues.clear()
+        cs.extract_all_rows_parallel(str(path), 1, str(cache), stats)
+        runs.append(stats)
+    # Identical sheets in another workbook neither hit nor evict each other's entries
+    assert runs == [{"sheets_cached": 0, "sheets_extracted": 3}] * 2 + [{"sheets_cached": 3, "sheets_extracted": 0}] * 2
+
+    wb = openpyxl.load_workbook(plants[0])
+    del wb["8.7.25"]
+    wb.save(plants[0])
+    cs.extract_all_rows_parallel(str(plants[0]), 1, str(cache), {})
+    conn = sqlite3.connect(cache)
+    counts = dict(conn.execute("SELECT Workbook, COUNT(*) FROM sheet_cache GROUP BY Workbook"))
+    conn.close()
+    assert counts == {str(plants[0].resolve()): 2, str(plants[1].resolve()): 3}
+
+
+def test_cli_merges_inputs_from_directory(tmp_path, monkeypatch):
+    cs = load_module()
+    monkeypatch.setattr(cs.run_metrics, "METRICS_DB", tmp_path / "metrics.sqlite")
+    src_dir = tmp_path / "weekly"
+    src_dir.mkdir()
+    build_schedule(src_dir / "plant_a.xlsx")
+    build_schedule(src_dir / "plant_b.xlsx")
+    out = tmp_path / "merged.xlsx"
+    catalog = tmp_path / "sku_catalog.sqlite"
+    master = tmp_path / "sku_master.csv"
+
+    cs.main([str(src_dir), "--merge", "--output", str(out), "--no-cache", "--workers", "1",
+             "--sku-catalog", str(catalog), "--export-sku-master", str(master), "--no-dup-index"])
+
+    ws = openpyxl.load_workbook(out)["Line 1"]
+    sources = [row[1] for row in ws.iter_rows(min_row=2, values_only=True)]
+    assert sources == ["plant_a!8.6.25", "plant_b!8.6.25", "plant_a!8.7.25", "plant_b!8.7.25"]
+    assert master.read_text(encoding="utf-8").splitlines() == [
+        "Line,SKU,ProductName,Std_CPH",
+        "Line 1,2001427,CORN 15.25OZ,",
+        "Line 2,1571,SMALL,",
+    ]
+    conn = sqlite3.connect(tmp_path / "metrics.sqlite")
+    assert conn.execute("SELECT Script, Status, TotalRows FROM runs").fetchall() == [("consolidate_schedules", "ok", 8)]
+    assert {s for (s,) in conn.execute("SELECT Stage FROM run_stages")} == {"consolidate", "sku_master"}
+    conn.close()
+
+
+def test_parse_sku_replays_memoized_findings():
+    cs = load_module()
+    for row_ref in (4, 9):
+        assert cs.parse_sku("1571 SMALL", "8.6.25", "2025-08-06", 2, row_ref) == ("1571", "SMALL", "1571 SMALL")
+    assert cs.lookup_sku.cache_info().hits == 1
+    assert [(i["RowRef"], i["Problem"], i["Occurrences"]) for i in cs.issues] == [
+        (4, "Short SKU (4 digits) detected: 1571", 2),
+    ]
+
+
+def test_history_duplicates_span_workbooks(tmp_path):
+    cs = load_module()
+    week1, week2 = tmp_path / "week1.xlsx", tmp_path / "week2.xlsx"
+    build_schedule(week1)
+    build_schedule(week2)
+    index = tmp_path / "dups.sqlite"
+
+    first = cs.consolidate(str(week1), str(tmp_path / "w1.xlsx"), 1, dup_index=str(index))
+    rerun = cs.consolidate(str(week1), str(tmp_path / "w1.xlsx"), 1, dup_index=str(index))
+    second = cs.consolidate(str(week2), str(tmp_path / "w2.xlsx"), 1, dup_index=str(index))
+
+    assert (first["history_duplicates"], rerun["history_duplicates"], second["history_duplicates"]) == (0, 0, 4)
+    problems = [i["Problem"] for i in cs.issues if i["Field"] == "Duplicate"]
+    assert problems[0].startswith("Duplicate of row consolidated earlier from week1!8.6.25")
+
+
+def test_issue_log_collapses_identical_issues():
+    cs = load_module()
+    for sheet in ("8.6.25", "8.7.25", "8.8.25"):
+        cs.log_issue("Info", sheet, "", 1, 7, "Target_Per_Shift", "Target per Shift (700) on filler row",
+                     "Ignored filler row")
+    cs.log_issue("Warning", "8.8.25", "", 2, 9, "SKU", "Missing SKU text but other fields present",
+                 "Extracted with blank SKU")
+
+    entries = list(cs.issues)
+    assert [(e["Issue_ID"], e["SheetName"], e["LastSheet"], e["Occurrences"]) for e in entries] == [
+        (1, "8.6.25", "8.8.25", 3),
+        (2, "8.8.25", "8.8.25", 1),
+    ]
+    assert (len(cs.issues), cs.issues.total) == (2, 4)
+    assert dict(cs.issues.severity_counts) == {"Info": 3, "Warning": 1}
+    assert dict(cs.issues.field_counts) == {"Target_Per_Shift": 3, "SKU": 1}
+
+
+def test_summarize_schedule_rollups_share_accumulators(tmp_path):
+    cs = load_module()
+    src = tmp_path / "schedule.xlsx"
+    build_schedule(src)
+    all_rows, _, _ = cs.extract_all_rows_parallel(str(src), max_workers=1)
+
+    summary = cs.summarize_schedule(all_rows)
+
+    assert summary["overall"]["cases_planned"] == 6000
+    assert summary["overall"]["count"] == 4
+    assert [key for key, _ in summary["date_line"]] == [
+        (datetime.date(2025, 8, 6), 1), (datetime.date(2025, 8, 6), 2),
+        (datetime.date(2025, 8, 7), 1), (datetime.date(2025, 8, 7), 2),
+    ]
+    week = dict(summary["week_line"])
+    assert week[("2025-W32", 1)]["cases_planned"] == 2000
+    assert week[("2025-W32", 1)]["avg_pct"] == 0.8
+    assert dict(summary["month_line"])[("2025-08", 2)]["count"] == 2
+    assert dict(summary["line_sku"])[(2, "1571")]["avg_pct"] is None
+    assert summary["line_totals"][1]["completed"] == 1600
@@ -0,0 +1,62 @@
+import datetime as dt
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import reference_data
+from forecast import RunRateForecaster
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def hour(h):
+    return dt.datetime(2025, 8, 1, h)
+
+
+def test_forecaster_updates_per_row_and_projects_to_scheduled_end():
+    f = RunRateForecaster(alpha=0.5)
+    f.add_schedule({"Line": "Line 1", "PlannedCases": 400.0, "EndDT": hour(10)})
+    f.add_schedule({"Line": "Line 1", "PlannedCases": 420.0, "EndDT": hour(14)})
+    for h, cases in [(7, 100.0), (8, 80.0), (9, 60.0)]:
+        f.update({"Line": "Line 1", "HourEndingDT": hour(h), "ActualCases": cases})
+    # A late row counts towards the total but does not move the run rate
+    f.update({"Line": "Line 1", "HourEndingDT": hour(6), "ActualCases": 10.0})
+
+    p = f.projection("Line 1")
+    # EWMA: 100 -> 90 -> 75; five hours left from 09:00 to 14:00
+    assert (p["actual"], p["hours"], p["rate"], p["remaining_hours"]) == (250.0, 4, 75.0, 5.0)
+    assert p["projected"] == 250 + 5 * 75
+    assert p["shortfall"] == 820 - 625
+    assert f.projection("Line 9")["projected"] == 0
+
+    shuffled = RunRateForecaster.from_rows(
+        [{"Line": "Line 1", "PlannedCases": 820.0, "EndDT": hour(14)}],
+        [{"Line": "Line 1", "HourEndingDT": hour(h), "ActualCases": c} for h, c in [(9, 60.0), (7, 100.0), (8, 80.0)]],
+    )
+    assert shuffled.projection("Line 1")["rate"] == 75.0
+
+
+def test_analyzer_uses_forecaster_for_rules_and_dash_shift(tmp_path, deck, analyzer):
+    aw, wb_path = analyzer, deck
+
+    # Seeded shift: 92/93/94 cases at 07-09:00, 820 planned until 14:00 -> 279 + 5 * 93.25 = 745.25 (9% short)
+    rules = [{"RuleID": f"F{pct}", "Enabled": "TRUE", "Severity": "Watch", "IfLogic": f"FORECAST_SHORTFALL(pct={pct})"}
+             for pct in (0.05, 0.1)]
+    triggers = aw.analyze(wb_path, tmp_path / "rules.json", rules=rules)
+    assert [(t.rule_id, t.affected_entity) for t in triggers] == [("F0.05", "Line 1")]
+
+    ws = load_workbook(wb_path)["Dash_Shift"]
+    assert ws.cell(aw.FORECAST_ROW, 1).value == "Line Forecast (end of shift)"
+    assert [c.value for c in ws[aw.FORECAST_ROW + 2]][:6] == ["Line 1", 820, 279, 93.25, 5, 745.2]
+    assert ws.cell(aw.FORECAST_ROW + 3, 1).value is None
@@ -0,0 +1,73 @@
+import datetime as dt
+import json
+import re
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import publish_reports
+import reference_data
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_publish_renders_dashboards_without_excel(tmp_path, deck, monkeypatch):
+    monkeypatch.setattr(publish_reports, "EXPORT_DIR", tmp_path / "exports")
+    monkeypatch.setattr(publish_reports, "LOG_PATH", tmp_path / "publish.log")
+    monkeypatch.setattr(publish_reports, "com_available", lambda: False)
+    wb_path = deck
+    wb = load_workbook(wb_path, keep_vba=True)
+    wb["Hourly_Log"]["G3"] = "SKU-999"  # no standard on file
+    wb["Hourly_Log"]["G4"] = None
+    wb.save(wb_path)
+    archive_history.archive(wb_path, clear_current=False)
+
+    result = publish_reports.publish(wb_path, dt.date(2020, 1, 1))
+
+    names = sorted(Path(p).name.rsplit("_", 2)[0] + Path(p).suffix for p in result["dashboards"])
+    assert names == ["Analysis_Report.html", "Analysis_Report.pdf", "Dash_Shift.html", "Dash_Shift.pdf", "Dash_Trends.html", "Dash_Trends.pdf"]
+    html = next(p for p in result["dashboards"] if "Dash_Shift" in p and p.endswith(".html"))
+    text = open(html, encoding="utf-8").read()
+    assert "<td class=\"b\">Shift Flight Deck</td>" in text
+    # The workbook was saved by openpyxl, so its KPI formulas have no cached values and are computed in Python
+    kpis = re.findall(r'<tr><td>([^<]+)</td><td class="num">([^<]+)</td></tr>', text)
+    assert kpis == [("Data Quality Score", "66.7%"), ("% Hourly with SKU", "66.7%"), ("% Standards present", "33.3%"),
+                    ("% Downtime required fields", "100.0%")]
+    assert "<td>Check schedule in next 90 minutes</td>" in text and "=IFERROR" not in text
+    pdf = open(html[:-5] + ".pdf", "rb").read()
+    assert pdf.startswith(b"%PDF-1.4")
+    xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[xref:xref + 4] == b"xref"
+    assert b"(Shift Flight Deck) Tj" in pdf
+    assert Path(result["snapshot"]).exists()
+    summary = Path(result["summary"]).read_text(encoding="utf-8")
+    assert "No archived data for this period" in summary and "Lines on file:" in summary
+    assert Path(result["summary"]).with_suffix(".json").exists()
+
+
+def test_publish_without_an_archive_writes_an_empty_summary(tmp_path, deck, monkeypatch, analyzer, capsys):
+    monkeypatch.setattr(publish_reports, "EXPORT_DIR", tmp_path / "exports")
+    monkeypatch.setattr(publish_reports, "LOG_PATH", tmp_path / "publish.log")
+    monkeypatch.setattr(publish_reports, "com_available", lambda: False)
+
+    result = publish_reports.publish(deck)
+    assert "No archived data; run archive_history.py" in Path(result["summary"]).read_text(encoding="utf-8")
+
+    # Analyze creates history.sqlite with only trigger_log; the summary still publishes
+    analyzer.analyze(deck, tmp_path / "rules.json")
+    result = publish_reports.publish(deck)
+    summary = json.loads(Path(result["summary"]).with_suffix(".json").read_text(encoding="utf-8"))
+    assert summary["lines"] == {} and "downtime_agg" in summary["unavailable"]
+    assert "Warning: shift summary has no archived data" in capsys.readouterr().err
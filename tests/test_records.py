@@ -0,0 +1,49 @@
+import json
+import pickle
+import sys
+import tracemalloc
+
+import pytest
+
+from build_or_repair_workbook import TABLE_DEFS
+from records import DowntimeRecord, HourlyRecord, record_type
+
+
+def test_records_behave_like_row_dicts():
+    cols = TABLE_DEFS["tblHourly"][1]
+    vals = ["r1", "2025-08-01", "A", "Line 1", None, 90, "SKU-001", 110, None, None, 0.85, None]
+    row = record_type("tblHourly", cols).from_values(cols, vals, 2)
+    as_dict = dict(zip(cols, vals), _sheet_row=2)
+
+    assert row == as_dict and dict(row) == as_dict and {**row} == as_dict
+    assert row["Line"] is sys.intern("Line 1")
+    assert row.get("Scrap") is None and "Scrap" not in row
+    row["TargetAttain"] = 1.1
+    assert row["TargetAttain"] == 1.1
+    with pytest.raises(KeyError):
+        row["Scrap"] = 1
+    assert json.loads(json.dumps({k: v for k, v in row.items()}))["ActualCases"] == 90
+    assert pickle.loads(pickle.dumps(row)) == row
+
+    projected = HourlyRecord.from_values(["Line", "ActualCases"], ["Line 2", 5])
+    assert list(projected) == ["Line", "ActualCases"] and len(projected) == 2
+    with pytest.raises(KeyError):
+        projected["SKU_Resolved"]
+    assert record_type("tblHourly", [*cols, "Scrap"]) is None
+    assert record_type("tblLines", ["Line"]) is None
+
+
+def test_records_use_less_than_half_the_memory_of_dicts():
+    cols = TABLE_DEFS["tblDowntime"][1]
+
+    def held(build):
+        tracemalloc.start()
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del rows
+        return size
+
+    dicts = held(lambda: [dict.fromkeys(cols, 1.0) | {"_sheet_row": i} for i in range(2000)])
+    records = held(lambda: [DowntimeRecord.from_values(cols, [1.0] * len(cols), i) for i in range(2000)])
+    assert records < dicts / 2
@@ -0,0 +1,47 @@
+import datetime as dt
+import sqlite3
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import rehydrate_workbook
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_rehydrate_rebuilds_contract_from_history(tmp_path, deck):
+    live = deck
+
+    # An archive written before payloads were JSON
+    conn = sqlite3.connect(archive_history.DB_PATH)
+    conn.execute("CREATE TABLE hourly_log (RowID TEXT PRIMARY KEY, payload TEXT)")
+    legacy = {"RowID": "old", "Date": dt.datetime(2020, 1, 2), "Line": "Line 2", "ActualCases": 5}
+    conn.execute("INSERT INTO hourly_log VALUES (?, ?)", ("old", str(legacy)))
+    conn.commit()
+    conn.close()
+    archive_history.archive(live, clear_current=False)
+
+    out = tmp_path / "rehydrated.xlsx"
+    today = dt.date.today()
+    counts = rehydrate_workbook.rehydrate(archive_history.DB_PATH, out, today, today, ["Line 1"], live)
+
+    assert counts["tblHourly"] == 3 and counts["tblSchedule"] == 2 and counts["tblStandards"] == 10
+    contract = build_or_repair_workbook.read_contract(out)
+    assert build_or_repair_workbook.contract_problems(contract) == []
+    ws = load_workbook(out)["Hourly_Log"]
+    assert ws["J4"].value == "=(F4/I4)"
+    assert ws["E2"].value == dt.datetime.combine(today, dt.time(7))
+
+    counts = rehydrate_workbook.rehydrate(archive_history.DB_PATH, out, dt.date(2020, 1, 1), dt.date(2020, 1, 31))
+    assert counts["tblHourly"] == 1
+    assert load_workbook(out)["Hourly_Log"]["F2"].value == 5
@@ -0,0 +1,72 @@
+import datetime as dt
+import sys
+
+import pytest
+
+import archive_history
+import build_or_repair_workbook
+import run_metrics
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, history.sqlite and metrics.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    monkeypatch.setattr(run_metrics, "METRICS_DB", tmp_path / "metrics.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_runs_are_appended_with_stages_rows_and_status(tmp_path, deck, monkeypatch, capsys):
+    live = deck
+
+    for _ in range(2):
+        monkeypatch.setattr(sys, "argv", ["archive_history.py", "--workbook", str(live)])
+        archive_history.main()
+    with pytest.raises(ValueError):
+        with run_metrics.track_run("archive_history", "broken.xlsm"):
+            with run_metrics.stage("read"):
+                raise ValueError("not a workbook")
+    with run_metrics.stage("outside"):
+        run_metrics.record_rows("tblHourly", 5)
+
+    conn = run_metrics.open_metrics()
+    runs = conn.execute("SELECT Script, Status, Error, TotalRows, RowCounts FROM runs ORDER BY RunID").fetchall()
+    assert runs[0][:4] == ("archive_history", "ok", None, 6)
+    assert runs[0][4] == '{"tblSchedule": 2, "tblHourly": 3, "tblDowntime": 1}'
+    assert runs[2][:3] == ("archive_history", "error", "ValueError: not a workbook")
+    stages = {s for (s,) in conn.execute("SELECT Stage FROM run_stages WHERE RunID = 1")}
+    assert stages == {"read", "upsert", "aggregate"}
+
+    summary = {(r["script"], r["stage"]): r for r in run_metrics.summarize(conn, "archive_history")}
+    assert summary[("archive_history", "(run)")]["runs"] == 3
+    assert summary[("archive_history", "(run)")]["errors"] == 1
+    assert summary[("archive_history", "read")]["runs"] == 3
+    assert "outside" not in {stage for _, stage in summary}
+    assert summary[("archive_history", "(run)")]["p90_ms"] <= summary[("archive_history", "(run)")]["max_ms"]
+    trend = run_metrics.trend(conn, "archive_history", period="week")
+    assert len(trend) == 1 and trend[0]["runs"] == 3 and trend[0]["p50_rows"] == 6
+    conn.close()
+
+    monkeypatch.setattr(sys, "argv", ["run_metrics.py", "--script", "archive_history", "--trend", "day"])
+    run_metrics.main()
+    assert dt.date.today().isoformat() in capsys.readouterr().out
+
+
+def test_unwritable_metrics_store_does_not_fail_or_mask_the_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(run_metrics, "METRICS_DB", tmp_path)  # a directory: sqlite cannot open it
+    with run_metrics.track_run("archive_history"):
+        pass
+    with pytest.raises(KeyError):
+        with run_metrics.track_run("archive_history"):
+            raise KeyError("real error")
+    assert capsys.readouterr().err.count("Warning: run metrics not recorded") == 2
+
+
+def test_percentile_interpolates():
+    assert run_metrics.percentile([], 50) is None
+    assert run_metrics.percentile([10], 99) == 10
+    assert run_metrics.percentile([1, 2, 3, 4], 50) == 2.5
+    assert run_metrics.percentile([4, 1, 3, 2], 100) == 4
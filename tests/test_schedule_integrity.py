@@ -0,0 +1,90 @@
+import datetime as dt
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import reference_data
+from schedule_integrity import scan_schedule
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def at(day, h, m=0):
+    return dt.datetime(2025, 8, day, h, m)
+
+
+def order(line, name, start, end, sheet_row):
+    return {"Line": line, "Order": name, "StartDT": start, "EndDT": end, "_sheet_row": sheet_row}
+
+
+def test_sweep_reports_every_overlapping_pair_and_gaps_in_shift_hours():
+    rows = [
+        order("Line 1", "B", at(1, 8), at(1, 12), 3),
+        order("Line 1", "A", at(1, 6), at(1, 10), 2),
+        order("Line 1", "C", at(1, 9), at(1, 11), 4),
+        order("Line 1", "D", at(1, 14), at(1, 16), 5),
+        order("Line 2", "E", at(1, 22), at(2, 2), 6),
+        order("Line 2", "F", at(2, 3), at(2, 6), 7),
+        order("Line 3", "G", at(1, 6), at(1, 9), 8),
+        order("Line 3", "H", at(1, 8), None, 9),
+    ]
+    lines = {
+        "Line 1": {"ShiftStartTime": "06:00", "ShiftEndTime": "18:00"},
+        "Line 2": {"ShiftStartTime": dt.time(22), "ShiftEndTime": 0.25},  # overnight, Excel time fraction
+    }
+    issues = scan_schedule(rows, lines)
+    found = [(i.line, i.kind, i.start.hour, i.end.hour, i.orders, i.sheet_rows) for i in issues]
+    assert found == [
+        ("Line 1", "overlap", 8, 10, ("A", "B"), (2, 3)),
+        ("Line 1", "overlap", 9, 10, ("A", "C"), (2, 4)),
+        ("Line 1", "overlap", 9, 11, ("B", "C"), (3, 4)),
+        ("Line 1", "gap", 12, 14, (), ()),
+        ("Line 1", "gap", 16, 18, (), ()),
+        ("Line 2", "gap", 2, 3, (), ()),
+    ]
+    assert issues[3].minutes == 120
+
+
+def test_orders_running_across_shifts_cover_the_next_shift():
+    lines = {"Line 1": {"ShiftStartTime": "06:00", "ShiftEndTime": "18:00"}}
+    rows = [order("Line 1", "A", at(1, 6), at(2, 10), 2), order("Line 1", "B", at(2, 10), at(2, 18), 3)]
+    assert scan_schedule(rows, lines) == []
+
+    # A ends mid-shift and the next order is two shifts later: the rest of 08-02 is open, 08-03 starts late
+    rows = [order("Line 1", "A", at(1, 6), at(2, 10), 2), order("Line 1", "C", at(2, 19), at(2, 23), 3),
+            order("Line 1", "B", at(3, 8), at(3, 18), 4)]
+    found = [(i.kind, i.start, i.end) for i in scan_schedule(rows, lines)]
+    assert found == [("gap", at(2, 10), at(2, 18)), ("gap", at(3, 6), at(3, 8))]
+
+
+def test_analyzer_lists_schedule_issues_and_fires_rules(tmp_path, deck, analyzer):
+    aw, wb_path = analyzer, deck
+    wb = load_workbook(wb_path, keep_vba=True)
+    # Second order now starts at 09:00, an hour before the first ends; the 06:00-18:00 shift ends unscheduled after 14:00
+    d = wb["Schedule_Entry"]["E3"].value[:10]
+    wb["Schedule_Entry"]["E3"] = f"{d} 09:00"
+    wb.save(wb_path)
+
+    rules = [
+        {"RuleID": "OVERLAP", "Enabled": "TRUE", "Severity": "Action", "IfLogic": "SCHEDULE_OVERLAP()"},
+        {"RuleID": "GAP", "Enabled": "TRUE", "Severity": "Watch", "IfLogic": "SCHEDULE_GAP(min_minutes=300)"},
+    ]
+    triggers = aw.analyze(wb_path, tmp_path / "rules.json", rules=rules)
+    assert [(t.rule_id, t.affected_entity) for t in triggers] == [("OVERLAP", "Line 1")]
+
+    report = [[c.value for c in row] for row in load_workbook(wb_path)["Analysis_Report"].iter_rows()]
+    assert "- Overlapping order pairs: 1" in [r[0] for r in report]
+    header = next(i for i, r in enumerate(report) if r[0] == "Schedule Integrity Detail")
+    assert report[header + 2][:2] == ["Line 1", "overlap"] and report[header + 2][4:7] == [60, "ORD-1001 / ORD-1002", "2, 3"]
+    assert report[header + 3][:2] == ["Line 1", "gap"] and report[header + 3][4] == 240
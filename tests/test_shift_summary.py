@@ -0,0 +1,75 @@
+import datetime as dt
+import json
+import sqlite3
+import sys
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import reference_data
+import run_metrics
+import shift_summary
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache, history.sqlite and metrics.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    monkeypatch.setattr(run_metrics, "METRICS_DB", tmp_path / "metrics.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_shift_summary_reads_archived_aggregates(tmp_path, deck, analyzer, monkeypatch, capsys):
+    live = deck
+    wb = load_workbook(live, keep_vba=True)
+    wb["Hourly_Log"]["G3"] = "SKU-999"
+    wb["Downtime_Log"].append(["dt-2", dt.date.today().isoformat(), "A", "Line 1", None, None, 40, "M1-2", "E102",
+                               "Material", "Starved", "", "N", "", ""])
+    wb["Downtime_Log"].tables["tblDowntime"].ref = "A1:O3"
+    wb.save(live)
+
+    analyzer.analyze(live, tmp_path / "rules.json")
+    archive_history.archive(live, clear_current=False)
+
+    today = dt.date.today()
+    summary = shift_summary.shift_summary(archive_history.DB_PATH, today, today, shift="A")
+
+    line1 = summary["lines"]["Line 1"]
+    assert (line1["planned"], line1["actual"], line1["hours"]) == (820, 279, 3)
+    # 92/93/94 cases give an EWMA run rate of 93.25, as on Dash_Shift; 5 hours left until the 14:00 scheduled end
+    assert line1["forecast"] == round(279 + 5 * 93.25, 1)
+    assert line1["attainment"] == round(279 / 820, 4)
+    assert [(c["cause"], c["minutes"]) for c in line1["top_causes"]] == [("Starved", 40), ("Jam", 15)]
+    assert line1["downtime_minutes"] == 55
+    assert [t["rule_id"] for t in line1["top_triggers"]] == ["R2_MISSING_STANDARD"]
+    assert shift_summary.shift_summary(archive_history.DB_PATH, today, today, shift="B")["lines"] == {}
+
+    monkeypatch.setattr(sys, "argv", ["shift_summary.py", "--db", str(archive_history.DB_PATH), "--json"])
+    shift_summary.main()
+    assert json.loads(capsys.readouterr().out)["lines"]["Line 1"]["planned"] == 820
+    assert "Starved 40 min (1x)" in shift_summary.render_text(summary)
+
+
+def test_summary_needs_an_archived_database_and_reused_rowids_move_aggregates(tmp_path, deck):
+    db = tmp_path / "empty.sqlite"
+    sqlite3.connect(db).close()
+    with pytest.raises(sqlite3.OperationalError, match="archive_history.py"):
+        shift_summary.shift_summary(db, dt.date.today(), dt.date.today())
+    # The report reads only: it does not create the tables it needs
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM sqlite_master").fetchone() == (0,)
+
+    archive_history.archive(deck, clear_current=False)
+    wb = load_workbook(deck, keep_vba=True)
+    wb["Hourly_Log"]["D2"] = "Line 2"
+    wb.save(deck)
+    archive_history.archive(deck, clear_current=False)
+
+    today = dt.date.today()
+    lines = shift_summary.shift_summary(archive_history.DB_PATH, today, today, shift="A")["lines"]
+    assert (lines["Line 1"]["actual"], lines["Line 2"]["actual"]) == (279 - 92, 92)
@@ -0,0 +1,57 @@
+import datetime as dt
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+import build_or_repair_workbook
+import snapshot_store
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_snapshots_dedupe_parts_restore_and_expire(tmp_path, deck):
+    live = deck
+    store = tmp_path / "snapshots"
+    t0 = dt.datetime(2025, 8, 1, 6, 0)
+
+    first = snapshot_store.save_snapshot(live, store, t0)
+    unchanged = snapshot_store.save_snapshot(live, store, t0 + dt.timedelta(minutes=30))
+    assert first["new_objects"] == len(first["parts"])
+    assert (unchanged["new_objects"], unchanged["parts"]) == (0, first["parts"])
+
+    wb = load_workbook(live, keep_vba=True)
+    wb["Hourly_Log"]["F2"] = 999
+    wb.save(live)
+    edited = snapshot_store.save_snapshot(live, store, t0 + dt.timedelta(hours=1))
+    # openpyxl rewrites a few workbook-level parts on save, but untouched sheets are shared
+    assert 0 < edited["new_objects"] < len(edited["parts"]) // 2
+
+    restored = snapshot_store.restore_snapshot(first["id"], tmp_path / "restored.xlsm", store)
+    with zipfile.ZipFile(restored) as zf:
+        assert [i.filename for i in zf.infolist()] == [p["name"] for p in first["parts"]]
+    assert load_workbook(restored)["Hourly_Log"]["F2"].value == 92
+    assert load_workbook(snapshot_store.restore_snapshot(edited["id"], tmp_path / "e.xlsm", store))["Hourly_Log"]["F2"].value == 999
+
+    # Hourly for two days keeps the later snapshot of 06:00; daily after that keeps one per day
+    result = snapshot_store.apply_retention(store, t0 + dt.timedelta(hours=2))
+    assert [m["id"] for m in snapshot_store.list_snapshots(store)] == [unchanged["id"], edited["id"]]
+    assert result["snapshots_removed"] == 1 and result["objects_removed"] == 0
+    snapshot_store.apply_retention(store, t0 + dt.timedelta(days=5))
+    assert [m["id"] for m in snapshot_store.list_snapshots(store)] == [edited["id"]]
+    # Unreferenced parts written recently may belong to a publish whose manifest is not written yet
+    snapshot_store.apply_retention(store, t0 + dt.timedelta(days=91))
+    assert snapshot_store.list_snapshots(store) == []
+    stored = {p["sha256"] for m in (first, edited) for p in m["parts"]}
+    assert {o.name for o in (store / "objects").glob("*/*")} == stored
+    snapshot_store.apply_retention(store, t0 + dt.timedelta(days=91), grace_seconds=0)
+    assert list((store / "objects").glob("*/*")) == []
+    with pytest.raises(FileNotFoundError):
+        snapshot_store.restore_snapshot(first["id"], tmp_path / "gone.xlsm", store)
@@ -0,0 +1,62 @@
+import datetime as dt
+import sqlite3
+
+import pytest
+from openpyxl import load_workbook
+
+import archive_history
+import build_or_repair_workbook
+import reference_data
+import trigger_cooldown
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    """The seeded workbook, with rules.json, the reference cache and history.sqlite under tmp_path."""
+    monkeypatch.setattr(build_or_repair_workbook, "RULES_JSON", tmp_path / "rules.json")
+    monkeypatch.setattr(reference_data, "CACHE_PATH", tmp_path / "reference.sqlite")
+    monkeypatch.setattr(archive_history, "DB_PATH", tmp_path / "history.sqlite")
+    path = tmp_path / "deck.xlsm"
+    build_or_repair_workbook.build_or_repair(path)
+    return path
+
+
+def test_repeats_are_suppressed_within_cooldown_and_escalate_once(tmp_path, analyzer):
+    aw = analyzer
+    db = tmp_path / "history.sqlite"
+    rules = [{"RuleID": "R1", "WindowHours": 2, "ThenEscalation": "Notify area lead if persists for 3 more hours."}]
+    t0 = dt.datetime(2025, 8, 1, 7)
+
+    def run(hours):
+        t = aw.Trigger("R1", "Watch", "", "", "Check the line.", "Line", "Line 1", "", 1.0, "Line 1")
+        reported, suppressed = trigger_cooldown.apply_cooldown("deck", rules, [t], t0 + dt.timedelta(hours=hours), db)
+        return [x.recommendation for x in reported], len(suppressed)
+
+    assert run(0) == (["Check the line."], 0)
+    assert run(1) == ([], 1)
+    assert run(2) == (["Check the line."], 0)  # a full cooldown since it was last reported
+    assert run(3) == (["Check the line. Escalation: Notify area lead if persists for 3 more hours."], 0)
+    assert run(4) == ([], 1)
+    assert run(5) == (["Check the line."], 0)
+    assert run(7.5) == (["Check the line."], 0)  # quiet for longer than the cooldown: a new episode
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT FirstSeen, Count, Escalated FROM trigger_cooldown").fetchone() == ("2025-08-01T14:30:00", 1, 0)
+    conn.close()
+    assert trigger_cooldown.cooldown_hours({}) == trigger_cooldown.DEFAULT_COOLDOWN_HOURS
+    assert trigger_cooldown.escalation_hours({"ThenEscalation": "Escalate to planner."}) is None
+
+
+def test_rank_triggers_selects_top_k(tmp_path, deck, analyzer):
+    aw, wb_path = analyzer, deck
+    triggers = [aw.Trigger(f"R{i}", sev, "", "", "", "Line", f"Line {i}", "2025-08-01T07:00:00", float(i % 4))
+                for i, sev in enumerate(["Info", "Urgent", "Watch", "Action", "Urgent", "Info"])]
+    assert [t.rule_id for t in aw.rank_triggers(triggers, 3)] == ["R1", "R4", "R3"]
+
+    # The seeded shift leaves 14:00-18:00 unscheduled, so SCHEDULE_GAP fires for Line 1 on every run
+    rules = [{"RuleID": "GAP", "Enabled": "TRUE", "Severity": "Watch", "WindowHours": 4, "IfLogic": "SCHEDULE_GAP()"}]
+    assert [t.rule_id for t in aw.analyze(wb_path, tmp_path / "rules.json", rules=rules)] == ["GAP"]
+    repeat = aw.analyze(wb_path, tmp_path / "rules.json", rules=rules)
+    assert [(t.rule_id, t.suppressed) for t in repeat] == [("GAP", True)]
+    report = [c.value for c in load_workbook(wb_path)["Analysis_Report"]["A"] if c.value]
+    assert "- Triggered prompts: 0" in report and "- Repeats suppressed (in cooldown): 1" in report
+    assert [(t.rule_id, t.suppressed) for t in aw.analyze(wb_path, tmp_path / "rules.json", rules=rules, cooldown=False)] == [("GAP", False)]
@@ -42,3 +42,33 @@ def test_analyzer_smoke():
 
     parts = parse_iflogic('MISSING_STANDARD(groupby="Line,SKU_Resolved")')
     assert parts[0][0] == "MISSING_STANDARD"
+
+
+def test_repair_is_noop_on_intact_workbook(tmp_path, monkeypatch):
+    import importlib.util
+    mod_path = Path(__file__).resolve().parents[1] / "scripts" / "build_or_repair_workbook.py"
+    spec = importlib.util.spec_from_file_location("build_or_repair_workbook", mod_path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "RULES_JSON", tmp_path / "rules.json")
+
+    wb_path = tmp_path / "deck.xlsm"
+    module.build_or_repair(wb_path)
+    first = wb_path.read_bytes()
+    assert module.contract_problems(module.read_contract(wb_path)) == []
+    assert "save skipped" in module.build_or_repair(wb_path)
+    assert wb_path.read_bytes() == first
+
+    wb = load_workbook(wb_path, keep_vba=True)
+    for sqref, formula in module.RULE_VALIDATIONS:
+        dv = module.DataValidation(type="list", formula1=formula)
+        dv.add(sqref)
+        wb["Rules_Authoring"].add_data_validation(dv)
+    wb["Dash_Trends"]["A1"] = None
+    wb.save(wb_path)
+    assert module.contract_problems(module.read_contract(wb_path)) == ["3 duplicate validations", "Dash_Trends not initialized"]
+
+    module.build_or_repair(wb_path)
+    assert module.contract_problems(module.read_contract(wb_path)) == []
+    assert len(load_workbook(wb_path)["Rules_Authoring"].data_validations.dataValidation) == 3
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Memory of dict rows vs slotted records for the log tables, consolidated schedule rows and triggers."""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+import gc
+import importlib.util
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from analyze_workbook import Trigger  # noqa: E402
+from build_or_repair_workbook import TABLE_DEFS  # noqa: E402
+from records import RECORD_TYPES  # noqa: E402
+
+
+def load_consolidate():
+    spec = importlib.util.spec_from_file_location("consolidate_schedules", ROOT / "consolidate_schedules.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["consolidate_schedules"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(build) -> int:
+    """Bytes still allocated after ``build()`` returns, i.e. what holding its result costs."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def cell_value(column: str, i: int):
+    # Fresh objects per cell, as openpyxl returns them
+    text = {
+        "Line": f"Line {i % 5 + 1}", "Shift": "ABC"[i % 3], "SKU": f"SKU-{i % 40:03d}", "SKU_Resolved": f"SKU-{i % 40:03d}",
+        "Machine": f"M{i % 5 + 1}-{i % 2 + 1}", "Category": ["Mechanical", "Material", "Quality"][i % 3],
+        "Cause": ["Jam", "Starved", "Changeover", "Label"][i % 4], "OperatorEmpID": f"E{100 + i % 10}", "EscalatedYN": "YN"[i % 2],
+    }
+    if column in text:
+        return text[column]
+    if column in ("Date",):
+        return f"2025-08-{i % 28 + 1:02d}"
+    if column.endswith("DT"):
+        return dt.datetime(2025, 8, 1) + dt.timedelta(hours=i)
+    if column == "RowID":
+        return f"{i:016x}"
+    return float(i % 100)
+
+
+def table_paths(n: int):
+    for table, cls in RECORD_TYPES.items():
+        cols = TABLE_DEFS[table][1]
+
+        def as_dicts(cols=cols):
+            rows = []
+            for i in range(n):
+                row = {c: cell_value(c, i) for c in cols}
+                row["_sheet_row"] = i + 2
+                rows.append(row)
+            return rows
+
+        def as_records(cols=cols, cls=cls):
+            return [cls.from_values(cols, [cell_value(c, i) for c in cols], i + 2) for i in range(n)]
+
+        yield table, as_dicts, as_records
+
+
+def consolidated_path(n: int):
+    cs = load_consolidate()
+
+    def values(i):
+        return {
+            "Date": dt.date(2025, 8, i % 28 + 1), "SourceSheet": f"8.{i % 28 + 1}.25", "Line": i % 5 + 1,
+            "SKU": f"{2001400 + i % 40}", "SKU_RawText": f"{2001400 + i % 40} CORN 15.25OZ", "Description": "CORN 15.25OZ",
+            "Cases_Planned": float(i), "Shifts_Planned": 2.0, "Target_Per_Shift": 800.0, "Cases_Completed": float(i // 2),
+            "Percent_Complete": 0.5, "Notes": None, "WorkOrderMade": "Y", "ExtraFields_JSON": "",
+        }
+
+    return "consolidated", lambda: [values(i) for i in range(n)], lambda: [cs.ScheduleRow(values(i)) for i in range(n)]
+
+
+def trigger_path(n: int):
+    # The same fields without slots, i.e. Trigger as it was
+    DictTrigger = dataclasses.make_dataclass("DictTrigger", [
+        (f.name, f.type) if f.default is dataclasses.MISSING else (f.name, f.type, f.default) for f in dataclasses.fields(Trigger)
+    ])
+
+    # Rule text is shared by every trigger of a rule; entity strings are built per trigger
+    rules = [(f"R{r}", "Action", f"Rule {r} description", f"CONSEC_BELOW(metric=\"TargetAttain\", hours={r})",
+              f"Recommendation for rule {r}", "Line") for r in range(9)]
+    lines = [f"Line {k}" for k in range(1, 6)]
+
+    def args(i):
+        return (*rules[i % 9], f"Line {i % 5 + 1},SKU-{i % 40:03d}", "2025-08-01T07:00:00", float(i % 20), lines[i % 5])
+
+    return "Trigger", lambda: [DictTrigger(*args(i)) for i in range(n)], lambda: [Trigger(*args(i)) for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    paths = [*table_paths(args.rows), consolidated_path(args.rows), trigger_path(args.rows)]
+    print(f"{'path':<14}{'rows':>9}{'before KB':>12}{'after KB':>12}{'saved':>8}")
+    for name, before, after in paths:
+        b, a = measure(before), measure(after)
+        print(f"{name:<14}{args.rows:>9,}{b // 1024:>12,}{a // 1024:>12,}{1 - a / b:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()